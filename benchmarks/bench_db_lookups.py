@@ -0,0 +1,115 @@
+"""
+Measures the latency of the database's hot lookups against a seeded database holding several seasons of matchdays,
+without indexes and with the indexes of TFABDBHandler.INDEX_SPECIFICATION.
+Needs a running MongoDB. The benchmark works on its own database, which it drops when it's done.
+Run from the repository root: python -m benchmarks.bench_db_lookups [--port 27017] [--years 5]
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from pymongo import MongoClient
+from tfab_framework.tfab_consts import Consts as TConsts
+from tfab_framework.tfab_database_handler import TFABDBHandler
+
+BENCHMARK_DB_NAME = "TFABLookupsBenchmark"
+MATCHDAYS_PER_WEEK = 2
+NUM_PLAYERS = 120
+NUM_RANKERS = 15
+LOOKUP_REPETITIONS = 200
+
+
+def seed(db, years, seed_value=0):
+    """
+    Fills <db> with <years> of matchdays, and the players, rankers, admins and configuration of a long-running group.
+    """
+    random.seed(seed_value)
+    player_names = ["player{0}".format(i) for i in range(NUM_PLAYERS)]
+    characteristics = list(TConsts.PlayerCharacteristics.values())
+
+    db[TConsts.PLAYERS_COLLECTION_NAME].insert_many(
+        [{TConsts.PLAYERS_NAME_KEY: name, TConsts.PLAYERS_CHARACTERISTICS_KEY: random.choice(characteristics)}
+         for name in player_names])
+    db[TConsts.RANKERS_COLLECTION_NAME].insert_many(
+        [{TConsts.USER_ID_KEY: 1000 + i, TConsts.USER_FULLNAME_KEY: "ranker{0}".format(i)} for i in range(NUM_RANKERS)])
+    db[TConsts.ADMINS_COLLECTION_NAME].insert_many(
+        [{TConsts.USER_ID_KEY: 1000 + i, TConsts.USER_FULLNAME_KEY: "ranker{0}".format(i)} for i in range(3)])
+    db[TConsts.INTERNAL_COLLECTION_NAME].insert_many(
+        [{TConsts.INTERNAL_CONFIGURATION_KEY: key, TConsts.INTERNAL_CONFIGURATION_VALUE: 1}
+         for key in TConsts.TeamGenerationParameters.values()])
+
+    matchdays = []
+    first_day = date(2000, 1, 1)
+    for day_index in range(0, years * 365, 7 // MATCHDAYS_PER_WEEK):
+        roster = random.sample(player_names, 18)
+        matchdays.append({TConsts.MATCHDAYS_ORIGINAL_MESSAGE_KEY: "\n".join(roster),
+                          TConsts.MATCHDAYS_LOCATION_KEY: "location",
+                          TConsts.MATCHDAYS_ROSTER_KEY: roster,
+                          TConsts.MATCHDAYS_DATE_KEY:
+                              (first_day + timedelta(days=day_index)).strftime(TConsts.MATCHDAYS_DATE_FORMAT),
+                          TConsts.MATCHDAYS_TEAMS_KEY: [],
+                          TConsts.MATCHDAYS_COUPLING_CONSTRAINTS_KEY: [],
+                          TConsts.MATCHDAYS_DECOUPLING_CONSTRAINTS_KEY: []})
+    db[TConsts.MATCHDAYS_COLLECTION_NAME].insert_many(matchdays)
+
+    return player_names, [matchday[TConsts.MATCHDAYS_DATE_KEY] for matchday in matchdays]
+
+
+def measure(collection, filter_objects):
+    """
+    :return: The median latency of a find_one of each of <filter_objects> in <collection>, in microseconds.
+    """
+    latencies = []
+    for _ in range(LOOKUP_REPETITIONS):
+        filter_object = random.choice(filter_objects)
+        start = time.perf_counter()
+        collection.find_one(filter_object)
+        latencies.append(time.perf_counter() - start)
+
+    return statistics.median(latencies) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the database lookups with and without indexes.")
+    parser.add_argument("--port", type=int, default=27017, help="The port in which the MongoDB server runs.")
+    parser.add_argument("--years", type=int, default=5, help="The amount of years of matchdays to seed.")
+    args = parser.parse_args()
+
+    mongo_client = MongoClient("mongodb://localhost:{0}/".format(args.port))
+    mongo_client.drop_database(BENCHMARK_DB_NAME)
+    db = mongo_client[BENCHMARK_DB_NAME]
+
+    try:
+        player_names, dates = seed(db, args.years)
+        print("Seeded {0} matchdays over {1} years".format(len(dates), args.years))
+
+        lookups = [("Matchday by date", TConsts.MATCHDAYS_COLLECTION_NAME,
+                    [{TConsts.MATCHDAYS_DATE_KEY: matchday_date} for matchday_date in dates]),
+                   ("Player by name", TConsts.PLAYERS_COLLECTION_NAME,
+                    [{TConsts.PLAYERS_NAME_KEY: name} for name in player_names]),
+                   ("Ranker by id", TConsts.RANKERS_COLLECTION_NAME,
+                    [{TConsts.USER_ID_KEY: 1000 + i} for i in range(NUM_RANKERS)]),
+                   ("Configuration by key", TConsts.INTERNAL_COLLECTION_NAME,
+                    [{TConsts.INTERNAL_CONFIGURATION_KEY: key} for key in TConsts.TeamGenerationParameters.values()])]
+
+        unindexed_latencies = [measure(db[collection_name], filter_objects)
+                               for _, collection_name, filter_objects in lookups]
+
+        # The DB handler provisions its indexes when it's created
+        db_handler = TFABDBHandler(BENCHMARK_DB_NAME, args.port)
+        print("Created indexes: {0}".format(", ".join(db_handler.created_indexes)))
+        for failed_index in db_handler.failed_indexes:
+            print("Couldn't create index: {0}".format(failed_index))
+        indexed_latencies = [measure(db[collection_name], filter_objects)
+                             for _, collection_name, filter_objects in lookups]
+
+        print("{0:>22} | {1:>14} {2:>14}".format("lookup", "no index (us)", "indexed (us)"))
+        for (name, _, _), unindexed_latency, indexed_latency in zip(lookups, unindexed_latencies, indexed_latencies):
+            print("{0:>22} | {1:>14.1f} {2:>14.1f}".format(name, unindexed_latency, indexed_latency))
+    finally:
+        mongo_client.drop_database(BENCHMARK_DB_NAME)
+
+
+if __name__ == "__main__":
+    main()
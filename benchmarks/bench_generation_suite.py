@@ -0,0 +1,248 @@
+"""
+The team generation benchmark suite.
+Every scenario is a seeded synthetic roster (player and GK counts, DEF/ATT mix, rating distribution, team count and
+coupling/decoupling density), generated under every combination of the TeamGenerationParameters balancing flags.
+For each run, the model build time, the end-to-end generation latency, the node count, the objective (the rating
+spread, lower is better balanced) and the status are recorded into a JSON baseline, and two baselines can be compared
+to flag the runs that got slower or less balanced. The baseline of the reference host is
+benchmarks/baselines/generation_suite.json.
+Run from the repository root:
+    python -m benchmarks.bench_generation_suite run <results path> [--engine CBC] [--time-budget 10]
+    python -m benchmarks.bench_generation_suite compare <baseline path> <results path>
+"""
+import argparse
+import itertools
+import json
+import random
+import statistics
+import sys
+import time
+from tfab_utils.tfab_team_generator import TeamGenerator
+from tfab_utils.tfab_roster import Roster
+from tfab_framework.tfab_consts import Consts as TConsts
+
+# The TeamGenerationParameters flags, and the generate_teams arguments they control
+FLAGS = [("BLC_RATINGS", "balance_team_ratings"), ("BLC_TIERS", "enforce_tiers"), ("BLC_DEFENSE", "enforce_defense"),
+         ("BLC_OFFENSE", "enforce_offense"), ("BLC_ROLES", "enforce_total_roles")]
+RATING_DISTRIBUTIONS = ["uniform", "normal", "skewed"]
+# name, players, GKs, teams, DEF share, ATT share, rating distribution, coupling density, decoupling density
+SCENARIOS = [("small-uniform", 10, 2, 2, 0.3, 0.3, "uniform", 0, 0),
+             ("three-teams-gks", 15, 3, 3, 0.3, 0.3, "uniform", 0, 0),
+             ("three-teams-defensive", 15, 0, 3, 0.6, 0.2, "normal", 0, 0),
+             ("three-teams-offensive", 18, 3, 3, 0.2, 0.6, "normal", 0, 0),
+             ("three-teams-skewed", 18, 0, 3, 0.3, 0.3, "skewed", 0, 0),
+             ("three-teams-coupled", 18, 3, 3, 0.3, 0.3, "uniform", 0.35, 0),
+             ("three-teams-decoupled", 18, 0, 3, 0.3, 0.3, "normal", 0, 0.35),
+             ("four-teams-constrained", 20, 4, 4, 0.3, 0.3, "skewed", 0.2, 0.2)]
+DEFAULT_ENGINE = TConsts.TeamGenerationEngines["CBC"]
+DEFAULT_TIME_BUDGET = 10
+DEFAULT_REPETITIONS = 1
+# A run regresses when its latency grows by more than the relative tolerance and the absolute slack (which keeps
+# the noise of very short runs from being flagged), or when its spread grows by more than the quality tolerance
+DEFAULT_LATENCY_TOLERANCE = 0.25
+DEFAULT_LATENCY_SLACK_MS = 20
+DEFAULT_QUALITY_TOLERANCE = 0.05
+# From the best to the worst, a run regresses when its status gets worse
+STATUS_RANKS = [TConsts.TeamGenerationStatuses["OPTIMAL"], TConsts.TeamGenerationStatuses["FEASIBLE"],
+                TConsts.TeamGenerationStatuses["NOT_SOLVED"], TConsts.TeamGenerationStatuses["INFEASIBLE"]]
+
+
+def generate_roster(num_players, num_gks, defense_share, offense_share, rating_distribution, seed):
+    """
+    :param defense_share: The share of the field players who are DEF, the rest being split between ATT and ALL.
+    :param offense_share: The share of the field players who are ATT.
+    :param rating_distribution: One of RATING_DISTRIBUTIONS. "skewed" has a few stars well above the rest.
+    :return: A reproducible list of player dictionaries sorted by descending rating, the GKs being rated 0.
+    """
+    rng = random.Random(seed)
+    num_field_players = num_players - num_gks
+    num_defenders = round(num_field_players * defense_share)
+    num_attackers = min(round(num_field_players * offense_share), num_field_players - num_defenders)
+    characteristics = [TConsts.PlayerCharacteristics["GOALKEEPER"]] * num_gks + \
+        [TConsts.PlayerCharacteristics["DEFENSIVE"]] * num_defenders + \
+        [TConsts.PlayerCharacteristics["OFFENSIVE"]] * num_attackers + \
+        [TConsts.PlayerCharacteristics["ALLAROUND"]] * (num_field_players - num_defenders - num_attackers)
+    rng.shuffle(characteristics)
+
+    def draw_rating():
+        if rating_distribution == "normal":
+            return min(10, max(1, rng.gauss(6, 1.2)))
+        if rating_distribution == "skewed":
+            return rng.uniform(7.5, 9.5) if rng.random() < 0.2 else rng.uniform(3, 6)
+        return rng.uniform(3, 9)
+
+    roster = [{TConsts.PLAYERS_NAME_KEY: "player{0}".format(i),
+               TConsts.PLAYERS_CHARACTERISTICS_KEY: characteristic,
+               TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY:
+                   0 if characteristic == TConsts.PlayerCharacteristics["GOALKEEPER"] else round(draw_rating(), 2)}
+              for i, characteristic in enumerate(characteristics)]
+    return sorted(roster, key=lambda player: player[TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY], reverse=True)
+
+
+def generate_constraints(roster, num_teams, coupling_density, decoupling_density, seed):
+    """
+    :param coupling_density: The share of the field players who are coupled, in pairs of a stronger and a weaker one.
+    :param decoupling_density: The share of the players who are decoupled, in groups of up to <num_teams>.
+    :return: (A, B) -> A is the coupling constraints, B is the decoupling constraints. No player is in both.
+    """
+    rng = random.Random(seed)
+    field_players = [player[TConsts.PLAYERS_NAME_KEY] for player in roster
+                     if player[TConsts.PLAYERS_CHARACTERISTICS_KEY] != TConsts.PlayerCharacteristics["GOALKEEPER"]]
+    # Each stronger player is paired with a weaker one, as couples of the same tier could never share a team
+    half = len(field_players) // 2
+    pairs = [[field_players[i], field_players[i + half]] for i in range(half)]
+    rng.shuffle(pairs)
+    coupling_constraints = pairs[:int(len(field_players) * coupling_density) // 2]
+    coupled_players = {name for pair in coupling_constraints for name in pair}
+
+    free_players = [player[TConsts.PLAYERS_NAME_KEY] for player in roster
+                    if player[TConsts.PLAYERS_NAME_KEY] not in coupled_players]
+    rng.shuffle(free_players)
+    decoupled_players = free_players[:int(len(roster) * decoupling_density)]
+    group_size = min(num_teams, 3)
+    decoupling_constraints = [decoupled_players[i:i + group_size]
+                              for i in range(0, len(decoupled_players), group_size)
+                              if len(decoupled_players[i:i + group_size]) > 1]
+    return coupling_constraints, decoupling_constraints
+
+
+def get_flag_combinations():
+    """
+    :return: Every combination of the FLAGS, each as a dictionary of the generate_teams arguments.
+    """
+    return [{argument: enabled for (_, argument), enabled in zip(FLAGS, values)}
+            for values in itertools.product([False, True], repeat=len(FLAGS))]
+
+
+def get_flags_name(flags):
+    """
+    :return: The TeamGenerationParameters codes of the enabled <flags>, "none" if none of them is.
+    """
+    codes = [TConsts.TeamGenerationParameters[parameter] for parameter, argument in FLAGS if flags[argument]]
+    return "+".join(codes) if codes else "none"
+
+
+def run_scenario(scenario, flags, engine, time_budget, repetitions):
+    """
+    :return: The result dictionary of generating the lineup of <scenario> under <flags>.
+    """
+    name, num_players, num_gks, num_teams, defense_share, offense_share, rating_distribution, coupling_density, \
+        decoupling_density = scenario
+    seed = sum(map(ord, name))
+    roster = generate_roster(num_players, num_gks, defense_share, offense_share, rating_distribution, seed)
+    coupling_constraints, decoupling_constraints = generate_constraints(roster, num_teams, coupling_density,
+                                                                        decoupling_density, seed)
+
+    build_times = []
+    latencies = []
+    for repetition in range(repetitions):
+        start = time.perf_counter()
+        TeamGenerator._build_milp_model(Roster(roster), num_teams, coupling_constraints, decoupling_constraints,
+                                        break_symmetry=True, **flags)
+        build_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        teams, metadata = TeamGenerator.generate_teams(list(roster), num_teams=num_teams,
+                                                       coupling_constraints=coupling_constraints,
+                                                       decoupling_constraints=decoupling_constraints,
+                                                       engine=engine, break_symmetry=True, time_budget=time_budget,
+                                                       return_metadata=True, seed=repetition, **flags)
+        latencies.append(time.perf_counter() - start)
+
+    build_ms = statistics.median(build_times) * 1000
+    latency_ms = statistics.median(latencies) * 1000
+    return {"Scenario": name,
+            "Flags": get_flags_name(flags),
+            "BuildMs": round(build_ms, 3),
+            "SolveMs": round(max(0, latency_ms - build_ms), 3),
+            "LatencyMs": round(latency_ms, 3),
+            "Nodes": metadata[TConsts.GENERATION_METADATA_NODES_KEY],
+            "Objective": metadata[TConsts.GENERATION_METADATA_OBJECTIVE_KEY],
+            "Status": metadata[TConsts.GENERATION_METADATA_STATUS_KEY]}
+
+
+def run(engine=DEFAULT_ENGINE, time_budget=DEFAULT_TIME_BUDGET, repetitions=DEFAULT_REPETITIONS, scenarios=None):
+    """
+    Runs every scenario under every flag combination.
+    :param scenarios: The scenarios to run, all the SCENARIOS if None.
+    :return: The results dictionary, as stored in a baseline.
+    """
+    results = []
+    for scenario in scenarios if scenarios is not None else SCENARIOS:
+        for flags in get_flag_combinations():
+            result = run_scenario(scenario, flags, engine, time_budget, repetitions)
+            print("{0:>24} {1:>18} | {2:>9.2f} {3:>10.2f} {4:>8} {5:>9} {6}".format(
+                result["Scenario"], result["Flags"], result["BuildMs"], result["LatencyMs"], result["Nodes"],
+                "-" if result["Objective"] is None else "{0:.3f}".format(result["Objective"]), result["Status"]))
+            results.append(result)
+
+    return {"Engine": engine, "TimeBudget": time_budget, "Repetitions": repetitions, "Results": results}
+
+
+def compare(baseline, current, latency_tolerance=DEFAULT_LATENCY_TOLERANCE, latency_slack_ms=DEFAULT_LATENCY_SLACK_MS,
+            quality_tolerance=DEFAULT_QUALITY_TOLERANCE):
+    """
+    :return: A list of the regressions of <current> relative to <baseline>, each a human readable line. The runs that
+    only one of them has are ignored.
+    """
+    baseline_results = {(result["Scenario"], result["Flags"]): result for result in baseline["Results"]}
+    regressions = []
+    for result in current["Results"]:
+        key = (result["Scenario"], result["Flags"])
+        if key not in baseline_results:
+            continue
+        previous = baseline_results[key]
+        description = "{0} [{1}]".format(*key)
+
+        if result["LatencyMs"] > previous["LatencyMs"] * (1 + latency_tolerance) + latency_slack_ms:
+            regressions.append("{0}: latency {1:.1f}ms -> {2:.1f}ms".format(description, previous["LatencyMs"],
+                                                                            result["LatencyMs"]))
+        if STATUS_RANKS.index(result["Status"]) > STATUS_RANKS.index(previous["Status"]):
+            regressions.append("{0}: status {1} -> {2}".format(description, previous["Status"], result["Status"]))
+        elif result["Objective"] is not None and previous["Objective"] is not None and \
+                result["Objective"] > previous["Objective"] + quality_tolerance:
+            regressions.append("{0}: spread {1:.3f} -> {2:.3f}".format(description, previous["Objective"],
+                                                                       result["Objective"]))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="The team generation benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Run the suite and store its results")
+    run_parser.add_argument("results_path")
+    run_parser.add_argument("--engine", default=DEFAULT_ENGINE, choices=list(TConsts.TeamGenerationEngines.values()))
+    run_parser.add_argument("--time-budget", type=float, default=DEFAULT_TIME_BUDGET)
+    run_parser.add_argument("--repetitions", type=int, default=DEFAULT_REPETITIONS)
+    run_parser.add_argument("--scenario", action="append", help="Only run this scenario (may be repeated)")
+    compare_parser = commands.add_parser("compare", help="Flag the regressions of results relative to a baseline")
+    compare_parser.add_argument("baseline_path")
+    compare_parser.add_argument("results_path")
+    compare_parser.add_argument("--latency-tolerance", type=float, default=DEFAULT_LATENCY_TOLERANCE)
+    compare_parser.add_argument("--latency-slack-ms", type=float, default=DEFAULT_LATENCY_SLACK_MS)
+    compare_parser.add_argument("--quality-tolerance", type=float, default=DEFAULT_QUALITY_TOLERANCE)
+    arguments = parser.parse_args()
+
+    if arguments.command == "run":
+        scenarios = [scenario for scenario in SCENARIOS
+                     if arguments.scenario is None or scenario[0] in arguments.scenario]
+        results = run(arguments.engine, arguments.time_budget, arguments.repetitions, scenarios)
+        with open(arguments.results_path, "w") as results_file:
+            json.dump(results, results_file, indent=4)
+        return 0
+
+    with open(arguments.baseline_path, "r") as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(arguments.results_path, "r") as results_file:
+        current = json.load(results_file)
+    regressions = compare(baseline, current, arguments.latency_tolerance, arguments.latency_slack_ms,
+                          arguments.quality_tolerance)
+    for regression in regressions:
+        print(regression)
+    print("{0} regressions in {1} runs".format(len(regressions), len(current["Results"])))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
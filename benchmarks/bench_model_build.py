@@ -0,0 +1,51 @@
+"""
+Measures the time it takes to build the team generation MILP, separately from the time it takes CBC to solve it.
+Run from the repository root: python -m benchmarks.bench_model_build
+"""
+import time
+from pulp import PULP_CBC_CMD
+from tfab_utils.tfab_team_generator import TeamGenerator
+from tfab_utils.tfab_roster import Roster
+from benchmarks.bench_symmetry_breaking import generate_roster
+
+# <amount of players, amount of teams> combinations to measure
+ROSTER_SIZES = [(12, 2), (18, 3), (24, 4), (40, 5), (60, 6), (80, 8), (100, 8)]
+BUILD_REPETITIONS = 5
+SOLVE_TIME_LIMIT = 10
+
+
+def build(roster, num_teams):
+    """
+    :return: (A, B) -> A is the built LpProblem, B is the best wall time of building it.
+    """
+    best_time = None
+    for _ in range(BUILD_REPETITIONS):
+        start = time.perf_counter()
+        prob, _, _ = TeamGenerator._build_milp_model(Roster(roster), num_teams, [], [], balance_team_ratings=True,
+                                                    enforce_tiers=True, enforce_defense=True, enforce_offense=True,
+                                                    enforce_total_roles=True, break_symmetry=True)
+        elapsed = time.perf_counter() - start
+        best_time = elapsed if best_time is None else min(best_time, elapsed)
+
+    return prob, best_time
+
+
+def main():
+    print("{0:>8} {1:>6} | {2:>9} {3:>9} | {4:>11} {5:>11}".format(
+        "players", "teams", "rows", "nonzeros", "build (ms)", "solve (s)"))
+
+    for num_players, num_teams in ROSTER_SIZES:
+        roster = generate_roster(num_players, seed=num_players * num_teams)
+        prob, build_time = build(roster, num_teams)
+        nonzeros = sum(len(constraint) for constraint in prob.constraints.values())
+
+        start = time.perf_counter()
+        prob.solve(PULP_CBC_CMD(msg=False, timeLimit=SOLVE_TIME_LIMIT))
+        solve_time = time.perf_counter() - start
+
+        print("{0:>8} {1:>6} | {2:>9} {3:>9} | {4:>11.2f} {5:>11.2f}".format(
+            num_players, num_teams, len(prob.constraints), nonzeros, build_time * 1000, solve_time))
+
+
+if __name__ == "__main__":
+    main()
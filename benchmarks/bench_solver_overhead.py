@@ -0,0 +1,72 @@
+"""
+Measures the fixed overhead of handing a model to CBC, with a CBC process spawned per solve (writing the model, the
+solution and the log to temporary files) and with the persistent CBC worker of SolverBackends.
+The overhead is measured on a trivial one-variable model, whose solve time is negligible, and the effect on real
+team generation models is shown next to it.
+Run from the repository root: python -m benchmarks.bench_solver_overhead
+"""
+import statistics
+import time
+from pulp import LpProblem, LpVariable, LpMinimize
+from tfab_utils.tfab_team_generator import TeamGenerator
+from tfab_utils.tfab_roster import Roster
+from tfab_utils.tfab_solver_backends import SolverBackends
+from tfab_framework.tfab_consts import Consts as TConsts
+from benchmarks.bench_symmetry_breaking import generate_roster
+
+# <amount of players, amount of teams> combinations to measure, None for the trivial model
+ROSTER_SIZES = [None, (12, 2), (15, 3), (18, 3)]
+SOLVE_REPETITIONS = 30
+
+
+def build(roster_size):
+    """
+    :return: A fresh LpProblem of <roster_size>, or the trivial model if it's None.
+    """
+    if roster_size is None:
+        prob = LpProblem("Trivial", LpMinimize)
+        x = LpVariable("x", 0, 10, cat="Integer")
+        prob += x
+        prob += x >= 2.5
+        return prob
+
+    num_players, num_teams = roster_size
+    roster = generate_roster(num_players, seed=num_players * num_teams)
+    prob, _, _ = TeamGenerator._build_milp_model(Roster(roster), num_teams, [], [], balance_team_ratings=True,
+                                                enforce_tiers=True, enforce_defense=False, enforce_offense=False,
+                                                enforce_total_roles=False, break_symmetry=True)
+    return prob
+
+
+def measure(roster_size, persistent):
+    """
+    :return: The median wall time of solving the model of <roster_size>, in milliseconds.
+    """
+    latencies = []
+    for _ in range(SOLVE_REPETITIONS):
+        prob = build(roster_size)
+        start = time.perf_counter()
+        SolverBackends.solve(prob, TConsts.TeamGenerationEngines["CBC"], persistent=persistent)
+        latencies.append(time.perf_counter() - start)
+        # Leave the worker time to start its next CBC process, as it has between real requests
+        time.sleep(0.01)
+
+    return statistics.median(latencies) * 1000
+
+
+def main():
+    # Start the worker up front, so the first measured solve doesn't pay for it
+    SolverBackends.get_cbc_worker().start()
+    print("{0:>8} {1:>6} | {2:>16} {3:>16} | {4:>10}".format(
+        "players", "teams", "per-solve (ms)", "persistent (ms)", "saved (ms)"))
+
+    for roster_size in ROSTER_SIZES:
+        per_solve_time = measure(roster_size, persistent=False)
+        persistent_time = measure(roster_size, persistent=True)
+        num_players, num_teams = roster_size if roster_size is not None else ("trivial", "-")
+        print("{0:>8} {1:>6} | {2:>16.2f} {3:>16.2f} | {4:>10.2f}".format(
+            num_players, num_teams, per_solve_time, persistent_time, per_solve_time - persistent_time))
+
+
+if __name__ == "__main__":
+    main()
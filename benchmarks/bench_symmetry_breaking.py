@@ -0,0 +1,75 @@
+"""
+Compares the team generation MILP with and without symmetry breaking.
+Run from the repository root: python -m benchmarks.bench_symmetry_breaking
+"""
+import os
+import re
+import random
+import tempfile
+import time
+from pulp import PULP_CBC_CMD, value
+from tfab_utils.tfab_team_generator import TeamGenerator
+from tfab_utils.tfab_roster import Roster
+from tfab_framework.tfab_consts import Consts as TConsts
+
+# <amount of players, amount of teams> combinations to measure
+ROSTER_SIZES = [(12, 2), (15, 3), (18, 3), (16, 4), (20, 4), (20, 5), (25, 5)]
+REPETITIONS = 3
+
+
+def generate_roster(num_players, seed):
+    """
+    :return: A sorted list of player dictionaries with random field characteristics and ratings.
+    """
+    rng = random.Random(seed)
+    roster = [{TConsts.PLAYERS_NAME_KEY: "player{0}".format(i),
+               TConsts.PLAYERS_CHARACTERISTICS_KEY: rng.choice(list(TConsts.PlayerCharacteristics.values())[1:]),
+               TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY: round(rng.uniform(3, 9), 2)}
+              for i in range(num_players)]
+    return sorted(roster, key=lambda player: player[TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY], reverse=True)
+
+
+def solve(roster, num_teams, break_symmetry, seed):
+    """
+    :return: (A, B, C) -> A is the optimal objective, B is the amount of nodes CBC enumerated, C is the wall time.
+    """
+    prob, _, _ = TeamGenerator._build_milp_model(Roster(roster), num_teams, [], [], balance_team_ratings=True,
+                                                enforce_tiers=True, enforce_defense=True, enforce_offense=True,
+                                                enforce_total_roles=True, break_symmetry=break_symmetry)
+    log_file, log_path = tempfile.mkstemp(suffix=".log")
+    os.close(log_file)
+
+    try:
+        start = time.perf_counter()
+        prob.solve(PULP_CBC_CMD(msg=False, logPath=log_path, options=[f"RandomS {seed}"]))
+        elapsed = time.perf_counter() - start
+
+        with open(log_path, "r") as log:
+            nodes = re.search(r"Enumerated nodes:\s+(\d+)", log.read())
+    finally:
+        os.remove(log_path)
+
+    return value(prob.objective), int(nodes.group(1)) if nodes else 0, elapsed
+
+
+def main():
+    print("{0:>8} {1:>6} | {2:>10} {3:>10} {4:>9} | {5:>10} {6:>10} {7:>9}".format(
+        "players", "teams", "objective", "nodes", "seconds", "objective", "nodes", "seconds"))
+    print("{0:>15} | {1:^31} | {2:^31}".format("", "plain", "symmetry breaking"))
+
+    for num_players, num_teams in ROSTER_SIZES:
+        results = {False: [], True: []}
+        for repetition in range(REPETITIONS):
+            roster = generate_roster(num_players, seed=repetition)
+            for break_symmetry in results:
+                results[break_symmetry].append(solve(roster, num_teams, break_symmetry, seed=repetition))
+
+        row = [num_players, num_teams]
+        for break_symmetry in [False, True]:
+            objectives, nodes, seconds = zip(*results[break_symmetry])
+            row += [sum(objectives) / REPETITIONS, sum(nodes) / REPETITIONS, sum(seconds) / REPETITIONS]
+        print("{0:>8} {1:>6} | {2:>10.3f} {3:>10.0f} {4:>9.3f} | {5:>10.3f} {6:>10.0f} {7:>9.3f}".format(*row))
+
+
+if __name__ == '__main__':
+    main()
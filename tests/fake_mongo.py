@@ -0,0 +1,349 @@
+"""
+An in-memory stand-in for the parts of a MongoDB server that TFABDBHandler uses, for testing the handler without a
+running MongoDB. Only the query and update operators the handler relies on are supported.
+"""
+import copy
+from collections import Counter
+from types import SimpleNamespace
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure, CollectionInvalid
+
+MISSING = object()
+
+
+def get_path(document, path):
+    """
+    :return: The value at the dotted <path> of <document>, MISSING if there isn't one.
+    """
+    value = document
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return MISSING
+        value = value[key]
+    return value
+
+
+def set_path(document, path, value):
+    keys = path.split(".")
+    for key in keys[:-1]:
+        document = document.setdefault(key, {})
+    document[keys[-1]] = value
+
+
+def unset_path(document, path):
+    keys = path.split(".")
+    for key in keys[:-1]:
+        document = document.get(key, {})
+    document.pop(keys[-1], None)
+
+
+def matches(document, filter_object):
+    """
+    :return: True if <document> matches <filter_object> - equality, $in and $exists conditions.
+    """
+    for path, condition in (filter_object or {}).items():
+        value = get_path(document, path)
+        if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            for operator, operand in condition.items():
+                if operator == "$in":
+                    if value is MISSING or value not in operand:
+                        return False
+                elif operator == "$exists":
+                    if (value is not MISSING) != bool(operand):
+                        return False
+                else:
+                    raise NotImplementedError(operator)
+        elif value is MISSING or value != condition:
+            return False
+    return True
+
+
+def apply_update(document, update_operation, inserting=False):
+    """
+    Applies the $set, $unset, $inc, $push (with $each) and $setOnInsert operators of <update_operation> to <document>.
+    """
+    for operator, fields in update_operation.items():
+        for path, operand in fields.items():
+            if operator == "$set":
+                set_path(document, path, copy.deepcopy(operand))
+            elif operator == "$unset":
+                unset_path(document, path)
+            elif operator == "$inc":
+                current = get_path(document, path)
+                set_path(document, path, (0 if current is MISSING else current) + operand)
+            elif operator == "$push":
+                current = get_path(document, path)
+                values = operand["$each"] if isinstance(operand, dict) and "$each" in operand else [operand]
+                set_path(document, path, ([] if current is MISSING else current) + copy.deepcopy(values))
+            elif operator == "$setOnInsert":
+                if inserting:
+                    set_path(document, path, copy.deepcopy(operand))
+            else:
+                raise NotImplementedError(operator)
+
+
+def project(document, projection):
+    if not projection:
+        return copy.deepcopy(document)
+    if any(value for key, value in projection.items() if key != "_id"):
+        projected = {key: copy.deepcopy(document[key]) for key, value in projection.items()
+                     if value and key in document}
+        if projection.get("_id", 1) and "_id" in document:
+            projected["_id"] = document["_id"]
+        return projected
+    return {key: copy.deepcopy(value) for key, value in document.items() if projection.get(key, 1)}
+
+
+class FakeCursor(object):
+    def __init__(self, documents):
+        self.__documents = documents
+        self.__skip = 0
+
+    def sort(self, key, direction=1):
+        self.__documents = sorted(self.__documents, key=lambda document: get_path(document, key),
+                                  reverse=direction < 0)
+        return self
+
+    def skip(self, amount):
+        self.__skip = amount
+        return self
+
+    def __iter__(self):
+        return iter(self.__documents[self.__skip:])
+
+
+class FakeCollection(object):
+    def __init__(self, name):
+        self.name = name
+        self.documents = []
+        self.indexes = {"_id_": {"key": [("_id", 1)]}}
+        # The amount of calls to every operation, and the operations set to fail on their next call
+        self.calls = Counter()
+        self.__failures = Counter()
+
+    def fail_next(self, operation):
+        """
+        Makes the next call to <operation> raise an OperationFailure, as if the server failed it.
+        """
+        self.__failures[operation] += 1
+
+    def __record(self, operation):
+        self.calls[operation] += 1
+        if self.__failures[operation]:
+            self.__failures[operation] -= 1
+            raise OperationFailure("Injected failure of {0}.{1}".format(self.name, operation))
+
+    def __check_unique(self, document, ignored=None):
+        for index_name, index in self.indexes.items():
+            if not index.get("unique"):
+                continue
+            key = [get_path(document, path) for path, _ in index["key"]]
+            for other in self.documents:
+                if other is not ignored and other is not document and \
+                   [get_path(other, path) for path, _ in index["key"]] == key:
+                    raise DuplicateKeyError("E11000 duplicate key error, index: {0}".format(index_name))
+
+    def __insert(self, document):
+        document.setdefault("_id", ObjectId())
+        stored = copy.deepcopy(document)
+        self.__check_unique(stored)
+        self.documents.append(stored)
+        return stored
+
+    def __find(self, filter_object):
+        return [document for document in self.documents if matches(document, filter_object)]
+
+    def __upsert(self, filter_object, update_operation):
+        document = {path: copy.deepcopy(condition) for path, condition in filter_object.items()
+                    if not path.startswith("$") and not (isinstance(condition, dict) and
+                                                         any(key.startswith("$") for key in condition))}
+        apply_update(document, update_operation, inserting=True)
+        return self.__insert(document)
+
+    def __update(self, document, update_operation):
+        """
+        :return: True if <document> was modified.
+        """
+        updated = copy.deepcopy(document)
+        apply_update(updated, update_operation)
+        if updated == document:
+            return False
+        self.__check_unique(updated, ignored=document)
+        document.clear()
+        document.update(updated)
+        return True
+
+    def index_information(self):
+        self.__record("index_information")
+        return copy.deepcopy(self.indexes)
+
+    def create_index(self, keys, name=None, unique=False, session=None):
+        self.__record("create_index")
+        name = name or "_".join("{0}_{1}".format(key, direction) for key, direction in keys)
+        index = {"key": list(keys)}
+        if unique:
+            index["unique"] = True
+        if name in self.indexes:
+            if self.indexes[name] != index:
+                raise OperationFailure("An index with the same name and different options exists: " + name)
+            return name
+
+        self.indexes[name] = index
+        try:
+            for document in self.documents:
+                self.__check_unique(document)
+        except DuplicateKeyError:
+            del self.indexes[name]
+            raise
+        return name
+
+    def drop_index(self, name, session=None):
+        self.__record("drop_index")
+        del self.indexes[name]
+
+    def insert_one(self, document, session=None):
+        self.__record("insert_one")
+        return SimpleNamespace(inserted_id=self.__insert(document)["_id"])
+
+    def insert_many(self, documents, session=None):
+        self.__record("insert_many")
+        return SimpleNamespace(inserted_ids=[self.__insert(document)["_id"] for document in documents])
+
+    def find(self, filter_object=None, projection=None, session=None):
+        self.__record("find")
+        return FakeCursor([project(document, projection) for document in self.__find(filter_object)])
+
+    def find_one(self, filter_object=None, projection=None, session=None):
+        self.__record("find_one")
+        found = self.__find(filter_object)
+        return project(found[0], projection) if found else None
+
+    def count_documents(self, filter_object, session=None):
+        self.__record("count_documents")
+        return len(self.__find(filter_object))
+
+    def distinct(self, key, filter_object=None, session=None):
+        self.__record("distinct")
+        values = []
+        for document in self.__find(filter_object):
+            value = get_path(document, key)
+            if value is not MISSING and value not in values:
+                values.append(value)
+        return values
+
+    def update_one(self, filter_object, update_operation, upsert=False, session=None):
+        self.__record("update_one")
+        found = self.__find(filter_object)
+        if found:
+            return SimpleNamespace(matched_count=1, modified_count=int(self.__update(found[0], update_operation)),
+                                   upserted_id=None)
+        if upsert:
+            return SimpleNamespace(matched_count=0, modified_count=0,
+                                   upserted_id=self.__upsert(filter_object, update_operation)["_id"])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    def bulk_write(self, requests, ordered=True, session=None):
+        self.__record("bulk_write")
+        matched_count = modified_count = upserted_count = 0
+        for request in requests:
+            found = self.__find(request._filter)
+            if found:
+                matched_count += 1
+                modified_count += int(self.__update(found[0], request._doc))
+            elif request._upsert:
+                self.__upsert(request._filter, request._doc)
+                upserted_count += 1
+        return SimpleNamespace(matched_count=matched_count, modified_count=modified_count,
+                               upserted_count=upserted_count)
+
+    def find_one_and_update(self, filter_object, update_operation, upsert=False,
+                            return_document=ReturnDocument.BEFORE, session=None):
+        self.__record("find_one_and_update")
+        found = self.__find(filter_object)
+        if not found:
+            if not upsert:
+                return None
+            document = self.__upsert(filter_object, update_operation)
+            return copy.deepcopy(document) if return_document == ReturnDocument.AFTER else None
+
+        previous = copy.deepcopy(found[0])
+        self.__update(found[0], update_operation)
+        return copy.deepcopy(found[0]) if return_document == ReturnDocument.AFTER else previous
+
+    def find_one_and_replace(self, filter_object, replacement, upsert=False,
+                             return_document=ReturnDocument.BEFORE, session=None):
+        self.__record("find_one_and_replace")
+        found = self.__find(filter_object)
+        if not found:
+            if not upsert:
+                return None
+            document = self.__insert(dict(replacement))
+            return copy.deepcopy(document) if return_document == ReturnDocument.AFTER else None
+
+        previous = copy.deepcopy(found[0])
+        replaced = dict(copy.deepcopy(replacement), _id=previous["_id"])
+        self.__check_unique(replaced, ignored=found[0])
+        found[0].clear()
+        found[0].update(replaced)
+        return copy.deepcopy(found[0]) if return_document == ReturnDocument.AFTER else previous
+
+    def find_one_and_delete(self, filter_object, session=None):
+        self.__record("find_one_and_delete")
+        found = self.__find(filter_object)
+        if not found:
+            return None
+        self.documents.remove(found[0])
+        return found[0]
+
+    def delete_one(self, filter_object, session=None):
+        self.__record("delete_one")
+        found = self.__find(filter_object)
+        if found:
+            self.documents.remove(found[0])
+        return SimpleNamespace(deleted_count=len(found[:1]))
+
+    def delete_many(self, filter_object, session=None):
+        self.__record("delete_many")
+        found = self.__find(filter_object)
+        self.documents = [document for document in self.documents if document not in found]
+        return SimpleNamespace(deleted_count=len(found))
+
+
+class FakeDatabase(object):
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, collection_name):
+        if collection_name not in self.collections:
+            self.collections[collection_name] = FakeCollection(collection_name)
+        return self.collections[collection_name]
+
+    def list_collection_names(self):
+        return list(self.collections)
+
+    def create_collection(self, collection_name):
+        if collection_name in self.collections:
+            raise CollectionInvalid("Collection {0} already exists".format(collection_name))
+        return self[collection_name]
+
+
+class FakeMongoClient(object):
+    """
+    Stands in for a MongoClient connected to a standalone server. It's installed in place of the MongoClient class
+    (calling it returns itself), so every TFABDBHandler created shares its databases, like processes sharing a server.
+    """
+    def __init__(self):
+        self.databases = {}
+        self.topology_description = SimpleNamespace(topology_type_name="Single")
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __getitem__(self, db_name):
+        if db_name not in self.databases:
+            self.databases[db_name] = FakeDatabase()
+        return self.databases[db_name]
+
+    def close(self):
+        pass
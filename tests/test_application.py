@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from telegram import Update, Chat, MessageEntity
+from telegram.ext import ApplicationBuilder, ConversationHandler
+from telegram.request import BaseRequest
+from tfab_framework.application import tfab_app
+from tfab_framework.application.menus.admin_handlers import MatchdaysMenuHandlers
+from tfab_framework.application.menus.menu_utils import CommonHandlers
+from tfab_framework.tfab_async_database_handler import TFABAsyncDBHandler
+from tests.test_async_database_handler import SlowDBHandler
+
+
+class OfflineRequest(BaseRequest):
+    """
+    Answers the Bot API requests of an application without sending them - getMe with a bot, anything else with True.
+    """
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        result = {"id": 1, "is_bot": True, "first_name": "TFAB", "username": "tfab_bot"} \
+            if url.endswith("getMe") else True
+        return 200, json.dumps({"ok": True, "result": result}).encode("utf-8")
+
+
+def create_start_update(update_id, user_id, bot):
+    """
+    :return: An update of <user_id> sending /start in their private chat.
+    """
+    return Update.de_json({"update_id": update_id,
+                           "message": {"message_id": update_id, "date": int(time.time()), "text": "/start",
+                                       "chat": {"id": user_id, "type": Chat.PRIVATE},
+                                       "from": {"id": user_id, "first_name": "user", "is_bot": False},
+                                       "entities": [{"type": MessageEntity.BOT_COMMAND, "offset": 0,
+                                                     "length": len("/start")}]}}, bot)
+
+
+class TestApplication(object):
+    def test_slow_db_call_does_not_delay_other_users(self, monkeypatch):
+        """
+        While one user's handler awaits a slow DB call, the updates of other users are handled.
+        """
+        async_db = TFABAsyncDBHandler(SlowDBHandler(0.5), max_concurrency=2)
+        handled_times = {}
+
+        async def entrypoint_handler(update, context):
+            if update.effective_user.id == 1:
+                await async_db.get_matchday("01-01-2024")
+            handled_times[update.effective_user.id] = time.perf_counter()
+            return ConversationHandler.END
+
+        built_applications = []
+
+        class OfflineApplicationBuilder(ApplicationBuilder):
+            """
+            Builds the application of TFABApplication with offline requests, keeping the built application.
+            """
+            def __init__(self):
+                super().__init__()
+                self.request(OfflineRequest()).get_updates_request(OfflineRequest())
+
+            def build(self):
+                built_applications.append(super().build())
+                return built_applications[-1]
+
+        monkeypatch.setattr(CommonHandlers, "entrypoint_handler", staticmethod(entrypoint_handler))
+        monkeypatch.setattr(tfab_app, "ApplicationBuilder", OfflineApplicationBuilder)
+        tfab_app.TFABApplication(SimpleNamespace(TELEGRAM_BOT_TOKEN="1:TFAB"), None)
+        application = built_applications[0]
+
+        async def run():
+            async with application:
+                await application.start()
+                start = time.perf_counter()
+                await application.update_queue.put(create_start_update(1, 1, application.bot))
+                await application.update_queue.put(create_start_update(2, 2, application.bot))
+                while len(handled_times) < 2 and time.perf_counter() - start < 5:
+                    await asyncio.sleep(0.01)
+                await application.stop()
+                return start
+
+        try:
+            start = asyncio.run(run())
+        finally:
+            async_db.shutdown()
+
+        assert handled_times[2] - start < 0.25
+        assert handled_times[1] - start >= 0.5
+
+    def test_progress_reporter_skips_unchanged_texts(self):
+        """
+        The progress message is only edited when its text changes, since Telegram rejects edits to the same text.
+        """
+        class RecordingMessage(object):
+            def __init__(self, text):
+                self.text = text
+                self.edits = []
+
+            async def edit_text(self, text):
+                self.edits.append(text)
+
+        progress_message = RecordingMessage("מחשב..")
+        report_progress = MatchdaysMenuHandlers.get_progress_reporter(progress_message)
+
+        async def report():
+            for queue_position, elapsed_time in [(2, 5), (2, 10), (1, 15), (0, 20), (0, 20.2), (0, 25)]:
+                await report_progress(queue_position, elapsed_time)
+
+        asyncio.run(report())
+
+        assert progress_message.edits == ["ממתין בתור לחישוב, מקום 2..", "ממתין בתור לחישוב, מקום 1..",
+                                          "עדיין מחשב.. (20 שניות)", "עדיין מחשב.. (25 שניות)"]
@@ -0,0 +1,61 @@
+import asyncio
+import time
+import pytest
+from tfab_framework.tfab_exception import TFABDatabaseError
+from tfab_framework.tfab_async_database_handler import TFABAsyncDBHandler
+
+
+class SlowDBHandler(object):
+    """
+    Stands in for TFABDBHandler, with a lookup that blocks like a slow query.
+    """
+    def __init__(self, query_time):
+        self.query_time = query_time
+
+    def get_matchday(self, date):
+        time.sleep(self.query_time)
+        return {"Date": date}
+
+
+class TestAsyncDBHandler(object):
+    def test_calls_do_not_block_the_event_loop(self):
+        """
+        Blocking DB calls run concurrently, while the event loop keeps running other coroutines.
+        """
+        async_db = TFABAsyncDBHandler(SlowDBHandler(0.2), max_concurrency=4)
+        ticks = []
+
+        async def tick():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.02)
+
+        async def run():
+            start = time.perf_counter()
+            results = await asyncio.gather(async_db.get_matchday("01-01-2024"), async_db.get_matchday("02-01-2024"),
+                                           tick())
+            return results, time.perf_counter() - start
+
+        try:
+            (first, second, _), elapsed_time = asyncio.run(run())
+        finally:
+            async_db.shutdown()
+
+        assert first == {"Date": "01-01-2024"} and second == {"Date": "02-01-2024"}
+        assert elapsed_time < 0.35
+        assert len(ticks) == 5 and ticks[-1] - ticks[0] < 0.15
+
+    def test_calls_time_out(self):
+        """
+        A call that exceeds its timeout raises a TFABDatabaseError, and only the methods of TFABDBHandler are offered.
+        """
+        async_db = TFABAsyncDBHandler(SlowDBHandler(0.3), max_concurrency=1, call_timeout=5)
+
+        try:
+            with pytest.raises(TFABDatabaseError):
+                asyncio.run(async_db.get_matchday("01-01-2024", call_timeout=0.05))
+        finally:
+            async_db.shutdown()
+
+        with pytest.raises(AttributeError):
+            async_db.drop_database
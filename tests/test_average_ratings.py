@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from tfab_framework.tfab_database_handler import TFABDBHandler
+
+
+def get_reference_average(rating_list, dev_threshold):
+    """
+    :return: The average of <rating_list> without its outliers, computed for a single player at a time.
+    """
+    if not rating_list:
+        return 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_scores = np.abs((rating_list - np.mean(rating_list)) / np.std(rating_list))
+    filtered_ratings = np.array(rating_list)[~(z_scores > dev_threshold)]
+    return (sum(filtered_ratings) / len(filtered_ratings)) if len(filtered_ratings) > 0 else 0
+
+
+class TestAverageRatings(object):
+    @pytest.mark.parametrize("dev_threshold", [0.5, 1, 1.5, 2])
+    def test_matches_per_player_filtering(self, dev_threshold):
+        """
+        The vectorized filtering of the whole ranker x player matrix matches filtering every player on their own,
+        including players nobody ranked and players with a single or equal ratings.
+        """
+        rng = np.random.default_rng(17)
+        rating_matrix = np.round(rng.uniform(1, 10, size=(8, 30)), 1)
+        rating_matrix[rng.random(rating_matrix.shape) < 0.3] = np.nan
+        rating_matrix[:, 0] = np.nan
+        rating_matrix[1:, 1] = np.nan
+        rating_matrix[:, 2] = 7
+
+        averages = TFABDBHandler.filter_average_ratings(rating_matrix, dev_threshold)
+
+        for player_index in range(rating_matrix.shape[1]):
+            column = rating_matrix[:, player_index]
+            rating_list = column[~np.isnan(column)].tolist()
+            assert averages[player_index] == pytest.approx(get_reference_average(rating_list, dev_threshold))
+        assert averages[0] == 0 and averages[2] == 7
+
+    def test_rating_statistics_match_per_player_statistics(self):
+        """
+        The statistics stored with the materialized ratings (and filtered by) match every player's own ratings.
+        """
+        rng = np.random.default_rng(23)
+        rating_matrix = np.round(rng.uniform(1, 10, size=(6, 20)), 1)
+        rating_matrix[rng.random(rating_matrix.shape) < 0.3] = np.nan
+        rating_matrix[:, 0] = np.nan
+
+        rating_counts, means, stds = TFABDBHandler.get_rating_statistics(rating_matrix)
+
+        for player_index in range(rating_matrix.shape[1]):
+            column = rating_matrix[:, player_index]
+            rating_list = column[~np.isnan(column)]
+            assert rating_counts[player_index] == len(rating_list)
+            assert means[player_index] == pytest.approx(np.mean(rating_list) if len(rating_list) else 0)
+            assert stds[player_index] == pytest.approx(np.std(rating_list) if len(rating_list) else 0)
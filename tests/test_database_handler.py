@@ -0,0 +1,356 @@
+import pytest
+from tfab_framework import tfab_database_handler
+from tfab_framework.tfab_consts import Consts as TConsts
+from tfab_framework.tfab_database_handler import TFABDBHandler
+from tfab_framework.tfab_exception import TFABDatabaseError
+from tests.fake_mongo import FakeMongoClient
+
+DB_NAME = "TFABTest"
+GK = TConsts.PlayerCharacteristics["GOALKEEPER"]
+ALL = TConsts.PlayerCharacteristics["ALLAROUND"]
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    """
+    :return: A FakeMongoClient, which every TFABDBHandler created during the test connects to.
+    """
+    client = FakeMongoClient()
+    monkeypatch.setattr(tfab_database_handler, "MongoClient", client)
+    return client
+
+
+def create_db_handler(configuration_poll_interval=None):
+    """
+    :return: A TFABDBHandler with the configuration the rating computations need.
+    """
+    db_handler = TFABDBHandler(DB_NAME, 27017, configuration_poll_interval)
+    if not db_handler.check_configuration_existence(TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY):
+        db_handler.insert_configuration_value(TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY, 1)
+    return db_handler
+
+
+def add_players_and_rankers(db_handler, player_names, ranker_ids, goalkeeper_names=()):
+    for player_name in player_names:
+        db_handler.insert_player(player_name, GK if player_name in goalkeeper_names else ALL)
+    for ranker_id in ranker_ids:
+        db_handler.insert_ranker("ranker{0}".format(ranker_id), ranker_id)
+
+
+class TestDBHandler(object):
+    def test_embedded_rankings_are_migrated(self, mongo_client):
+        """
+        Rankings embedded in the rankers are moved into the Rankings collection when the handler starts. Rankings of
+        unknown players are dropped, and a repeated migration doesn't duplicate anything.
+        """
+        db = mongo_client[DB_NAME]
+        db[TConsts.PLAYERS_COLLECTION_NAME].insert_many(
+            [{TConsts.PLAYERS_NAME_KEY: "alice", TConsts.PLAYERS_CHARACTERISTICS_KEY: ALL},
+             {TConsts.PLAYERS_NAME_KEY: "bob", TConsts.PLAYERS_CHARACTERISTICS_KEY: ALL}])
+        db[TConsts.RANKERS_COLLECTION_NAME].insert_one(
+            {TConsts.USER_ID_KEY: 1, TConsts.USER_FULLNAME_KEY: "ranker1",
+             TConsts.RANKERS_USER_RANKINGS: {"alice": 7, "bob": 5, "carol": 3}})
+
+        db_handler = create_db_handler()
+        create_db_handler()
+
+        assert db_handler.get_user_rankings(1) == {"alice": 7, "bob": 5}
+        assert db[TConsts.RANKINGS_COLLECTION_NAME].count_documents({}) == 2
+        assert db[TConsts.RANKERS_COLLECTION_NAME].count_documents(
+            {TConsts.RANKERS_USER_RANKINGS: {"$exists": True}}) == 0
+        assert db_handler.rebuild_player_ratings() == 2
+        assert db_handler.get_average_ratings(["alice", "bob"]) == {"alice": 7, "bob": 5}
+
+    def test_rankings_update_the_ranked_players_ratings(self, mongo_client):
+        """
+        Modified rankings are materialized into the ratings of the ranked players, consistently with a rebuild.
+        """
+        db_handler = create_db_handler()
+        add_players_and_rankers(db_handler, ["alice", "bob", "dan"], [1, 2], goalkeeper_names=["dan"])
+
+        assert db_handler.modify_user_rankings(1, {"alice": 8, "bob": 6, "dan": 9}) == (True, True)
+        assert db_handler.modify_user_rankings(2, {"alice": 6}) == (True, True)
+        assert db_handler.modify_user_rankings(2, {"alice": 6}) == (True, False)
+
+        player_ratings = mongo_client[DB_NAME][TConsts.PLAYER_RATINGS_COLLECTION_NAME].find_one(
+            {TConsts.PLAYERS_NAME_KEY: "alice"})
+        assert player_ratings[TConsts.PLAYER_RATINGS_RATINGS_KEY] == {"1": 8.0, "2": 6.0}
+        assert player_ratings[TConsts.PLAYER_RATINGS_COUNT_KEY] == 2
+        assert db_handler.get_average_ratings(["alice", "bob", "dan"]) == {"alice": 7, "bob": 6, "dan": 0}
+        assert db_handler.check_player_ratings_consistency() == []
+
+    def test_consistency_check_detects_drift(self, mongo_client):
+        """
+        A materialized entry that doesn't match the rankings is reported, until the collection is rebuilt.
+        """
+        db_handler = create_db_handler()
+        add_players_and_rankers(db_handler, ["alice", "bob"], [1])
+        db_handler.modify_user_rankings(1, {"alice": 8, "bob": 6})
+
+        mongo_client[DB_NAME][TConsts.PLAYER_RATINGS_COLLECTION_NAME].update_one(
+            {TConsts.PLAYERS_NAME_KEY: "bob"}, {"$set": {TConsts.PLAYER_RATINGS_AVERAGE_KEY: 9}})
+        assert db_handler.check_player_ratings_consistency() == ["bob"]
+
+        assert db_handler.rebuild_player_ratings() == 2
+        assert db_handler.check_player_ratings_consistency() == []
+        assert db_handler.get_average_ratings(["bob"]) == {"bob": 6}
+
+    def test_failed_ratings_write_is_repaired(self, mongo_client):
+        """
+        If the ratings fail to be written after the rankings were, they're derived from the rankings again.
+        """
+        db_handler = create_db_handler()
+        add_players_and_rankers(db_handler, ["alice"], [1])
+
+        mongo_client[DB_NAME][TConsts.PLAYER_RATINGS_COLLECTION_NAME].fail_next("bulk_write")
+        with pytest.raises(TFABDatabaseError):
+            db_handler.modify_user_rankings(1, {"alice": 8})
+
+        assert db_handler.get_user_rankings(1) == {"alice": 8}
+        assert db_handler.check_player_ratings_consistency() == []
+        assert db_handler.get_average_ratings(["alice"]) == {"alice": 8}
+
+    def test_missing_ratings_are_materialized_once(self, mongo_client):
+        """
+        A database holding rankings without materialized ratings has them built, after which the check only reads a
+        single document of each collection.
+        """
+        db_handler = create_db_handler()
+        add_players_and_rankers(db_handler, ["alice", "bob"], [1])
+        db_handler.modify_user_rankings(1, {"alice": 8, "bob": 6})
+        db = mongo_client[DB_NAME]
+        db[TConsts.PLAYER_RATINGS_COLLECTION_NAME].delete_many({})
+
+        assert db_handler.materialize_player_ratings_if_missing() == 2
+        assert db_handler.get_average_ratings(["alice", "bob"]) == {"alice": 8, "bob": 6}
+
+        rankings_reads = db[TConsts.RANKINGS_COLLECTION_NAME].calls["find"]
+        assert db_handler.materialize_player_ratings_if_missing() == 0
+        assert db[TConsts.RANKINGS_COLLECTION_NAME].calls["find"] == rankings_reads
+
+    def test_configuration_cache_is_invalidated_by_local_writes(self, mongo_client):
+        """
+        The configuration is read once, served from memory, and reloaded after it's modified. The cache versions aren't
+        part of the configuration.
+        """
+        db_handler = create_db_handler()
+        db_handler.insert_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY, "first")
+        internal_collection = mongo_client[DB_NAME][TConsts.INTERNAL_COLLECTION_NAME]
+
+        assert db_handler.get_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY) == "first"
+        configuration_reads = internal_collection.calls["find"]
+        assert db_handler.get_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY) == "first"
+        assert internal_collection.calls["find"] == configuration_reads
+
+        assert db_handler.modify_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY, "second") == (True, True)
+        assert db_handler.get_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY) == "second"
+        assert not db_handler.check_configuration_existence(TConsts.INTERNAL_CONFIGURATION_VERSION_KEY)
+        assert internal_collection.count_documents({}) == 2
+
+    def test_legacy_cache_versions_are_removed(self, mongo_client):
+        """
+        Cache versions stored among the configuration values by earlier versions are removed when the handler starts.
+        """
+        mongo_client[DB_NAME][TConsts.INTERNAL_COLLECTION_NAME].insert_many(
+            [{TConsts.INTERNAL_CONFIGURATION_KEY: TConsts.INTERNAL_CONFIGURATION_VERSION_KEY,
+              TConsts.INTERNAL_CONFIGURATION_VALUE: 3},
+             {TConsts.INTERNAL_CONFIGURATION_KEY: TConsts.INTERNAL_PLAYERS_VERSION_KEY,
+              TConsts.INTERNAL_CONFIGURATION_VALUE: 5}])
+
+        db_handler = create_db_handler()
+
+        assert not db_handler.check_configuration_existence(TConsts.INTERNAL_CONFIGURATION_VERSION_KEY)
+        assert not db_handler.check_configuration_existence(TConsts.INTERNAL_PLAYERS_VERSION_KEY)
+
+    def test_configuration_is_reloaded_after_another_process_writes(self, mongo_client):
+        """
+        A modification made by another process is noticed by the next poll of the cache versions.
+        """
+        db_handler = create_db_handler(configuration_poll_interval=0)
+        other_db_handler = create_db_handler()
+        db_handler.insert_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY, "first")
+        assert db_handler.get_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY) == "first"
+
+        other_db_handler.modify_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY, "second")
+
+        assert db_handler.get_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY) == "second"
+
+    def test_configuration_isnt_reloaded_within_the_poll_interval(self, mongo_client):
+        """
+        Within the poll interval, the configuration is served from memory without reading the DB at all.
+        """
+        db_handler = create_db_handler(configuration_poll_interval=3600)
+        other_db_handler = create_db_handler()
+        db_handler.insert_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY, "first")
+        assert db_handler.get_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY) == "first"
+        db = mongo_client[DB_NAME]
+        configuration_reads = db[TConsts.INTERNAL_COLLECTION_NAME].calls["find"]
+        version_reads = db[TConsts.CACHE_VERSIONS_COLLECTION_NAME].calls["find"]
+
+        other_db_handler.modify_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY, "second")
+
+        assert db_handler.get_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY) == "first"
+        assert db[TConsts.INTERNAL_COLLECTION_NAME].calls["find"] == configuration_reads
+        assert db[TConsts.CACHE_VERSIONS_COLLECTION_NAME].calls["find"] == version_reads
+
+    def test_player_directory_is_written_through(self, mongo_client):
+        """
+        Adding, editing and deleting players updates the player directory, so lookups never read the Players collection
+        again.
+        """
+        db_handler = create_db_handler()
+        add_players_and_rankers(db_handler, ["alice"], [])
+        players_collection = mongo_client[DB_NAME][TConsts.PLAYERS_COLLECTION_NAME]
+        players_reads = players_collection.calls["find"]
+
+        db_handler.insert_player("bob", ALL)
+        assert db_handler.check_player_existence("bob")
+        assert db_handler.edit_player("alice", GK) == (True, True)
+        assert db_handler.get_player_characteristic("alice") == GK
+        assert db_handler.delete_player("bob")
+        assert not db_handler.check_player_existence("bob")
+
+        assert [player[0] for player in db_handler.get_player_list(False)] == ["alice"]
+        assert players_collection.calls["find"] == players_reads
+
+    def test_player_directory_is_reset_when_the_version_skips(self, mongo_client):
+        """
+        A write that finds the players' version was bumped by another process reloads the directory, which then holds
+        the players the other process added.
+        """
+        db_handler = create_db_handler()
+        other_db_handler = create_db_handler()
+        db_handler.insert_player("alice", ALL)
+
+        other_db_handler.insert_player("carol", ALL)
+        assert not db_handler.check_player_existence("carol")
+
+        db_handler.insert_player("bob", ALL)
+        assert db_handler.check_player_existence("carol")
+        assert db_handler.check_player_existence("bob")
+
+    def test_unknown_players_are_searched_in_a_single_query(self, mongo_client):
+        """
+        Names missing from the player directory are searched for in the Players collection together, and the players
+        found there are added to the directory.
+        """
+        db_handler = create_db_handler()
+        add_players_and_rankers(db_handler, ["alice"], [])
+        players_collection = mongo_client[DB_NAME][TConsts.PLAYERS_COLLECTION_NAME]
+        players_collection.insert_one({TConsts.PLAYERS_NAME_KEY: "erin", TConsts.PLAYERS_CHARACTERISTICS_KEY: GK})
+        players_reads = players_collection.calls["find"]
+
+        players, missing_player_names = db_handler.get_players(["alice", "erin", "zed"])
+        assert sorted(players) == ["alice", "erin"]
+        assert missing_player_names == ["zed"]
+        assert players_collection.calls["find"] == players_reads + 1
+
+        assert db_handler.get_player_characteristic("erin") == GK
+        assert players_collection.calls["find"] == players_reads + 1
+
+    def test_bulk_lookups_of_known_and_unknown_players(self, mongo_client):
+        """
+        The bulk lookups report every unknown name once, in the order it was requested.
+        """
+        db_handler = create_db_handler()
+        add_players_and_rankers(db_handler, ["alice", "bob"], [], goalkeeper_names=["bob"])
+
+        assert db_handler.check_players_existence(["alice", "bob"]) == (True, [])
+        assert db_handler.check_players_existence(["zed", "alice", "yan", "zed"]) == (False, ["zed", "yan"])
+        assert db_handler.get_characteristics(["bob", "yan", "alice", "bob"]) == ({"alice": ALL, "bob": GK}, ["yan"])
+        assert db_handler.get_characteristics([]) == ({}, [])
+
+    def test_existing_indexes_arent_recreated(self, mongo_client):
+        """
+        Every index is created by the first handler, and a handler started on the same DB finds nothing to create.
+        """
+        db_handler = create_db_handler()
+        assert len(db_handler.created_indexes) == len(TFABDBHandler.INDEX_SPECIFICATION)
+        assert db_handler.failed_indexes == []
+
+        other_db_handler = create_db_handler()
+        assert other_db_handler.created_indexes == []
+        assert other_db_handler.failed_indexes == []
+
+    def test_unique_index_over_duplicates_fails_without_aborting_startup(self, mongo_client):
+        """
+        A unique index that can't be created over duplicate values is reported, replaced by a non-unique index over the
+        same keys, and the rest of the indexes are still created.
+        """
+        players_collection = mongo_client[DB_NAME][TConsts.PLAYERS_COLLECTION_NAME]
+        players_collection.insert_many(
+            [{TConsts.PLAYERS_NAME_KEY: "alice", TConsts.PLAYERS_CHARACTERISTICS_KEY: ALL},
+             {TConsts.PLAYERS_NAME_KEY: "alice", TConsts.PLAYERS_CHARACTERISTICS_KEY: GK}])
+        index_name = "{0}_1".format(TConsts.PLAYERS_NAME_KEY)
+
+        db_handler = create_db_handler()
+
+        assert len(db_handler.failed_indexes) == 1
+        assert db_handler.failed_indexes[0].startswith(
+            "{0}.{1}".format(TConsts.PLAYERS_COLLECTION_NAME, index_name))
+        assert len(db_handler.created_indexes) == len(TFABDBHandler.INDEX_SPECIFICATION) - 1
+        assert players_collection.index_information()[index_name] == {"key": [(TConsts.PLAYERS_NAME_KEY, 1)]}
+        assert db_handler.check_player_existence("alice")
+
+    def test_matchday_on_the_same_date_is_replaced(self, mongo_client):
+        """
+        Inserting a matchday on the date of an existing one replaces it, rather than adding another matchday.
+        """
+        db_handler = create_db_handler()
+        db_handler.insert_matchday("first", "field", ["alice", "bob"], "181026", [["alice", "bob"]])
+        db_handler.insert_teams_to_matchday("181026", [["alice"], ["bob"]])
+
+        matchday = db_handler.insert_matchday("second", "court", ["carol"], "181026")
+
+        assert mongo_client[DB_NAME][TConsts.MATCHDAYS_COLLECTION_NAME].count_documents(
+            {TConsts.MATCHDAYS_DATE_KEY: "181026"}) == 1
+        assert matchday == db_handler.get_matchday("181026")
+        assert matchday[TConsts.MATCHDAYS_ORIGINAL_MESSAGE_KEY] == "second"
+        assert matchday[TConsts.MATCHDAYS_ROSTER_KEY] == ["carol"]
+        assert matchday[TConsts.MATCHDAYS_TEAMS_KEY] == []
+        assert matchday[TConsts.MATCHDAYS_COUPLING_CONSTRAINTS_KEY] == []
+
+    def test_constraint_insertions_are_all_kept(self, mongo_client):
+        """
+        Constraints are appended by the DB, so consecutive insertions (e.g. by two admins) are all kept, while an
+        absolute insertion replaces them.
+        """
+        db_handler = create_db_handler()
+        db_handler.insert_matchday("message", "field", ["alice", "bob", "carol", "dan"], "181026")
+
+        db_handler.insert_constraints_to_matchday("181026", couplings=[["alice", "bob"]])
+        matchday = db_handler.insert_constraints_to_matchday("181026", couplings=[["carol", "dan"]],
+                                                             decouplings=[["alice", "carol"]])
+
+        assert matchday[TConsts.MATCHDAYS_COUPLING_CONSTRAINTS_KEY] == [["alice", "bob"], ["carol", "dan"]]
+        assert matchday[TConsts.MATCHDAYS_DECOUPLING_CONSTRAINTS_KEY] == [["alice", "carol"]]
+        assert db_handler.get_matchday("181026") == matchday
+
+        matchday = db_handler.insert_constraints_to_matchday("181026", decouplings=[["bob", "dan"]], absolute=True)
+        assert matchday[TConsts.MATCHDAYS_COUPLING_CONSTRAINTS_KEY] == []
+        assert matchday[TConsts.MATCHDAYS_DECOUPLING_CONSTRAINTS_KEY] == [["bob", "dan"]]
+        assert db_handler.insert_constraints_to_matchday("191026", couplings=[["alice", "bob"]]) is None
+
+    def test_players_deleted_during_a_lookup_arent_restored(self, mongo_client, monkeypatch):
+        """
+        Players found by the fall-back query aren't merged into the player directory if the players were modified
+        meanwhile (here, by a concurrent deletion of the found player).
+        """
+        db_handler = create_db_handler()
+        add_players_and_rankers(db_handler, ["alice"], [])
+        players_collection = mongo_client[DB_NAME][TConsts.PLAYERS_COLLECTION_NAME]
+        players_collection.insert_one({TConsts.PLAYERS_NAME_KEY: "erin", TConsts.PLAYERS_CHARACTERISTICS_KEY: ALL})
+        find = players_collection.find
+
+        def find_then_delete(*args, **kwargs):
+            found_players = find(*args, **kwargs)
+            db_handler.delete_player("erin")
+            return found_players
+
+        monkeypatch.setattr(players_collection, "find", find_then_delete)
+        players, _ = db_handler.get_players(["erin"])
+        monkeypatch.setattr(players_collection, "find", find)
+
+        assert list(players) == ["erin"]
+        assert not db_handler.check_player_existence("erin")
+        assert db_handler.get_players(["erin"]) == ({}, ["erin"])
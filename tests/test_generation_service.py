@@ -0,0 +1,218 @@
+import asyncio
+import threading
+import pytest
+from tfab_framework.tfab_consts import Consts as TConsts
+from tfab_framework.tfab_exception import TFABGenerationError, TFABGenerationCancelledError
+from tfab_framework.tfab_generation_service import TFABGenerationService
+from tfab_framework.tfab_lineup_cache import TFABLineupCache
+from tests.test_team_generator import generate_roster, assert_valid_lineup
+
+
+class TestGenerationService(object):
+    def test_generates_in_worker(self):
+        """
+        The teams generated in the worker process are returned to the awaiting coroutine.
+        """
+        roster = generate_roster(12, 2, seed=1)
+        service = TFABGenerationService(max_workers=1, max_queue_size=1)
+
+        async def generate():
+            return await service.generate_teams("admin", list(roster), num_teams=3,
+                                                engine=TConsts.TeamGenerationEngines["AUTO"])
+
+        try:
+            teams = asyncio.run(generate())
+        finally:
+            service.shutdown()
+
+        assert_valid_lineup(teams, roster, 3)
+        assert service.get_queue_depth() == 0
+
+    def test_queue_is_bounded_and_cancellable(self):
+        """
+        Requests beyond the queue size are rejected, and queued requests can be cancelled while waiting.
+        """
+        roster = generate_roster(12, 2, seed=2)
+        service = TFABGenerationService(max_workers=1, max_queue_size=1)
+        progress_reports = []
+
+        async def report_progress(queue_position, elapsed_time):
+            progress_reports.append(queue_position)
+
+        async def generate():
+            running = asyncio.ensure_future(service.generate_teams("first", list(roster), num_teams=3))
+            queued = asyncio.ensure_future(service.generate_teams("second", list(roster), num_teams=2,
+                                                                  progress_callback=report_progress,
+                                                                  heartbeat_interval=0.01))
+            await asyncio.sleep(0.05)
+            assert service.get_queue_depth() == 1
+            assert service.get_queue_position("second") == 1
+
+            with pytest.raises(TFABGenerationError):
+                await service.generate_teams("third", generate_roster(12, 2, seed=3), num_teams=3)
+
+            assert service.cancel("second")
+            with pytest.raises(TFABGenerationCancelledError):
+                await queued
+            return await running
+
+        try:
+            teams = asyncio.run(generate())
+        finally:
+            service.shutdown()
+
+        assert_valid_lineup(teams, roster, 3)
+        assert 1 in progress_reports
+        assert service.get_statistics()[TConsts.GENERATION_STATISTICS_QUEUE_DEPTH_KEY] == 0
+
+    def test_identical_requests_share_a_single_computation(self):
+        """
+        Concurrent identical requests for a matchday await one computation, and later ones receive its result.
+        """
+        roster = generate_roster(12, 2, seed=3)
+        service = TFABGenerationService(max_workers=1, max_queue_size=0)
+
+        def get_active_jobs():
+            statistics = service.get_statistics()
+            return statistics[TConsts.GENERATION_STATISTICS_QUEUE_DEPTH_KEY] + \
+                statistics[TConsts.GENERATION_STATISTICS_RUNNING_KEY]
+
+        async def generate():
+            first = asyncio.ensure_future(service.generate_teams("first", list(roster), matchday_key="01-01-2024",
+                                                                 num_teams=3))
+            second = asyncio.ensure_future(service.generate_teams("second", list(reversed(roster)),
+                                                                  matchday_key="01-01-2024", num_teams=3))
+            await asyncio.sleep(0.05)
+            assert get_active_jobs() == 1
+
+            # The shared computation keeps running as long as someone is waiting for it
+            assert service.cancel("first")
+            with pytest.raises(TFABGenerationCancelledError):
+                await first
+            second_teams = await second
+
+            later_teams = await service.generate_teams("third", list(roster), matchday_key="01-01-2024",
+                                                       num_teams=3)
+            rerolled = asyncio.ensure_future(service.generate_teams("third", list(roster), matchday_key="01-01-2024",
+                                                                    reroll=True, num_teams=3))
+            await asyncio.sleep(0)
+            assert get_active_jobs() == 1
+            return second_teams, later_teams, await rerolled
+
+        try:
+            second_teams, later_teams, rerolled_teams = asyncio.run(generate())
+        finally:
+            service.shutdown()
+
+        assert later_teams == second_teams
+        assert_valid_lineup(rerolled_teams, roster, 3)
+
+    def test_candidates_are_distinct_and_ranked(self):
+        """
+        The candidate lineups are all legal and different from each other, and the most balanced one comes first.
+        Later identical requests receive all the candidates again.
+        """
+        roster = generate_roster(12, 0, seed=4)
+        service = TFABGenerationService(max_workers=2, max_queue_size=0)
+
+        async def generate():
+            candidates = await service.generate_candidates("admin", list(roster), 3, num_teams=3,
+                                                           break_symmetry=True,
+                                                           engine=TConsts.TeamGenerationEngines["CBC"])
+            # Identical requests receive all the cached candidates, without solving again
+            cached_candidates = await service.generate_candidates("admin", list(reversed(roster)), 3, num_teams=3,
+                                                                  break_symmetry=True,
+                                                                  engine=TConsts.TeamGenerationEngines["CBC"])
+            assert cached_candidates == candidates
+            assert service.lineup_cache.get(TFABLineupCache.get_fingerprint(
+                roster, dict(num_teams=3, break_symmetry=True, engine=TConsts.TeamGenerationEngines["CBC"],
+                             num_candidates=3))) == candidates
+            return candidates
+
+        try:
+            candidates = asyncio.run(generate())
+        finally:
+            service.shutdown()
+
+        assert len(candidates) == 3
+        for teams in candidates:
+            assert_valid_lineup(teams, roster, 3)
+        lineups = {frozenset(frozenset(player[TConsts.PLAYERS_NAME_KEY]
+                                       for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY])
+                             for team in teams) for teams in candidates}
+        assert len(lineups) == 3
+        spreads = [TFABGenerationService.get_rating_spread(teams) for teams in candidates]
+        assert spreads == sorted(spreads)
+
+    def test_regenerates_in_worker(self):
+        """
+        A swap is regenerated in the worker process from the previous lineup.
+        """
+        roster = generate_roster(13, 0, seed=5)
+        added_player = roster.pop()
+        service = TFABGenerationService(max_workers=1, max_queue_size=0)
+
+        async def regenerate():
+            previous_teams = await service.generate_teams("admin", list(roster), num_teams=3,
+                                                         engine=TConsts.TeamGenerationEngines["CBC"])
+            removed_player = previous_teams[0][TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY][0]
+            teams = await service.regenerate_teams("admin", previous_teams, [removed_player[TConsts.PLAYERS_NAME_KEY]],
+                                                   [added_player], matchday_key="01-01-2024", max_moved_players=4)
+            return removed_player, teams
+
+        try:
+            removed_player, teams = asyncio.run(regenerate())
+        finally:
+            service.shutdown()
+
+        assert_valid_lineup(teams, [player for player in roster if player != removed_player] + [added_player], 3)
+
+    def test_lineup_cache_is_read_off_the_event_loop(self):
+        """
+        The lineup cache (whose persistent tier reads the DB) is read in another thread than the event loop's.
+        """
+        class RecordingDBHandler(object):
+            def __init__(self):
+                self.threads = []
+
+            def get_cached_lineup(self, fingerprint):
+                self.threads.append(threading.current_thread())
+                return ["cached lineup"]
+
+        db_handler = RecordingDBHandler()
+        service = TFABGenerationService(max_workers=1, max_queue_size=0, lineup_cache=TFABLineupCache(db_handler))
+
+        async def generate():
+            return await service.generate_teams("admin", generate_roster(12, 2, seed=6), num_teams=3)
+
+        try:
+            assert asyncio.run(generate()) == ["cached lineup"]
+        finally:
+            service.shutdown()
+
+        assert len(db_handler.threads) == 1
+        assert db_handler.threads[0] is not threading.current_thread()
+
+    def test_failing_progress_callback_does_not_abort_the_generation(self):
+        """
+        A progress callback that raises (e.g. Telegram rejecting an edit) is ignored, and the teams are still returned.
+        """
+        roster = generate_roster(12, 2, seed=7)
+        service = TFABGenerationService(max_workers=1, max_queue_size=0)
+        progress_reports = []
+
+        async def report_progress(queue_position, elapsed_time):
+            progress_reports.append(queue_position)
+            raise RuntimeError("Message is not modified")
+
+        async def generate():
+            return await service.generate_teams("admin", list(roster), num_teams=3, progress_callback=report_progress,
+                                                heartbeat_interval=0.01)
+
+        try:
+            teams = asyncio.run(generate())
+        finally:
+            service.shutdown()
+
+        assert_valid_lineup(teams, roster, 3)
+        assert progress_reports
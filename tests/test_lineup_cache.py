@@ -0,0 +1,39 @@
+from tfab_framework.tfab_consts import Consts as TConsts
+from tfab_framework.tfab_lineup_cache import TFABLineupCache
+from tests.test_team_generator import generate_roster
+
+
+class TestLineupCache(object):
+    def test_fingerprint_is_stable(self):
+        """
+        The fingerprint ignores the order of the players and the constraints, but not their content.
+        """
+        roster = generate_roster(12, 2, seed=1)
+        parameters = {"num_teams": 3, "coupling_constraints": [["player2", "player1"], ["player5", "player4"]]}
+        fingerprint = TFABLineupCache.get_fingerprint(roster, parameters)
+
+        reordered_parameters = {"coupling_constraints": [["player4", "player5"], ["player1", "player2"]],
+                                "num_teams": 3}
+        assert TFABLineupCache.get_fingerprint(list(reversed(roster)), reordered_parameters) == fingerprint
+
+        changed_roster = [dict(player) for player in roster]
+        changed_roster[0][TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY] += 0.01
+        assert TFABLineupCache.get_fingerprint(changed_roster, parameters) != fingerprint
+        assert TFABLineupCache.get_fingerprint(roster, dict(parameters, num_teams=4)) != fingerprint
+        assert TFABLineupCache.get_fingerprint(roster, dict(parameters, coupling_constraints=[])) != fingerprint
+
+    def test_least_recently_used_lineups_are_evicted(self):
+        """
+        The in-process tier keeps the most recently used lineups, and hands out copies of them.
+        """
+        lineup_cache = TFABLineupCache(max_entries=2)
+        lineup_cache.put("first", [{"Team": 1}])
+        lineup_cache.put("second", [{"Team": 2}])
+
+        cached_lineup = lineup_cache.get("first")
+        cached_lineup[0]["Team"] = 3
+        lineup_cache.put("third", [{"Team": 3}])
+
+        assert lineup_cache.get("first") == [{"Team": 1}]
+        assert lineup_cache.get("second") is None
+        assert lineup_cache.get("third") == [{"Team": 3}]
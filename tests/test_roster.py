@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from tfab_framework.tfab_consts import Consts as TConsts
+from tfab_utils.tfab_roster import Roster
+from tfab_utils.tfab_team_generator import TeamGenerator
+from tests.test_team_generator import generate_roster, GK, DEF, ATT
+
+
+class TestRoster(object):
+    def test_round_trip_and_sorting(self):
+        """
+        A Roster keeps the very player dictionaries it was built from, and sorts them like sorted() does - by
+        descending rating, equally-rated players keeping their order.
+        """
+        roster = generate_roster(12, 2, seed=7)
+        roster[5][TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY] = \
+            roster[8][TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY]
+        compact_roster = Roster(roster)
+
+        assert compact_roster.to_player_dicts() == roster
+        assert all(a is b for a, b in zip(compact_roster, roster))
+        expected_order = sorted(roster, key=lambda player: player[TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY],
+                                reverse=True)
+        assert all(a is b for a, b in zip(compact_roster.sorted_by_rating(), expected_order))
+        assert compact_roster.get_gk_amount() == TeamGenerator.get_gk_amount(roster) == 2
+        assert compact_roster.name_to_index["player3"] == 3
+
+    def test_unit_vectors_match_the_players(self):
+        """
+        The vectorized unit vectors count every unit's players, roles, tiers and decoupled players.
+        """
+        roster = Roster(generate_roster(12, 2, seed=8)).sorted_by_rating()
+        names = roster.names
+        coupling_constraints = [[names[0], names[5]], [names[5], names[10]], [names[3], names[7]]]
+        decoupling_constraints = [[names[1], names[2], names[3]], [names[0], names[4]]]
+        units, unit_matrix = TeamGenerator._get_units(roster, 3, True, coupling_constraints, decoupling_constraints)
+
+        assert sorted(i for unit in units for i in unit) == list(range(12))
+        for unit, unit_vector in zip(units, unit_matrix):
+            characteristics = [roster[i][TConsts.PLAYERS_CHARACTERISTICS_KEY] for i in unit]
+            assert unit_vector[TeamGenerator.UNIT_SIZE] == len(unit)
+            assert unit_vector[TeamGenerator.UNIT_RATING] == pytest.approx(
+                sum(roster[i][TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY] for i in unit))
+            assert unit_vector[TeamGenerator.UNIT_GKS] == characteristics.count(GK)
+            assert unit_vector[TeamGenerator.UNIT_DEFS] == characteristics.count(DEF)
+            assert unit_vector[TeamGenerator.UNIT_ATTS] == characteristics.count(ATT)
+            tier_counts = unit_vector[TeamGenerator.UNIT_CAPPED_START:TeamGenerator.UNIT_CAPPED_START + 4]
+            assert tier_counts.tolist() == [sum(1 for i in unit if i // 3 == tier) for tier in range(4)]
+            decoupled_counts = unit_vector[TeamGenerator.UNIT_CAPPED_START + 4:]
+            assert decoupled_counts.tolist() == [sum(1 for name in entry if names.index(name) in unit)
+                                                 for entry in decoupling_constraints]
+
+    def test_team_ratings_are_downscaled_without_a_gk(self):
+        """
+        The team sums are vectorized, and a largest team without a GK has its rating downscaled.
+        """
+        roster = Roster(generate_roster(10, 2, seed=9)).sorted_by_rating()
+        gk_indices = np.flatnonzero(roster.get_gk_mask()).tolist()
+        field_indices = [i for i in range(10) if i not in gk_indices]
+        assignment = [None] * 10
+        for i, j in zip(gk_indices + field_indices, [0, 1] + [0, 0, 1, 1, 2, 2, 2, 2]):
+            assignment[i] = j
+
+        teams = TeamGenerator._build_teams(roster, assignment, 3)
+        raw_ratings = roster.get_team_sums(assignment, 3, weights=roster.ratings)
+
+        assert [len(team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]) for team in teams] == [3, 3, 4]
+        assert teams[0][TConsts.MATCHDAYS_SPECIFIC_TEAM_RATING_KEY] == pytest.approx(raw_ratings[0])
+        assert teams[2][TConsts.MATCHDAYS_SPECIFIC_TEAM_RATING_KEY] == pytest.approx(raw_ratings[2] * 3 / 4)
+        assert all(type(team[TConsts.MATCHDAYS_SPECIFIC_TEAM_RATING_KEY]) is float for team in teams)
@@ -0,0 +1,102 @@
+import pytest
+from pulp import PulpSolverError, LpStatusOptimal
+from tfab_framework.tfab_consts import Consts as TConsts
+from tfab_framework.tfab_solver_calibration import TFABSolverCalibration
+from tfab_utils.tfab_solver_backends import SolverBackends, CBCWorker
+from tfab_utils.tfab_team_generator import TeamGenerator
+from tfab_utils.tfab_roster import Roster
+from tests.test_team_generator import generate_roster, get_spread
+
+
+class TestSolverCalibration(object):
+    @pytest.mark.parametrize("engine", SolverBackends.MILP_ENGINES)
+    def test_milp_backends_reach_the_same_optimum(self, engine):
+        """
+        Every installed MILP backend solves the same model to the same optimal spread.
+        """
+        if not SolverBackends.is_available(engine):
+            pytest.skip("{0} isn't installed".format(engine))
+
+        roster = generate_roster(12, 0, seed=21)
+        teams, metadata = TeamGenerator.generate_teams(list(roster), num_teams=3, engine=engine, break_symmetry=True,
+                                                       return_metadata=True)
+        exact_teams = TeamGenerator.generate_teams(list(roster), num_teams=3,
+                                                   engine=TConsts.TeamGenerationEngines["BRANCH_AND_BOUND"])
+
+        assert metadata[TConsts.GENERATION_METADATA_ENGINE_KEY] == engine
+        assert metadata[TConsts.GENERATION_METADATA_STATUS_KEY] == TConsts.TeamGenerationStatuses["OPTIMAL"]
+        assert get_spread(teams) == pytest.approx(get_spread(exact_teams), abs=1e-6)
+
+    def test_persistent_cbc_matches_per_solve_cbc(self):
+        """
+        Consecutive models solved by the persistent CBC worker reach the same optima as CBC processes spawned per
+        solve, so nothing carries over from one model to the next.
+        """
+        for seed in range(4):
+            roster = generate_roster(8 + seed, seed % 2, seed=seed)
+            spreads = []
+            for persistent in [False, True]:
+                prob, _, _ = TeamGenerator._build_milp_model(
+                    Roster(roster).sorted_by_rating(), 2 + seed % 2, [], [], balance_team_ratings=True,
+                    enforce_tiers=True, enforce_defense=False, enforce_offense=False, enforce_total_roles=False,
+                    break_symmetry=True)
+                SolverBackends.solve(prob, TConsts.TeamGenerationEngines["CBC"], persistent=persistent)
+                spreads.append((prob.status, prob.objective.value() if prob.objective is not None else None))
+
+            assert spreads[0][0] == spreads[1][0]
+            assert spreads[0][1] == pytest.approx(spreads[1][1], abs=1e-6)
+
+    def test_wedged_cbc_worker_falls_back_to_per_solve_cbc(self, monkeypatch):
+        """
+        A persistent CBC solve that doesn't finish in time is killed, and the model is solved by a CBC process of its
+        own instead.
+        """
+        monkeypatch.setattr(CBCWorker, "MAX_UNBUDGETED_SOLVE_TIME", 0.001)
+        prob, _, _ = TeamGenerator._build_milp_model(
+            Roster(generate_roster(12, 0, seed=22)).sorted_by_rating(), 3, [], [], balance_team_ratings=True,
+            enforce_tiers=True, enforce_defense=False, enforce_offense=False, enforce_total_roles=False,
+            break_symmetry=True)
+
+        cbc_worker = CBCWorker()
+        try:
+            with pytest.raises(PulpSolverError):
+                cbc_worker.solve(prob)
+            assert not cbc_worker.is_running()
+        finally:
+            cbc_worker.shutdown()
+        SolverBackends.solve(prob, TConsts.TeamGenerationEngines["CBC"], persistent=True)
+
+        assert prob.status == LpStatusOptimal
+
+    def test_calibration_selects_a_qualified_engine(self, tmp_path):
+        """
+        The calibration selects, per roster size, the fastest complete engine within the quality target, and the
+        selection survives a save and a load.
+        """
+        engines = [TConsts.TeamGenerationEngines["HEURISTIC"], TConsts.TeamGenerationEngines["BRANCH_AND_BOUND"],
+                   TConsts.TeamGenerationEngines["CBC"]]
+        calibration = TFABSolverCalibration.calibrate(engines, roster_sizes=[(10, 2), (15, 3)], repetitions=2)
+        measurements = calibration[TConsts.SOLVER_CALIBRATION_MEASUREMENTS_KEY]
+
+        assert len(calibration[TConsts.SOLVER_CALIBRATION_SELECTION_KEY]) == 2
+        for row in calibration[TConsts.SOLVER_CALIBRATION_SELECTION_KEY]:
+            candidates = [measurement for measurement in measurements
+                          if measurement[TConsts.SOLVER_CALIBRATION_PLAYERS_KEY] ==
+                          row[TConsts.SOLVER_CALIBRATION_PLAYERS_KEY] and
+                          SolverBackends.is_complete(measurement[TConsts.SOLVER_CALIBRATION_ENGINE_KEY]) and
+                          measurement[TConsts.SOLVER_CALIBRATION_EXCESS_KEY] <=
+                          TFABSolverCalibration.DEFAULT_QUALITY_TARGET]
+            selected = [measurement for measurement in candidates
+                        if measurement[TConsts.SOLVER_CALIBRATION_ENGINE_KEY] ==
+                        row[TConsts.SOLVER_CALIBRATION_ENGINE_KEY]]
+            assert selected[0][TConsts.SOLVER_CALIBRATION_LATENCY_KEY] == \
+                min(measurement[TConsts.SOLVER_CALIBRATION_LATENCY_KEY] for measurement in candidates)
+
+        calibration_path = str(tmp_path / "calibration.json")
+        TFABSolverCalibration.save(calibration, calibration_path)
+        selector = TFABSolverCalibration(calibration_path)
+        assert selector.select_engine(12, 3) == calibration[TConsts.SOLVER_CALIBRATION_SELECTION_KEY][1][
+            TConsts.SOLVER_CALIBRATION_ENGINE_KEY]
+        assert selector.select_engine(40, 5) == calibration[TConsts.SOLVER_CALIBRATION_SELECTION_KEY][1][
+            TConsts.SOLVER_CALIBRATION_ENGINE_KEY]
+        assert TFABSolverCalibration().select_engine(12, 3) == TConsts.TeamGenerationEngines["AUTO"]
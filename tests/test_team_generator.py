@@ -0,0 +1,483 @@
+import itertools
+import math
+import random
+import pytest
+from tfab_utils.tfab_team_generator import TeamGenerator
+from tfab_framework.tfab_consts import Consts as TConsts
+
+GK = TConsts.PlayerCharacteristics["GOALKEEPER"]
+DEF = TConsts.PlayerCharacteristics["DEFENSIVE"]
+ATT = TConsts.PlayerCharacteristics["OFFENSIVE"]
+ALL = TConsts.PlayerCharacteristics["ALLAROUND"]
+
+
+def generate_roster(num_players, num_gks, seed):
+    """
+    :return: A list of player dictionaries with random characteristics and ratings, the first <num_gks> being GKs.
+    """
+    rng = random.Random(seed)
+    roster = []
+    for i in range(num_players):
+        characteristic = GK if i < num_gks else rng.choice([DEF, ATT, ALL])
+        roster.append({TConsts.PLAYERS_NAME_KEY: "player{0}".format(i),
+                       TConsts.PLAYERS_CHARACTERISTICS_KEY: characteristic,
+                       TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY:
+                           0 if characteristic == GK else round(rng.uniform(3, 9), 2)})
+    return roster
+
+
+def get_raw_ratings(teams):
+    """
+    :return: The sum of the players' ratings in each team, before the GK-less downscaling.
+    """
+    return [sum(player[TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY]
+                for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]) for team in teams]
+
+
+def get_spread(teams):
+    ratings = get_raw_ratings(teams)
+    return max(ratings) - min(ratings)
+
+
+def assert_valid_lineup(teams, roster, num_teams, coupling_constraints=(), decoupling_constraints=(),
+                        enforce_roles=False):
+    """
+    Asserts that <teams> is a legal lineup of <roster>.
+    """
+    assert len(teams) == num_teams
+    team_of = {}
+    for j, team in enumerate(teams):
+        for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]:
+            assert player[TConsts.PLAYERS_NAME_KEY] not in team_of
+            team_of[player[TConsts.PLAYERS_NAME_KEY]] = j
+    assert sorted(team_of) == sorted(player[TConsts.PLAYERS_NAME_KEY] for player in roster)
+
+    sizes = [len(team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]) for team in teams]
+    assert max(sizes) - min(sizes) <= 1
+
+    for team in teams:
+        assert TeamGenerator.get_gk_amount(team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]) <= 1
+
+    for entry in coupling_constraints:
+        assert len({team_of[name] for name in entry}) == 1
+    for entry in decoupling_constraints:
+        assert len({team_of[name] for name in entry}) == len(entry)
+
+    if enforce_roles:
+        for characteristics in [[DEF], [ATT], [DEF, ATT]]:
+            counts = [sum(1 for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]
+                          if player[TConsts.PLAYERS_CHARACTERISTICS_KEY] in characteristics) for team in teams]
+            assert max(counts) - min(counts) <= 1
+
+
+def brute_force_spread(roster, num_teams, coupling_constraints=(), decoupling_constraints=(), enforce_tiers=True):
+    """
+    :return: The smallest rating spread of a legal lineup of <roster>, found by enumerating all the assignments.
+    """
+    sorted_players = sorted(roster, key=lambda player: player[TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY],
+                            reverse=True)
+    index_of = {player[TConsts.PLAYERS_NAME_KEY]: i for i, player in enumerate(sorted_players)}
+    num_tiers = len(roster) // num_teams if enforce_tiers else 0
+    best = None
+
+    for assignment in itertools.product(range(num_teams), repeat=len(roster)):
+        sizes = [assignment.count(j) for j in range(num_teams)]
+        if max(sizes) - min(sizes) > 1:
+            continue
+        if any(len({assignment[index_of[name]] for name in entry}) != 1 for entry in coupling_constraints):
+            continue
+        if any(len({assignment[index_of[name]] for name in entry}) != len(entry) for entry in decoupling_constraints):
+            continue
+        teams = [[sorted_players[i] for i in range(len(roster)) if assignment[i] == j] for j in range(num_teams)]
+        if any(TeamGenerator.get_gk_amount(team) > 1 for team in teams):
+            continue
+        tiers = [(assignment[i], i // num_teams) for i in range(num_tiers * num_teams)]
+        if len(tiers) != len(set(tiers)):
+            continue
+
+        ratings = [sum(player[TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY] for player in team) for team in teams]
+        if best is None or max(ratings) - min(ratings) < best:
+            best = max(ratings) - min(ratings)
+
+    return best
+
+
+class TestTeamGenerator:
+
+    @pytest.mark.parametrize("num_players, num_gks, num_teams", [(10, 0, 2), (15, 3, 3), (18, 0, 3), (20, 4, 4),
+                                                                 (24, 0, 4), (17, 0, 3)])
+    def test_heuristic_lineup_is_legal(self, num_players, num_gks, num_teams):
+        """
+        The heuristic engine must honour the hard constraints, and return the same result shape as CBC.
+        """
+        random.seed(num_players * num_teams)
+        roster = generate_roster(num_players, num_gks, seed=num_players)
+        couplings = [["player{0}".format(num_players - 1), "player{0}".format(num_players - 3)]]
+        decouplings = [["player{0}".format(num_gks), "player{0}".format(num_gks + 1)]]
+
+        teams = TeamGenerator.generate_teams(list(roster), enforce_defense=True, enforce_offense=True,
+                                             enforce_total_roles=True, num_teams=num_teams,
+                                             coupling_constraints=couplings, decoupling_constraints=decouplings,
+                                             engine=TConsts.TeamGenerationEngines["HEURISTIC"])
+
+        assert teams is not None
+        assert_valid_lineup(teams, roster, num_teams, couplings, decouplings, enforce_roles=True)
+        for team in teams:
+            assert set(team.keys()) == {TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY,
+                                        TConsts.MATCHDAYS_SPECIFIC_TEAM_RATING_KEY}
+
+    def test_heuristic_respects_tiers(self):
+        """
+        Every team must receive exactly one player out of every full tier. The heuristic proves no bound, so its
+        metadata reports neither a bound nor a gap unless the lineup is perfectly balanced.
+        """
+        random.seed(3)
+        roster = generate_roster(12, 0, seed=3)
+        teams, metadata = TeamGenerator.generate_teams(list(roster), num_teams=3, return_metadata=True,
+                                                       engine=TConsts.TeamGenerationEngines["HEURISTIC"])
+        sorted_ratings = sorted((player[TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY] for player in roster),
+                                reverse=True)
+
+        for team in teams:
+            team_ratings = sorted((player[TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY]
+                                   for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]), reverse=True)
+            for tier, rating in enumerate(team_ratings):
+                assert rating in sorted_ratings[tier * 3:(tier + 1) * 3]
+
+        if metadata[TConsts.GENERATION_METADATA_STATUS_KEY] == TConsts.TeamGenerationStatuses["FEASIBLE"]:
+            assert metadata[TConsts.GENERATION_METADATA_BEST_BOUND_KEY] is None
+            assert metadata[TConsts.GENERATION_METADATA_GAP_KEY] is None
+        else:
+            assert metadata[TConsts.GENERATION_METADATA_GAP_KEY] == 0
+
+    def test_heuristic_reports_impossible_lineup(self):
+        """
+        Decoupling more players than teams can't be satisfied - the heuristic engine should return None.
+        """
+        roster = generate_roster(12, 0, seed=4)
+        teams = TeamGenerator.generate_teams(list(roster), num_teams=2,
+                                             decoupling_constraints=[["player0", "player1", "player2"]],
+                                             engine=TConsts.TeamGenerationEngines["HEURISTIC"])
+        assert teams is None
+
+    def test_seed_reproduces_lineup_without_reseeding(self):
+        """
+        A seeded generation is reproducible, and leaves the process-wide random number generator untouched.
+        """
+        roster = generate_roster(15, 3, seed=14)
+        random.seed(14)
+        expected_draw = random.random()
+
+        random.seed(14)
+        lineups = [get_raw_ratings(TeamGenerator.generate_teams(list(roster), num_teams=3, seed=seed,
+                                                                engine=TConsts.TeamGenerationEngines["HEURISTIC"]))
+                   for seed in [7, 7]]
+
+        assert lineups[0] == lineups[1]
+        assert random.random() == expected_draw
+
+    def test_auto_engine_is_close_to_optimal(self):
+        """
+        The AUTO engine either keeps a heuristic lineup within the accepted spread, or returns the optimal lineup.
+        """
+        random.seed(5)
+        roster = generate_roster(12, 0, seed=5)
+        optimal = TeamGenerator.generate_teams(list(roster), num_teams=3,
+                                               engine=TConsts.TeamGenerationEngines["CBC"])
+        auto = TeamGenerator.generate_teams(list(roster), num_teams=3, engine=TConsts.TeamGenerationEngines["AUTO"])
+
+        assert_valid_lineup(auto, roster, 3)
+        assert get_spread(auto) <= max(get_spread(optimal), TeamGenerator.HEURISTIC_ACCEPTED_RATING_SPREAD) + 1e-6
+
+    def test_gk_less_team_rating_is_downscaled(self):
+        """
+        A maximal-size team without a GK has its rating scaled down, regardless of the engine that built it.
+        """
+        random.seed(6)
+        roster = generate_roster(10, 2, seed=6)
+        teams = TeamGenerator.generate_teams(list(roster), num_teams=3,
+                                             engine=TConsts.TeamGenerationEngines["HEURISTIC"])
+
+        for team, raw_rating in zip(teams, get_raw_ratings(teams)):
+            players = team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]
+            if len(players) == math.ceil(10 / 3) and TeamGenerator.get_gk_amount(players) == 0:
+                assert team[TConsts.MATCHDAYS_SPECIFIC_TEAM_RATING_KEY] == \
+                       pytest.approx(raw_rating * (len(players) - 1) / len(players))
+            else:
+                assert team[TConsts.MATCHDAYS_SPECIFIC_TEAM_RATING_KEY] == pytest.approx(raw_rating)
+
+    @pytest.mark.parametrize("num_teams, couplings, decouplings, expected_reason", [
+        (13, [], [], "NOT_ENOUGH_PLAYERS"),
+        (3, [["player1", "nobody"]], [], "UNKNOWN_PLAYERS"),
+        (3, [["player3", "player4", "player5", "player6", "player7"]], [], "COUPLING_TOO_LARGE"),
+        (3, [["player0", "player1"]], [], "COUPLED_GOALKEEPERS"),
+        (3, [], [["player3", "player4", "player5", "player6"]], "DECOUPLING_TOO_LARGE"),
+        (3, [["player3", "player4"], ["player4", "player5"]], [["player5", "player3"]], "COUPLED_AND_DECOUPLED"),
+        (3, [["player0", "player2", "player3"], ["player1", "player4", "player5"], ["player6", "player7", "player8"],
+             ["player9", "player10", "player11"]], [], "COUPLINGS_DONT_FIT"),
+    ])
+    def test_feasibility_analyzer_reasons(self, num_teams, couplings, decouplings, expected_reason):
+        """
+        Contradicting requests are rejected with the matching reason, and generate_teams doesn't try to solve them.
+        """
+        roster = generate_roster(12, 2, seed=7)
+        reason, players = TeamGenerator.check_feasibility(roster, enforce_tiers=False, num_teams=num_teams,
+                                                          coupling_constraints=couplings,
+                                                          decoupling_constraints=decouplings)
+
+        assert reason == TConsts.TeamGenerationInfeasibilityReasons[expected_reason]
+        assert TeamGenerator.generate_teams(list(roster), enforce_tiers=False, num_teams=num_teams,
+                                            coupling_constraints=couplings, decoupling_constraints=decouplings,
+                                            engine=TConsts.TeamGenerationEngines["CBC"]) is None
+
+    def test_feasibility_analyzer_tiers_and_goalkeepers(self):
+        """
+        Coupling two players from the same tier is only a contradiction when tiers are enforced.
+        """
+        roster = generate_roster(12, 4, seed=8)
+        field_players = sorted(roster[4:], key=lambda player: player[TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY],
+                               reverse=True)
+        same_tier = [[field_players[0][TConsts.PLAYERS_NAME_KEY], field_players[1][TConsts.PLAYERS_NAME_KEY]]]
+
+        reason, players = TeamGenerator.check_feasibility(roster, num_teams=3)
+        assert reason == TConsts.TeamGenerationInfeasibilityReasons["TOO_MANY_GOALKEEPERS"]
+        assert len(players) == 4
+
+        reason, players = TeamGenerator.check_feasibility(roster, num_teams=4, coupling_constraints=same_tier)
+        assert reason == TConsts.TeamGenerationInfeasibilityReasons["COUPLED_SAME_TIER"]
+        assert TeamGenerator.check_feasibility(roster, enforce_tiers=False, num_teams=4,
+                                               coupling_constraints=same_tier) is None
+
+    def test_cbc_with_contracted_couplings_is_optimal(self):
+        """
+        Contracting the coupled players into units must keep the constraints and the optimal spread of the model.
+        """
+        random.seed(9)
+        roster = generate_roster(9, 0, seed=9)
+        couplings = [["player0", "player4"], ["player4", "player7"]]
+        decouplings = [["player1", "player2"]]
+
+        teams = TeamGenerator.generate_teams(list(roster), enforce_tiers=False, num_teams=3,
+                                             coupling_constraints=couplings, decoupling_constraints=decouplings,
+                                             engine=TConsts.TeamGenerationEngines["CBC"])
+
+        assert_valid_lineup(teams, roster, 3, couplings, decouplings)
+        assert get_spread(teams) == pytest.approx(
+            brute_force_spread(roster, 3, couplings, decouplings, enforce_tiers=False), abs=1e-6)
+
+    @pytest.mark.parametrize("num_players, num_teams", [(8, 2), (9, 3), (8, 4)])
+    def test_symmetry_breaking_keeps_optimal_objective(self, num_players, num_teams):
+        """
+        Ordering the teams inside the MILP must not cut off the optimal lineup.
+        """
+        random.seed(num_players)
+        roster = generate_roster(num_players, 0, seed=num_players + num_teams)
+        teams = TeamGenerator.generate_teams(list(roster), num_teams=num_teams, break_symmetry=True,
+                                             engine=TConsts.TeamGenerationEngines["CBC"])
+
+        assert_valid_lineup(teams, roster, num_teams)
+        assert get_spread(teams) == pytest.approx(brute_force_spread(roster, num_teams), abs=1e-6)
+
+    def test_metadata_reports_proven_optimum(self):
+        """
+        A solved small model reports an optimal status, with its best bound matching the objective.
+        """
+        random.seed(10)
+        roster = generate_roster(9, 0, seed=10)
+        teams, metadata = TeamGenerator.generate_teams(list(roster), num_teams=3, break_symmetry=True,
+                                                       engine=TConsts.TeamGenerationEngines["CBC"],
+                                                       time_budget=30, return_metadata=True)
+
+        assert_valid_lineup(teams, roster, 3)
+        assert metadata[TConsts.GENERATION_METADATA_STATUS_KEY] == TConsts.TeamGenerationStatuses["OPTIMAL"]
+        assert metadata[TConsts.GENERATION_METADATA_OBJECTIVE_KEY] == pytest.approx(get_spread(teams), abs=1e-6)
+        assert metadata[TConsts.GENERATION_METADATA_GAP_KEY] == pytest.approx(0, abs=1e-6)
+
+    def test_time_budget_returns_best_lineup_found(self):
+        """
+        Running out of time still yields a legal lineup, along with a gap bounding its distance from the optimum.
+        """
+        random.seed(11)
+        roster = generate_roster(35, 5, seed=11)
+        teams, metadata = TeamGenerator.generate_teams(list(roster), num_teams=5, break_symmetry=True,
+                                                       engine=TConsts.TeamGenerationEngines["CBC"],
+                                                       time_budget=1, return_metadata=True)
+
+        assert_valid_lineup(teams, roster, 5)
+        assert metadata[TConsts.GENERATION_METADATA_STATUS_KEY] in [TConsts.TeamGenerationStatuses["OPTIMAL"],
+                                                                    TConsts.TeamGenerationStatuses["FEASIBLE"]]
+        assert metadata[TConsts.GENERATION_METADATA_OBJECTIVE_KEY] == pytest.approx(get_spread(teams), abs=1e-6)
+        assert 0 <= metadata[TConsts.GENERATION_METADATA_GAP_KEY] <= get_spread(teams) + 1e-6
+
+    def test_metadata_reports_infeasibility_reason(self):
+        """
+        Requests rejected by the feasibility analyzer carry the rejection reason in their metadata.
+        """
+        roster = generate_roster(2, 0, seed=12)
+        teams, metadata = TeamGenerator.generate_teams(list(roster), num_teams=3, return_metadata=True)
+
+        assert teams is None
+        assert metadata[TConsts.GENERATION_METADATA_STATUS_KEY] == TConsts.TeamGenerationStatuses["INFEASIBLE"]
+        assert metadata[TConsts.GENERATION_METADATA_REASON_KEY] == \
+            TConsts.TeamGenerationInfeasibilityReasons["NOT_ENOUGH_PLAYERS"]
+        assert metadata[TConsts.GENERATION_METADATA_REASON_PLAYERS_KEY] == []
+
+    def test_excluded_lineups_are_not_generated(self):
+        """
+        No-good cuts make CBC return the next best lineup rather than an excluded one.
+        """
+        random.seed(13)
+        roster = generate_roster(9, 0, seed=13)
+        teams = TeamGenerator.generate_teams(list(roster), num_teams=3, engine=TConsts.TeamGenerationEngines["CBC"])
+        excluded_lineup = [[player[TConsts.PLAYERS_NAME_KEY] for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]]
+                           for team in teams]
+
+        other_teams = TeamGenerator.generate_teams(list(roster), num_teams=3, excluded_lineups=[excluded_lineup],
+                                                   engine=TConsts.TeamGenerationEngines["AUTO"])
+
+        assert_valid_lineup(other_teams, roster, 3)
+        other_lineup = [[player[TConsts.PLAYERS_NAME_KEY] for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]]
+                        for team in other_teams]
+        assert {frozenset(team) for team in other_lineup} != {frozenset(team) for team in excluded_lineup}
+        assert get_spread(other_teams) >= get_spread(teams) - 1e-6
+
+    @pytest.mark.parametrize("num_players, num_gks, num_teams, enforce_tiers", [(8, 0, 2, True), (9, 2, 3, True),
+                                                                                (9, 0, 3, False), (10, 0, 3, False),
+                                                                                (12, 0, 2, False)])
+    def test_branch_and_bound_is_optimal(self, num_players, num_gks, num_teams, enforce_tiers):
+        """
+        The in-process branch and bound reaches the optimal spread found by enumerating all the assignments, and
+        detects the rosters that have no legal lineup.
+        """
+        random.seed(num_players)
+        roster = generate_roster(num_players, num_gks, seed=num_players * num_teams)
+        couplings = [["player0", "player5"]]
+        decouplings = [["player1", "player2"]]
+        teams, metadata = TeamGenerator.generate_teams(list(roster), enforce_tiers=enforce_tiers, num_teams=num_teams,
+                                                       coupling_constraints=couplings,
+                                                       decoupling_constraints=decouplings,
+                                                       engine=TConsts.TeamGenerationEngines["BRANCH_AND_BOUND"],
+                                                       return_metadata=True)
+
+        optimal_spread = brute_force_spread(roster, num_teams, couplings, decouplings, enforce_tiers=enforce_tiers)
+        if optimal_spread is None:
+            assert teams is None
+            assert metadata[TConsts.GENERATION_METADATA_STATUS_KEY] == TConsts.TeamGenerationStatuses["INFEASIBLE"]
+            return
+
+        assert_valid_lineup(teams, roster, num_teams, couplings, decouplings)
+        assert metadata[TConsts.GENERATION_METADATA_STATUS_KEY] == TConsts.TeamGenerationStatuses["OPTIMAL"]
+        if num_players % num_teams == 0:
+            assert get_spread(teams) == pytest.approx(optimal_spread, abs=1e-6)
+
+    @pytest.mark.parametrize("num_players, num_teams", [(14, 2), (18, 3)])
+    def test_branch_and_bound_matches_cbc(self, num_players, num_teams):
+        """
+        The branch and bound and the MILP reach the same optimal spread under the same constraints, and AUTO picks
+        the branch and bound for small rosters.
+        """
+        random.seed(num_players)
+        roster = generate_roster(num_players, num_teams, seed=num_players + num_teams)
+        flags = {"num_teams": num_teams, "enforce_defense": True, "enforce_offense": True, "enforce_total_roles": True,
+                 "return_metadata": True}
+        cbc_teams, cbc_metadata = TeamGenerator.generate_teams(list(roster), engine=TConsts.TeamGenerationEngines["CBC"],
+                                                               **flags)
+        auto_teams, auto_metadata = TeamGenerator.generate_teams(list(roster),
+                                                                 engine=TConsts.TeamGenerationEngines["AUTO"], **flags)
+
+        assert_valid_lineup(auto_teams, roster, num_teams, enforce_roles=True)
+        assert auto_metadata[TConsts.GENERATION_METADATA_ENGINE_KEY] == \
+            TConsts.TeamGenerationEngines["BRANCH_AND_BOUND"]
+        assert auto_metadata[TConsts.GENERATION_METADATA_STATUS_KEY] == TConsts.TeamGenerationStatuses["OPTIMAL"]
+        assert cbc_metadata[TConsts.GENERATION_METADATA_STATUS_KEY] == TConsts.TeamGenerationStatuses["OPTIMAL"]
+        assert get_spread(auto_teams) == pytest.approx(get_spread(cbc_teams), abs=1e-6)
+
+    @pytest.mark.parametrize("num_players, num_teams, max_moved_players", [(15, 3, 2), (16, 4, 2), (16, 4, 3)])
+    def test_regeneration_respects_move_limit(self, num_players, num_teams, max_moved_players):
+        """
+        A regenerated lineup replaces the removed player with the added one, and moves at most the allowed amount of
+        the remaining players between teams.
+        """
+        random.seed(num_players)
+        roster = generate_roster(num_players + 1, 0, seed=num_players * num_teams)
+        added_player = roster.pop()
+        previous_teams = TeamGenerator.generate_teams(list(roster), num_teams=num_teams, time_budget=5,
+                                                      engine=TConsts.TeamGenerationEngines["CBC"])
+        removed_player = previous_teams[0][TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY][0]
+        new_roster = [player for player in roster if player is not removed_player] + [added_player]
+
+        teams, metadata = TeamGenerator.regenerate_teams(previous_teams, [removed_player[TConsts.PLAYERS_NAME_KEY]],
+                                                         [added_player], max_moved_players=max_moved_players,
+                                                         return_metadata=True)
+
+        assert_valid_lineup(teams, new_roster, num_teams)
+        previous_team_of = {player[TConsts.PLAYERS_NAME_KEY]: j for j, team in enumerate(previous_teams)
+                            for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]}
+        moved_players = sum(1 for j, team in enumerate(teams) for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]
+                            if previous_team_of.get(player[TConsts.PLAYERS_NAME_KEY], j) != j)
+        assert moved_players <= max_moved_players
+        assert metadata[TConsts.GENERATION_METADATA_MOVED_PLAYERS_KEY] == moved_players
+        assert metadata[TConsts.GENERATION_METADATA_OBJECTIVE_KEY] == pytest.approx(get_spread(teams), abs=1e-6)
+
+    def test_seeded_regeneration_leaves_the_global_random_untouched(self):
+        """
+        A seeded regeneration is reproducible, and doesn't draw from the process-wide random number generator.
+        """
+        roster = generate_roster(11, 0, seed=9)
+        added_player = roster.pop()
+        previous_teams = TeamGenerator.generate_teams(list(roster), num_teams=2, seed=9,
+                                                      engine=TConsts.TeamGenerationEngines["CBC"])
+        removed_player_name = previous_teams[0][TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY][0][TConsts.PLAYERS_NAME_KEY]
+        random.seed(9)
+        expected_draw = random.random()
+
+        random.seed(9)
+        lineups = [get_raw_ratings(TeamGenerator.regenerate_teams(previous_teams, [removed_player_name], [added_player],
+                                                                  seed=seed))
+                   for seed in [4, 4]]
+
+        assert lineups[0] == lineups[1]
+        assert random.random() == expected_draw
+
+    def test_regeneration_without_moves_keeps_teams(self):
+        """
+        With no moves allowed, a like-for-like replacement takes the removed player's place and nobody else moves.
+        """
+        random.seed(6)
+        roster = generate_roster(18, 3, seed=6)
+        previous_teams = TeamGenerator.generate_teams(list(roster), num_teams=3,
+                                                      engine=TConsts.TeamGenerationEngines["CBC"])
+        removed_player = previous_teams[1][TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY][-1]
+        added_player = dict(removed_player, **{TConsts.PLAYERS_NAME_KEY: "new player"})
+
+        teams, metadata = TeamGenerator.regenerate_teams(previous_teams, [removed_player[TConsts.PLAYERS_NAME_KEY]],
+                                                         [added_player], max_moved_players=0, return_metadata=True)
+
+        assert metadata[TConsts.GENERATION_METADATA_MOVED_PLAYERS_KEY] == 0
+        for previous_team, team in zip(previous_teams, teams):
+            previous_names = {player[TConsts.PLAYERS_NAME_KEY]
+                              for player in previous_team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]}
+            names = {player[TConsts.PLAYERS_NAME_KEY] for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]}
+            if removed_player[TConsts.PLAYERS_NAME_KEY] in previous_names:
+                previous_names = previous_names - {removed_player[TConsts.PLAYERS_NAME_KEY]} | {"new player"}
+            assert names == previous_names
+
+    def test_regeneration_reports_too_few_moves(self):
+        """
+        When the teams can't be legal without moving more players than allowed, the regeneration is infeasible.
+        """
+        random.seed(5)
+        roster = generate_roster(8, 2, seed=5)
+        previous_teams = TeamGenerator.generate_teams(list(roster), num_teams=2,
+                                                      engine=TConsts.TeamGenerationEngines["CBC"])
+        # Replacing a field player with a GK in the team that already has one forces the other GK (or the new one) out
+        removed_player = next(player for player in previous_teams[0][TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]
+                              if player[TConsts.PLAYERS_CHARACTERISTICS_KEY] != GK)
+        added_player = {TConsts.PLAYERS_NAME_KEY: "new gk", TConsts.PLAYERS_CHARACTERISTICS_KEY: GK,
+                        TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY: 0}
+
+        teams, metadata = TeamGenerator.regenerate_teams(previous_teams, [removed_player[TConsts.PLAYERS_NAME_KEY]],
+                                                         [added_player], max_moved_players=0, return_metadata=True)
+
+        assert teams is None
+        assert metadata[TConsts.GENERATION_METADATA_STATUS_KEY] == TConsts.TeamGenerationStatuses["INFEASIBLE"]
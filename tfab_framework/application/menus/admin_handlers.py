@@ -1,6 +1,9 @@
 from datetime import datetime
-from tfab_framework.tfab_database_handler import TFABDBHandler
-from tfab_utils import tfab_message_parser, tfab_team_generator
+from tfab_framework.tfab_async_database_handler import TFABAsyncDBHandler
+from tfab_framework.tfab_generation_service import TFABGenerationService
+from tfab_framework.tfab_solver_calibration import TFABSolverCalibration
+from tfab_framework.tfab_exception import TFABGenerationError, TFABGenerationCancelledError
+from tfab_utils import tfab_message_parser
 from tfab_framework.tfab_logger import tfab_logger
 from tfab_framework.tfab_consts import Consts as TConsts
 from tfab_framework.application.menus.menu_utils import UpdateTypes, HandlerUtils, TFABMenuHierarchy, UserDataIndices, CommonHandlers
@@ -30,11 +33,11 @@ class AdminMenuHandlers(object):
         elif update_type == UpdateTypes.TEXTUAL_MESSAGE:
             # We got here because the user attempted to enter the admin password
             if update.message.text == \
-                    TFABDBHandler.get_instance().get_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY):
+                    await TFABAsyncDBHandler.get_instance().get_configuration_value(TConsts.INTERNAL_ADMIN_PASSWORD_KEY):
                 first_name = update.effective_user.first_name
                 last_name = update.effective_user.last_name
                 if first_name:
-                    TFABDBHandler.get_instance().insert_admin(
+                    await TFABAsyncDBHandler.get_instance().insert_admin(
                         "{0}".format(first_name if last_name is None else first_name + " " + last_name),
                         update.effective_user.id)
                     context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = True
@@ -60,7 +63,7 @@ class AdminMenuHandlers(object):
         await query.answer()
 
         # First check if the user is logged in as admin.
-        if not TFABDBHandler.get_instance().check_admin_existence(update.effective_user.id):
+        if not await TFABAsyncDBHandler.get_instance().check_admin_existence(update.effective_user.id):
             return await AdminMenuHandlers.admin_login_handler(update, context)
 
         text = """להלן פעולות המנהלים האפשריות:"""
@@ -114,7 +117,9 @@ class MatchdaysMenuHandlers(object):
             [InlineKeyboardButton("הצג מידע להיום", callback_data=str(TFABMenuHierarchy.MATCHDAYS_MENU_SHOW_TODAY_INFO))],
             [InlineKeyboardButton("קבע רשימה להיום", callback_data=str(TFABMenuHierarchy.MATCHDAYS_MENU_SET_TODAY_LIST))],
             [InlineKeyboardButton("צור כוחות", callback_data=str(TFABMenuHierarchy.MATCHDAYS_MENU_GENERATE_TEAMS)),
-             InlineKeyboardButton("הגדרות", callback_data=str(TFABMenuHierarchy.MATCHDAYS_MENU_SETTINGS))]
+             InlineKeyboardButton("צור כוחות אחרים", callback_data=str(TFABMenuHierarchy.MATCHDAYS_MENU_REROLL_TEAMS))],
+            [InlineKeyboardButton("החלף שחקן", callback_data=str(TFABMenuHierarchy.MATCHDAYS_MENU_SWAP_PLAYER))],
+            [InlineKeyboardButton("הגדרות", callback_data=str(TFABMenuHierarchy.MATCHDAYS_MENU_SETTINGS))]
         ]
 
         await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
@@ -123,56 +128,154 @@ class MatchdaysMenuHandlers(object):
     @staticmethod
     async def generate_teams_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
-        Handle the admin->matchdays->generate teams menu.
+        Handle the admin->matchdays->generate teams menu. Identical requests for today's matchday receive the
+        teams generated earlier, unless the admin explicitly asked for other teams.
         """
         if HandlerUtils.get_update_type(update) != UpdateTypes.CALLBACK_QUERY:
             await CommonHandlers.illegal_situation_handler(update, context)
         await update.callback_query.answer()
 
-        db = TFABDBHandler.get_instance()
+        db = TFABAsyncDBHandler.get_instance()
         today_date = datetime.now().strftime(TConsts.MATCHDAYS_DATE_FORMAT)
 
-        if not db.check_matchday_existence(today_date):
+        if not await db.check_matchday_existence(today_date):
             context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = False
             await context.bot.send_message(chat_id=update.effective_chat.id, text="עדיין לא נקבעה רשימה להיום")
             return await CommonHandlers.entrypoint_handler(update, context)
 
-        todays_matchday = db.get_matchday(today_date)
+        todays_matchday = await db.get_matchday(today_date)
         todays_player_list = todays_matchday[TConsts.MATCHDAYS_ROSTER_KEY]
 
         # Prepare the data for the generation function
-        player_dicts_list = []
-        for player in todays_player_list:
-            player_dicts_list.append({
-                TConsts.PLAYERS_NAME_KEY: player,
-                TConsts.PLAYERS_CHARACTERISTICS_KEY: db.get_player_characteristic(player),
-                TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY: db.get_player_average_rating(player, db.get_configuration_value(TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY))})
-
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="מחשב..")
-        teams_dict = tfab_team_generator.TeamGenerator.generate_teams\
-            (player_dicts_list,
-             balance_team_ratings=db.get_configuration_value(TConsts.TeamGenerationParameters["BLC_RATINGS"]),
-             enforce_tiers=db.get_configuration_value(TConsts.TeamGenerationParameters["BLC_TIERS"]),
-             enforce_defense=db.get_configuration_value(TConsts.TeamGenerationParameters["BLC_DEFENSE"]),
-             enforce_offense=db.get_configuration_value(TConsts.TeamGenerationParameters["BLC_OFFENSE"]),
-             enforce_total_roles=db.get_configuration_value(TConsts.TeamGenerationParameters["BLC_ROLES"]),
-             num_teams=db.get_configuration_value(TConsts.TeamGenerationParameters["NUM_TEAMS"]),
-             coupling_constraints=todays_matchday[TConsts.MATCHDAYS_COUPLING_CONSTRAINTS_KEY],
-             decoupling_constraints=todays_matchday[TConsts.MATCHDAYS_DECOUPLING_CONSTRAINTS_KEY])
+        player_dicts_list = await MatchdaysMenuHandlers.get_player_dicts(todays_player_list)
+
+        progress_message = await context.bot.send_message(chat_id=update.effective_chat.id, text="מחשב..")
+
+        generation_parameters = dict(
+            await MatchdaysMenuHandlers.get_generation_flags(),
+            num_teams=await db.get_configuration_value(TConsts.TeamGenerationParameters["NUM_TEAMS"]),
+            coupling_constraints=todays_matchday[TConsts.MATCHDAYS_COUPLING_CONSTRAINTS_KEY],
+            decoupling_constraints=todays_matchday[TConsts.MATCHDAYS_DECOUPLING_CONSTRAINTS_KEY],
+            break_symmetry=True,
+            time_budget=await db.get_configuration_value(TConsts.TeamGenerationParameters["TIME_BUDGET"]),
+            return_metadata=True)
+        # The fastest engine that's balanced enough for this roster size, according to this host's calibration
+        generation_parameters["engine"] = TFABSolverCalibration.get_instance().select_engine(
+            len(player_dicts_list), generation_parameters["num_teams"])
+
+        try:
+            candidates = await TFABGenerationService.get_instance().generate_candidates\
+                (update.effective_user.id,
+                 player_dicts_list,
+                 await db.get_configuration_value(TConsts.TeamGenerationParameters["NUM_CANDIDATES"]),
+                 progress_callback=MatchdaysMenuHandlers.get_progress_reporter(progress_message),
+                 matchday_key=today_date,
+                 reroll=update.callback_query.data == str(TFABMenuHierarchy.MATCHDAYS_MENU_REROLL_TEAMS),
+                 **generation_parameters)
+        except TFABGenerationCancelledError:
+            # The admin already restarted the flow, so there's no one to report to
+            return TFABMenuHierarchy.GENERAL_MENU
+        except TFABGenerationError:
+            await context.bot.send_message(chat_id=update.effective_chat.id,
+                                           text="יש כרגע יותר מדי בקשות לייצור כוחות, נסה שוב בעוד מספר דקות")
+            context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = False
+            return await CommonHandlers.entrypoint_handler(update, context)
+
+        teams_dict, generation_metadata = candidates[0]
+        if generation_metadata[TConsts.GENERATION_METADATA_STATUS_KEY] == TConsts.TeamGenerationStatuses["NOT_SOLVED"]:
+            await context.bot.send_message(chat_id=update.effective_chat.id,
+                                           text="לא נמצאו כוחות מתאימים בזמן החישוב שהוקצב, נסה להגדיל אותו בהגדרות")
+            context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = False
+            return await CommonHandlers.entrypoint_handler(update, context)
         if not teams_dict:
-            await context.bot.send_message( chat_id=update.effective_chat.id,text="בלתי אפשרי לייצר כוחות מתאימים, שנה את הפרמטרים או מחק אילוצים")
+            # The reason found by the generation itself, which analyzed the players in the same order it solved them
+            reason = generation_metadata.get(TConsts.GENERATION_METADATA_REASON_KEY)
+            if reason is not None:
+                players = generation_metadata[TConsts.GENERATION_METADATA_REASON_PLAYERS_KEY]
+                await context.bot.send_message(
+                    chat_id=update.effective_chat.id,
+                    text="בלתי אפשרי לייצר כוחות מתאימים: {0}{1}".format(
+                        TConsts.TeamGenerationInfeasibilityReasonToHebrew[reason],
+                        " ({0})".format(",".join(players)) if players else ""))
+            else:
+                await context.bot.send_message( chat_id=update.effective_chat.id,text="בלתי אפשרי לייצר כוחות מתאימים, שנה את הפרמטרים או מחק אילוצים")
             context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = False
             return await CommonHandlers.entrypoint_handler(update, context)
-        if not db.insert_teams_to_matchday(today_date, teams_dict):
+
+        context.user_data[UserDataIndices.CONTEXTUAL_TEAM_CANDIDATES] = candidates
+        if len(candidates) == 1:
+            return await MatchdaysMenuHandlers.choose_teams_handler(update, context)
+
+        # Let the admin choose between the candidates, only the chosen one is saved
+        keyboard = []
+        for candidate_index, (candidate_teams, candidate_metadata) in enumerate(candidates):
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text="אפשרות {0}:\n{1}".format(candidate_index + 1,
+                                               await MatchdaysMenuHandlers.get_matchday_message(
+                                                   dict(todays_matchday, **{TConsts.MATCHDAYS_TEAMS_KEY: candidate_teams}))))
+            keyboard.append([InlineKeyboardButton(
+                "אפשרות {0} (פער של {1:.2f} בין הקבוצות)".format(
+                    candidate_index + 1, TFABGenerationService.get_rating_spread(candidate_teams)),
+                callback_data=TConsts.TEAM_CANDIDATE_QUERY_PREFIX + str(candidate_index))])
+
+        await context.bot.send_message(chat_id=update.effective_chat.id, text="בחר את הכוחות הרצויים:",
+                                       reply_markup=InlineKeyboardMarkup(keyboard))
+        return TFABMenuHierarchy.MATCHDAYS_MENU_CHOOSE_TEAMS
+
+    @staticmethod
+    async def choose_teams_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Handle the admin->matchdays->generate teams->choose teams menu, saving the chosen candidate.
+        """
+        if HandlerUtils.get_update_type(update) != UpdateTypes.CALLBACK_QUERY:
+            await CommonHandlers.illegal_situation_handler(update, context)
+
+        query = update.callback_query
+        candidates = context.user_data.get(UserDataIndices.CONTEXTUAL_TEAM_CANDIDATES)
+        if query.data.startswith(TConsts.TEAM_CANDIDATE_QUERY_PREFIX):
+            await query.answer()
+            candidate_index = int(query.data[len(TConsts.TEAM_CANDIDATE_QUERY_PREFIX):])
+        else:
+            # Reached directly from the generation, with a single candidate
+            candidate_index = 0
+        if not candidates or candidate_index >= len(candidates):
+            return await CommonHandlers.illegal_situation_handler(update, context)
+
+        db = TFABAsyncDBHandler.get_instance()
+        today_date = datetime.now().strftime(TConsts.MATCHDAYS_DATE_FORMAT)
+        teams_dict, generation_metadata = candidates[candidate_index]
+        if not await db.insert_teams_to_matchday(today_date, teams_dict):
             # Impossible because we already checked that there is a matchday occuring today
             await CommonHandlers.illegal_situation_handler(update, context)
 
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
-            text=tfab_message_parser.MessageParser.generate_matchday_message(db.get_matchday(today_date)))
+            text=await MatchdaysMenuHandlers.get_matchday_message(await db.get_matchday(today_date)))
+        if generation_metadata[TConsts.GENERATION_METADATA_STATUS_KEY] == TConsts.TeamGenerationStatuses["OPTIMAL"]:
+            await context.bot.send_message(chat_id=update.effective_chat.id, text="הכוחות מאוזנים באופן מיטבי")
+        elif generation_metadata[TConsts.GENERATION_METADATA_GAP_KEY] is None:
+            # The lineup was found without proving how far it is from the optimal one
+            await context.bot.send_message(chat_id=update.effective_chat.id,
+                                           text="הכוחות מאוזנים, אך לא הוכח שהאיזון מיטבי")
+        else:
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text="הכוחות רחוקים לכל היותר {0:.2f} נקודות דירוג מהאיזון המיטבי".format(
+                    generation_metadata[TConsts.GENERATION_METADATA_GAP_KEY]))
         context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = True
         return await CommonHandlers.entrypoint_handler(update, context)
 
+    @staticmethod
+    async def cancel_generation_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Handles restarting the flow while the teams are still being generated, by cancelling the generation.
+        """
+        if TFABGenerationService.get_instance().cancel(update.effective_user.id):
+            await context.bot.send_message(chat_id=update.effective_chat.id, text="ייצור הכוחות בוטל")
+
+        return await CommonHandlers.entrypoint_handler(update, context)
+
     @staticmethod
     async def set_todays_list_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -214,11 +317,8 @@ class MatchdaysMenuHandlers(object):
                                                text="ניתן לקבוע רשימה רק ביום המשחק")
                 return await CommonHandlers.entrypoint_handler(update, context)
 
-            all_players_exist_in_db = True
-            for player in result_dictionary[TConsts.MATCHDAYS_ROSTER_KEY]:
-                if not TFABDBHandler.get_instance().check_player_existence(player):
-                    all_players_exist_in_db = False
-                    break
+            all_players_exist_in_db, _ = await TFABAsyncDBHandler.get_instance().check_players_existence(
+                result_dictionary[TConsts.MATCHDAYS_ROSTER_KEY])
 
             if not all_players_exist_in_db:
                 context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = False
@@ -228,7 +328,7 @@ class MatchdaysMenuHandlers(object):
                 return await CommonHandlers.entrypoint_handler(update, context)
 
             # Insert DB information
-            TFABDBHandler.get_instance().insert_matchday(
+            await TFABAsyncDBHandler.get_instance().insert_matchday(
                 result_dictionary[TConsts.MATCHDAYS_ORIGINAL_MESSAGE_KEY],
                 result_dictionary[TConsts.MATCHDAYS_LOCATION_KEY],
                 result_dictionary[TConsts.MATCHDAYS_ROSTER_KEY],
@@ -242,6 +342,151 @@ class MatchdaysMenuHandlers(object):
 
         await CommonHandlers.illegal_situation_handler(update, context)
 
+    @staticmethod
+    async def swap_player_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Handle the admin->matchdays->swap player menu. The teams are regenerated from today's teams rather than from
+        scratch, so only a few players change teams.
+        """
+        update_type = HandlerUtils.get_update_type(update)
+        db = TFABAsyncDBHandler.get_instance()
+        today_date = datetime.now().strftime(TConsts.MATCHDAYS_DATE_FORMAT)
+        todays_matchday = await db.get_matchday(today_date)
+        context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = False
+
+        if update_type == UpdateTypes.CALLBACK_QUERY:
+            await update.callback_query.answer()
+            if not todays_matchday or not todays_matchday[TConsts.MATCHDAYS_TEAMS_KEY]:
+                await context.bot.send_message(chat_id=update.effective_chat.id, text="עדיין לא נוצרו כוחות להיום")
+                return await CommonHandlers.entrypoint_handler(update, context)
+
+            await context.bot.send_message(chat_id=update.effective_chat.id,
+                                           text="שלח את שם השחקן שיוצא בשורה הראשונה, ואת שם השחקן שנכנס בשורה השנייה")
+            context.user_data[UserDataIndices.CURRENT_STATE] = TFABMenuHierarchy.MATCHDAYS_MENU_SWAP_PLAYER
+            return TFABMenuHierarchy.GOT_INPUT
+        elif update_type != UpdateTypes.TEXTUAL_MESSAGE:
+            return await CommonHandlers.illegal_situation_handler(update, context)
+
+        lines = [line.strip() for line in update.message.text.splitlines() if line.strip()]
+        todays_player_list = todays_matchday[TConsts.MATCHDAYS_ROSTER_KEY] if todays_matchday else []
+        if len(lines) != 2:
+            await context.bot.send_message(chat_id=update.effective_chat.id, text="יש לשלוח בדיוק שני שמות")
+            return await CommonHandlers.entrypoint_handler(update, context)
+        leaving_player, joining_player = lines
+        if leaving_player not in todays_player_list:
+            await context.bot.send_message(chat_id=update.effective_chat.id,
+                                           text="{0} לא ברשימה של היום".format(leaving_player))
+            return await CommonHandlers.entrypoint_handler(update, context)
+        if joining_player in todays_player_list or not await db.check_player_existence(joining_player):
+            await context.bot.send_message(chat_id=update.effective_chat.id,
+                                           text="{0} כבר ברשימה של היום או לא קיים במערכת".format(joining_player))
+            return await CommonHandlers.entrypoint_handler(update, context)
+
+        # The leaving player is dropped from the constraints, which are kept as long as they still constrain anyone
+        def drop_leaving_player(constraints):
+            constraints = [[player for player in entry if player != leaving_player] for entry in constraints]
+            return [entry for entry in constraints if len(entry) > 1]
+
+        progress_message = await context.bot.send_message(chat_id=update.effective_chat.id, text="מחשב..")
+        try:
+            teams_dict, generation_metadata = await TFABGenerationService.get_instance().regenerate_teams(
+                update.effective_user.id,
+                todays_matchday[TConsts.MATCHDAYS_TEAMS_KEY],
+                [leaving_player],
+                await MatchdaysMenuHandlers.get_player_dicts([joining_player]),
+                progress_callback=MatchdaysMenuHandlers.get_progress_reporter(progress_message),
+                matchday_key=today_date,
+                max_moved_players=await db.get_configuration_value(TConsts.TeamGenerationParameters["MAX_MOVED_PLAYERS"]),
+                coupling_constraints=drop_leaving_player(todays_matchday[TConsts.MATCHDAYS_COUPLING_CONSTRAINTS_KEY]),
+                decoupling_constraints=drop_leaving_player(
+                    todays_matchday[TConsts.MATCHDAYS_DECOUPLING_CONSTRAINTS_KEY]),
+                return_metadata=True,
+                **(await MatchdaysMenuHandlers.get_generation_flags()))
+        except TFABGenerationCancelledError:
+            return TFABMenuHierarchy.GENERAL_MENU
+        except TFABGenerationError:
+            await context.bot.send_message(chat_id=update.effective_chat.id,
+                                           text="יש כרגע יותר מדי בקשות לייצור כוחות, נסה שוב בעוד מספר דקות")
+            return await CommonHandlers.entrypoint_handler(update, context)
+
+        if not teams_dict:
+            await context.bot.send_message(chat_id=update.effective_chat.id,
+                                           text="לא ניתן לשלב את {0} בלי להזיז יותר שחקנים, הגדל את מספר השחקנים "
+                                                "שמותר להזיז או צור כוחות מחדש".format(joining_player))
+            return await CommonHandlers.entrypoint_handler(update, context)
+
+        new_player_list = [player for player in todays_player_list if player != leaving_player] + [joining_player]
+        if not await db.insert_teams_to_matchday(today_date, teams_dict, player_list=new_player_list):
+            return await CommonHandlers.illegal_situation_handler(update, context)
+
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text=await MatchdaysMenuHandlers.get_matchday_message(await db.get_matchday(today_date)))
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text="{0} נכנס במקום {1}, מספר השחקנים שעברו קבוצה: {2}".format(
+                joining_player, leaving_player, generation_metadata[TConsts.GENERATION_METADATA_MOVED_PLAYERS_KEY]))
+        context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = True
+        return await CommonHandlers.entrypoint_handler(update, context)
+
+    @staticmethod
+    async def get_player_dicts(player_names):
+        """
+        :return: The player dictionaries of <player_names>, as the team generation expects them.
+        """
+        db = TFABAsyncDBHandler.get_instance()
+        characteristics, _ = await db.get_characteristics(player_names)
+        average_ratings = await db.get_average_ratings(player_names)
+        return [{TConsts.PLAYERS_NAME_KEY: player,
+                 TConsts.PLAYERS_CHARACTERISTICS_KEY: characteristics.get(player),
+                 TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY: average_ratings[player]}
+                for player in player_names]
+
+    @staticmethod
+    def get_progress_reporter(progress_message):
+        """
+        :param progress_message: The message to edit with the progress.
+        :return: A progress callback for TFABGenerationService, keeping the admin posted while the teams are being
+        generated. A text that didn't change isn't sent again, since Telegram rejects such edits.
+        """
+        last_text = progress_message.text
+
+        async def report_progress(queue_position, elapsed_time):
+            nonlocal last_text
+            if queue_position:
+                text = "ממתין בתור לחישוב, מקום {0}..".format(queue_position)
+            else:
+                text = "עדיין מחשב.. ({0:.0f} שניות)".format(elapsed_time)
+
+            if text != last_text:
+                last_text = text
+                await progress_message.edit_text(text)
+
+        return report_progress
+
+    @staticmethod
+    async def get_matchday_message(matchday_dict):
+        """
+        :return: The message describing <matchday_dict>, as generated by MessageParser.generate_matchday_message. The
+        characteristics of the teams' players are read beforehand, so generating the message doesn't block.
+        """
+        player_names = [player[TConsts.PLAYERS_NAME_KEY] for team in matchday_dict[TConsts.MATCHDAYS_TEAMS_KEY]
+                        for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]]
+        characteristics, _ = await TFABAsyncDBHandler.get_instance().get_characteristics(player_names)
+        return tfab_message_parser.MessageParser.generate_matchday_message(matchday_dict, characteristics)
+
+    @staticmethod
+    async def get_generation_flags():
+        """
+        :return: The balancing flags of the team generation, as configured in the parameters menu.
+        """
+        db = TFABAsyncDBHandler.get_instance()
+        return {"balance_team_ratings": await db.get_configuration_value(TConsts.TeamGenerationParameters["BLC_RATINGS"]),
+                "enforce_tiers": await db.get_configuration_value(TConsts.TeamGenerationParameters["BLC_TIERS"]),
+                "enforce_defense": await db.get_configuration_value(TConsts.TeamGenerationParameters["BLC_DEFENSE"]),
+                "enforce_offense": await db.get_configuration_value(TConsts.TeamGenerationParameters["BLC_OFFENSE"]),
+                "enforce_total_roles": await db.get_configuration_value(TConsts.TeamGenerationParameters["BLC_ROLES"])}
+
     @staticmethod
     async def show_todays_info_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -252,13 +497,13 @@ class MatchdaysMenuHandlers(object):
         await update.callback_query.answer()
 
         today_date = datetime.now().strftime(TConsts.MATCHDAYS_DATE_FORMAT)
-        todays_matchday = TFABDBHandler.get_instance().get_matchday(today_date)
+        todays_matchday = await TFABAsyncDBHandler.get_instance().get_matchday(today_date)
 
         if not todays_matchday:
             await context.bot.send_message(chat_id=update.effective_chat.id, text="עדיין לא נקבעה רשימה להיום")
             context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = False
         else:
-            message = tfab_message_parser.MessageParser.generate_matchday_message(todays_matchday)
+            message = await MatchdaysMenuHandlers.get_matchday_message(todays_matchday)
             await context.bot.send_message(chat_id=update.effective_chat.id, text=message)
             context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = True
 
@@ -317,7 +562,7 @@ class PlayersMenuHandlers(object):
 
                 if not player_name or not characteristic:
                     return await CommonHandlers.illegal_situation_handler(update, context)
-                TFABDBHandler.get_instance().insert_player(player_name, characteristic)
+                await TFABAsyncDBHandler.get_instance().insert_player(player_name, characteristic)
 
                 user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = True
                 return await CommonHandlers.entrypoint_handler(update, context)
@@ -366,7 +611,7 @@ class PlayersMenuHandlers(object):
                 if not player_name or not characteristic:
                     return await CommonHandlers.illegal_situation_handler(update, context)
 
-                if TFABDBHandler.get_instance().edit_player(player_name, characteristic)[0]:
+                if (await TFABAsyncDBHandler.get_instance().edit_player(player_name, characteristic))[0]:
                     user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = True
                     return await CommonHandlers.entrypoint_handler(update, context)
                 else:
@@ -381,7 +626,7 @@ class PlayersMenuHandlers(object):
             message = update.message
             user_data[UserDataIndices.CONTEXTUAL_EDITED_PLAYER] = message.text
 
-            if not TFABDBHandler.get_instance().check_player_existence(message.text):
+            if not await TFABAsyncDBHandler.get_instance().check_player_existence(message.text):
                 await context.bot.send_message(chat_id=update.effective_chat.id,
                                                text="""לא קיים שחקן כזה, וודא שהשם כתוב נכון""")
                 context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = False
@@ -429,7 +674,7 @@ class PlayersMenuHandlers(object):
                 tfab_logger.log("Player name was empty despite receiving a message!")
                 return await CommonHandlers.illegal_situation_handler(update, context)
 
-            if TFABDBHandler.get_instance().delete_player(player_name):
+            if await TFABAsyncDBHandler.get_instance().delete_player(player_name):
                 context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = True
                 return await CommonHandlers.entrypoint_handler(update, context)
             else:
@@ -447,7 +692,7 @@ class PlayersMenuHandlers(object):
             await CommonHandlers.illegal_situation_handler(update, context)
         await update.callback_query.answer()
 
-        all_players_list = TFABDBHandler.get_instance().get_player_list(hebrew_characteristics=True)
+        all_players_list = await TFABAsyncDBHandler.get_instance().get_player_list(hebrew_characteristics=True)
         all_players_message = tfab_message_parser.MessageParser.stringify_player_list(all_players_list)
         await context.bot.send_message(chat_id=update.effective_chat.id, text=all_players_message)
 
@@ -484,7 +729,7 @@ class SettingsMenuHandlers(object):
         await update.callback_query.answer()
         today_date = datetime.now().strftime(TConsts.MATCHDAYS_DATE_FORMAT)
 
-        if TFABDBHandler.get_instance().insert_constraints_to_matchday(date=today_date, absolute=True):
+        if await TFABAsyncDBHandler.get_instance().insert_constraints_to_matchday(date=today_date, absolute=True):
             await context.bot.send_message(chat_id=update.effective_chat.id, text="האילוצים נמחקו.")
             context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = True
         else:
@@ -502,7 +747,7 @@ class SettingsMenuHandlers(object):
 
         await update.callback_query.answer()
         today_date = datetime.now().strftime(TConsts.MATCHDAYS_DATE_FORMAT)
-        matchday = TFABDBHandler.get_instance().get_matchday(today_date)
+        matchday = await TFABAsyncDBHandler.get_instance().get_matchday(today_date)
         if not matchday:
             await context.bot.send_message(chat_id=update.effective_chat.id, text="שימוש באילוצים מחייב שתהיה רשימת משחק תקפה להיום.")
             context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = False
@@ -544,7 +789,7 @@ class SettingsMenuHandlers(object):
         await query.answer()
 
         today_date = datetime.now().strftime(TConsts.MATCHDAYS_DATE_FORMAT)
-        if not TFABDBHandler.get_instance().get_matchday(today_date):
+        if not await TFABAsyncDBHandler.get_instance().get_matchday(today_date):
             await context.bot.send_message(chat_id=update.effective_chat.id,
                                            text="שימוש באילוצים מחייב שתהיה רשימת משחק תקפה להיום.")
             context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = False
@@ -590,12 +835,9 @@ class SettingsMenuHandlers(object):
                 return await CommonHandlers.illegal_situation_handler(update, context)
         elif update_type == UpdateTypes.TEXTUAL_MESSAGE:
             # The user entered a list of players to couple/decouple
-            player_list = []
-
-            for player in update.message.text.splitlines():
-                player = player.strip()
-                if TFABDBHandler.get_instance().check_player_existence(player):
-                    player_list.append(player)
+            entered_players = [player.strip() for player in update.message.text.splitlines()]
+            existing_players, _ = await TFABAsyncDBHandler.get_instance().get_players(entered_players)
+            player_list = [player for player in entered_players if player in existing_players]
 
             if player_list:
                 output = "קלטתי את השחקנים: {0}".format(",".join(player_list))
@@ -603,9 +845,9 @@ class SettingsMenuHandlers(object):
                 today_date = datetime.now().strftime(TConsts.MATCHDAYS_DATE_FORMAT)
 
                 if user_data[UserDataIndices.CURRENT_STATE] == TFABMenuHierarchy.MATCHDAYS_CONSTRAINTS_CREATE_COUPLING:
-                    TFABDBHandler.get_instance().insert_constraints_to_matchday(today_date, couplings=[player_list])
+                    await TFABAsyncDBHandler.get_instance().insert_constraints_to_matchday(today_date, couplings=[player_list])
                 elif user_data[UserDataIndices.CURRENT_STATE] == TFABMenuHierarchy.MATCHDAYS_CONSTRAINTS_CREATE_DECOUPLING:
-                    TFABDBHandler.get_instance().insert_constraints_to_matchday(today_date, decouplings=[player_list])
+                    await TFABAsyncDBHandler.get_instance().insert_constraints_to_matchday(today_date, decouplings=[player_list])
 
                 user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = True
             else:
@@ -618,11 +860,11 @@ class SettingsMenuHandlers(object):
         """
         Handles the settings->constraints menu.
         """
-        def get_state_string(configuration_key):
+        async def get_state_string(configuration_key):
             """
             Returns the state string for the requested configuration key.
             """
-            return "דלוק" if TFABDBHandler.get_instance().get_configuration_value(configuration_key) == 1 else "כבוי"
+            return "דלוק" if await TFABAsyncDBHandler.get_instance().get_configuration_value(configuration_key) == 1 else "כבוי"
 
         if HandlerUtils.get_update_type(update) == UpdateTypes.TEXTUAL_MESSAGE:
             context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = True
@@ -632,7 +874,7 @@ class SettingsMenuHandlers(object):
 
         query = update.callback_query
         await query.answer()
-        db = TFABDBHandler.get_instance()
+        db = TFABAsyncDBHandler.get_instance()
 
         if query.data == str(TFABMenuHierarchy.MATCHDAYS_MENU_SETTINGS_PARAMETERS):
             pass
@@ -644,34 +886,55 @@ class SettingsMenuHandlers(object):
                             TConsts.TeamGenerationParameters["BLC_DEFENSE"],
                             TConsts.TeamGenerationParameters["BLC_OFFENSE"],
                             TConsts.TeamGenerationParameters["BLC_ROLES"]]:
-            db.modify_configuration_value(query.data, int(not db.get_configuration_value(query.data)))
+            await db.modify_configuration_value(query.data, int(not await db.get_configuration_value(query.data)))
         elif query.data == TConsts.TeamGenerationParameters["NUM_TEAMS"]:
-            current_size = db.get_configuration_value(TConsts.TeamGenerationParameters["NUM_TEAMS"])
-            db.modify_configuration_value(TConsts.TeamGenerationParameters["NUM_TEAMS"], 2 if (current_size + 1) % 6 == 0 else current_size + 1)
+            current_size = await db.get_configuration_value(TConsts.TeamGenerationParameters["NUM_TEAMS"])
+            await db.modify_configuration_value(TConsts.TeamGenerationParameters["NUM_TEAMS"], 2 if (current_size + 1) % 6 == 0 else current_size + 1)
         elif query.data == TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY:
-            current_thresh = db.get_configuration_value(TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY)
-            db.modify_configuration_value(TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY,
+            current_thresh = await db.get_configuration_value(TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY)
+            await db.modify_configuration_value(TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY,
                                           0.5 if (current_thresh + 0.25) % 2.5 == 0 else current_thresh + 0.25)
+        elif query.data == TConsts.TeamGenerationParameters["NUM_CANDIDATES"]:
+            current_candidates = await db.get_configuration_value(TConsts.TeamGenerationParameters["NUM_CANDIDATES"])
+            await db.modify_configuration_value(TConsts.TeamGenerationParameters["NUM_CANDIDATES"],
+                                          1 if current_candidates >= TConsts.MAX_TEAM_CANDIDATES
+                                          else current_candidates + 1)
+        elif query.data == TConsts.TeamGenerationParameters["MAX_MOVED_PLAYERS"]:
+            current_moves = await db.get_configuration_value(TConsts.TeamGenerationParameters["MAX_MOVED_PLAYERS"])
+            await db.modify_configuration_value(TConsts.TeamGenerationParameters["MAX_MOVED_PLAYERS"],
+                                          0 if current_moves >= 4 else current_moves + 1)
+        elif query.data == TConsts.TeamGenerationParameters["TIME_BUDGET"]:
+            time_budgets = [5, 10, 20, 30, 60]
+            current_budget = await db.get_configuration_value(TConsts.TeamGenerationParameters["TIME_BUDGET"])
+            next_index = (time_budgets.index(current_budget) + 1) % len(time_budgets) \
+                if current_budget in time_budgets else 0
+            await db.modify_configuration_value(TConsts.TeamGenerationParameters["TIME_BUDGET"], time_budgets[next_index])
         else:
             tfab_logger.error("Received illegal query data for the parameters menu")
             await CommonHandlers.illegal_situation_handler(update, context)
 
         text = """בחר את האפשרות הרצויה:"""
         keyboard = [
-            [InlineKeyboardButton("איזון דירוגי קבוצות: {0}".format(get_state_string(TConsts.TeamGenerationParameters["BLC_RATINGS"])),
+            [InlineKeyboardButton("איזון דירוגי קבוצות: {0}".format(await get_state_string(TConsts.TeamGenerationParameters["BLC_RATINGS"])),
                                   callback_data=str(TConsts.TeamGenerationParameters["BLC_RATINGS"])),
-             InlineKeyboardButton("מספר קבוצות: {0}".format(db.get_configuration_value(TConsts.TeamGenerationParameters["NUM_TEAMS"])),
+             InlineKeyboardButton("מספר קבוצות: {0}".format(await db.get_configuration_value(TConsts.TeamGenerationParameters["NUM_TEAMS"])),
                  callback_data=str(TConsts.TeamGenerationParameters["NUM_TEAMS"]))],
-            [InlineKeyboardButton("ווידוא שחקן מכל דרג: {0}".format(get_state_string(TConsts.TeamGenerationParameters["BLC_TIERS"])),
+            [InlineKeyboardButton("ווידוא שחקן מכל דרג: {0}".format(await get_state_string(TConsts.TeamGenerationParameters["BLC_TIERS"])),
                                   callback_data=str(TConsts.TeamGenerationParameters["BLC_TIERS"])),
-             InlineKeyboardButton("איזון תפקידים כללי: {0}".format(get_state_string(TConsts.TeamGenerationParameters["BLC_ROLES"])),
+             InlineKeyboardButton("איזון תפקידים כללי: {0}".format(await get_state_string(TConsts.TeamGenerationParameters["BLC_ROLES"])),
                     callback_data=str(TConsts.TeamGenerationParameters["BLC_ROLES"]))],
-            [InlineKeyboardButton("איזון שחקני הגנה: {0}".format(get_state_string(TConsts.TeamGenerationParameters["BLC_DEFENSE"])),
+            [InlineKeyboardButton("איזון שחקני הגנה: {0}".format(await get_state_string(TConsts.TeamGenerationParameters["BLC_DEFENSE"])),
                                   callback_data=str(TConsts.TeamGenerationParameters["BLC_DEFENSE"])),
-             InlineKeyboardButton("איזון שחקני התקפה: {0}".format(get_state_string(TConsts.TeamGenerationParameters["BLC_OFFENSE"])),
+             InlineKeyboardButton("איזון שחקני התקפה: {0}".format(await get_state_string(TConsts.TeamGenerationParameters["BLC_OFFENSE"])),
                                   callback_data=str(TConsts.TeamGenerationParameters["BLC_OFFENSE"]))],
-            [InlineKeyboardButton("מידת חופש למדרגים: {0}".format(db.get_configuration_value(TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY)),
-                                  callback_data=str(TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY))],
+            [InlineKeyboardButton("מידת חופש למדרגים: {0}".format(await db.get_configuration_value(TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY)),
+                                  callback_data=str(TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY)),
+             InlineKeyboardButton("זמן חישוב מקסימלי: {0} שניות".format(await db.get_configuration_value(TConsts.TeamGenerationParameters["TIME_BUDGET"])),
+                                  callback_data=str(TConsts.TeamGenerationParameters["TIME_BUDGET"]))],
+            [InlineKeyboardButton("מספר הצעות כוחות: {0}".format(await db.get_configuration_value(TConsts.TeamGenerationParameters["NUM_CANDIDATES"])),
+                                  callback_data=str(TConsts.TeamGenerationParameters["NUM_CANDIDATES"])),
+             InlineKeyboardButton("שחקנים שזזים בהחלפה: {0}".format(await db.get_configuration_value(TConsts.TeamGenerationParameters["MAX_MOVED_PLAYERS"])),
+                                  callback_data=str(TConsts.TeamGenerationParameters["MAX_MOVED_PLAYERS"]))],
             [InlineKeyboardButton("סיימתי", callback_data=str(TConsts.EOO_QUERY_DATA))]
             ]
 
@@ -30,6 +30,8 @@ class InputRoutingHandlers(object):
             return await RankersMenuHandlers.rank_everyone_handler(update, context)
         elif context.user_data[UserDataIndices.CURRENT_STATE] == TFABMenuHierarchy.MATCHDAYS_MENU_SET_TODAY_LIST:
             return await MatchdaysMenuHandlers.set_todays_list_handler(update, context)
+        elif context.user_data[UserDataIndices.CURRENT_STATE] == TFABMenuHierarchy.MATCHDAYS_MENU_SWAP_PLAYER:
+            return await MatchdaysMenuHandlers.swap_player_handler(update, context)
         elif context.user_data[UserDataIndices.CURRENT_STATE] in [TFABMenuHierarchy.MATCHDAYS_CONSTRAINTS_CREATE_DECOUPLING, TFABMenuHierarchy.MATCHDAYS_CONSTRAINTS_CREATE_COUPLING]:
             return await SettingsMenuHandlers.creating_constraints_menu(update, context)
         else:
@@ -20,6 +20,9 @@ class TFABMenuHierarchy(object):
             ADMIN_MENU_MATCHDAYS, \
                 MATCHDAYS_MENU_SET_TODAY_LIST, \
                 MATCHDAYS_MENU_GENERATE_TEAMS, \
+                MATCHDAYS_MENU_REROLL_TEAMS, \
+                    MATCHDAYS_MENU_CHOOSE_TEAMS, \
+                MATCHDAYS_MENU_SWAP_PLAYER, \
                 MATCHDAYS_MENU_SHOW_TODAY_INFO, \
                 MATCHDAYS_MENU_SETTINGS,  \
                     MATCHDAYS_MENU_SETTINGS_CONSTRAINTS, \
@@ -32,7 +35,7 @@ class TFABMenuHierarchy(object):
                 PLAYERS_MENU_ADD, \
                 PLAYERS_MENU_SHOW, \
                 PLAYERS_MENU_EDIT, \
-                PLAYERS_MENU_DELETE = range(25)
+                PLAYERS_MENU_DELETE = range(28)
 
 class UpdateTypes(object):
     CALLBACK_QUERY = 0
@@ -65,6 +68,7 @@ class UserDataIndices(object):
     CONTEXTUAL_EDITED_PLAYER = "EditedPlayer"
     CURRENT_STATE = "CurrentState"
     CONTEXTUAL_LAST_OPERATION_STATUS = "CurrentStatus"
+    CONTEXTUAL_TEAM_CANDIDATES = "TeamCandidates"
 
 class CommonHandlers(object):
     """
@@ -1,6 +1,6 @@
 from tfab_framework.tfab_exception import TFABApplicationError
 from tfab_framework.tfab_logger import tfab_logger
-from tfab_framework.tfab_database_handler import TFABDBHandler
+from tfab_framework.tfab_async_database_handler import TFABAsyncDBHandler
 from tfab_framework.application.menus.menu_utils import UpdateTypes, HandlerUtils, TFABMenuHierarchy, UserDataIndices, CommonHandlers
 from tfab_utils import tfab_message_parser
 from tfab_framework.tfab_consts import Consts as TConsts
@@ -28,11 +28,11 @@ class RankersMenuHandlers(object):
         elif update_type == UpdateTypes.TEXTUAL_MESSAGE:
             # We got here because the user attempted to enter the rankers password
             if update.message.text == \
-                    TFABDBHandler.get_instance().get_configuration_value(TConsts.INTERNAL_RANKER_PASSWORD_KEY):
+                    await TFABAsyncDBHandler.get_instance().get_configuration_value(TConsts.INTERNAL_RANKER_PASSWORD_KEY):
                 first_name = update.effective_user.first_name
                 last_name = update.effective_user.last_name
                 if first_name:
-                    TFABDBHandler.get_instance().insert_ranker(
+                    await TFABAsyncDBHandler.get_instance().insert_ranker(
                         "{0}".format(first_name if last_name is None else first_name + " " + last_name),
                         update.effective_user.id)
                     context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = True
@@ -47,11 +47,11 @@ class RankersMenuHandlers(object):
         return await CommonHandlers.entrypoint_handler(update, context)
 
     @staticmethod
-    def __get_rankings_template(update, context):
+    async def __get_rankings_template(update, context):
         players = [name
-                   for name, role, _ in TFABDBHandler.get_instance().get_player_list(hebrew_characteristics=False)
+                   for name, role, _ in await TFABAsyncDBHandler.get_instance().get_player_list(hebrew_characteristics=False)
                    if role != TConsts.PlayerCharacteristics["GOALKEEPER"]]
-        user_rankings = TFABDBHandler.get_instance().get_user_rankings(update.effective_user.id)
+        user_rankings = await TFABAsyncDBHandler.get_instance().get_user_rankings(update.effective_user.id)
         if user_rankings is None:
             raise TFABApplicationError("Logged-in user doesn't have rankings!")
 
@@ -69,7 +69,7 @@ class RankersMenuHandlers(object):
         await query.answer()
 
         # First check if the user is logged in as a ranker.
-        if not TFABDBHandler.get_instance().check_ranker_existence(update.effective_user.id):
+        if not await TFABAsyncDBHandler.get_instance().check_ranker_existence(update.effective_user.id):
             return await RankersMenuHandlers.ranker_login_handler(update, context)
 
         text = """להלן פעולות הדירוגים האפשריות:"""
@@ -103,7 +103,7 @@ class RankersMenuHandlers(object):
                 await context.bot.send_message(chat_id=update.effective_chat.id,
                                                text="""שלח דירוג עבור שחקן ספציפי (למשל: רונאלדו = 9)""")
             elif update.callback_query.data == str(TFABMenuHierarchy.RANKER_MENU_RANK_EVERYONE):
-                rankings_template = RankersMenuHandlers.__get_rankings_template(update, context)
+                rankings_template = await RankersMenuHandlers.__get_rankings_template(update, context)
 
                 await context.bot.send_message(chat_id=update.effective_chat.id, text=rankings_template)
                 await context.bot.send_message(chat_id=update.effective_chat.id,
@@ -114,7 +114,7 @@ class RankersMenuHandlers(object):
             # Handles the case where the user entered the Ranking message
             rankings_message = update.message.text
             rankings_dict = tfab_message_parser.MessageParser.parse_rankings_message(rankings_message)
-            found, modified = TFABDBHandler.get_instance().modify_user_rankings(
+            found, modified = await TFABAsyncDBHandler.get_instance().modify_user_rankings(
                 update.effective_user.id, rankings_dict)
 
             if modified:
@@ -143,7 +143,7 @@ class RankersMenuHandlers(object):
 
         await update.callback_query.answer()
 
-        rankings_template = RankersMenuHandlers.__get_rankings_template(update, context)
+        rankings_template = await RankersMenuHandlers.__get_rankings_template(update, context)
         await context.bot.send_message(chat_id=update.effective_chat.id, text=rankings_template)
 
         context.user_data[UserDataIndices.CONTEXTUAL_LAST_OPERATION_STATUS] = True
@@ -1,5 +1,6 @@
 from tfab_framework.tfab_logger import tfab_logger
 from tfab_framework.tfab_consts import Consts as TConsts
+from tfab_framework.tfab_generation_service import TFABGenerationService
 from tfab_framework.application.menus.input_handlers import InputRoutingHandlers
 from tfab_framework.application.menus.rankers_handlers import RankersMenuHandlers
 from tfab_framework.application.menus.admin_handlers import AdminMenuHandlers, MatchdaysMenuHandlers, PlayersMenuHandlers, SettingsMenuHandlers
@@ -62,10 +63,17 @@ class TFABApplication(object):
                     CallbackQueryHandler(MatchdaysMenuHandlers.show_todays_info_handler,
                                          pattern=str(TFABMenuHierarchy.MATCHDAYS_MENU_SHOW_TODAY_INFO)),
                     CallbackQueryHandler(MatchdaysMenuHandlers.generate_teams_handler,
-                                         pattern=str(TFABMenuHierarchy.MATCHDAYS_MENU_GENERATE_TEAMS)),
+                                         pattern=(str(TFABMenuHierarchy.MATCHDAYS_MENU_GENERATE_TEAMS) + "|" +
+                                                  str(TFABMenuHierarchy.MATCHDAYS_MENU_REROLL_TEAMS))),
+                    CallbackQueryHandler(MatchdaysMenuHandlers.swap_player_handler,
+                                         pattern=str(TFABMenuHierarchy.MATCHDAYS_MENU_SWAP_PLAYER)),
                     CallbackQueryHandler(MatchdaysMenuHandlers.matchdays_settings_menu,
                                          pattern=str(TFABMenuHierarchy.MATCHDAYS_MENU_SETTINGS)),
                 ],
+                TFABMenuHierarchy.MATCHDAYS_MENU_CHOOSE_TEAMS: [
+                    CallbackQueryHandler(MatchdaysMenuHandlers.choose_teams_handler,
+                                         pattern=str(TConsts.TEAM_CANDIDATE_QUERY_PREFIX))
+                ],
                 TFABMenuHierarchy.MATCHDAYS_MENU_SETTINGS: [
                     CallbackQueryHandler(SettingsMenuHandlers.constraints_menu_handler,
                                          pattern=str(TFABMenuHierarchy.MATCHDAYS_MENU_SETTINGS_CONSTRAINTS)),
@@ -99,9 +107,17 @@ class TFABApplication(object):
                 ],
                 TFABMenuHierarchy.GOT_INPUT: [
                     MessageHandler(filters.TEXT & ~filters.COMMAND, InputRoutingHandlers.text_input_handler)
+                ],
+                ConversationHandler.WAITING: [
+                    CommandHandler(["start", "help"], MatchdaysMenuHandlers.cancel_generation_handler)
                 ]
             },
-            fallbacks=[CommandHandler(["start", "help"], CommonHandlers.entrypoint_handler)]
+            fallbacks=[CommandHandler(["start", "help"], CommonHandlers.entrypoint_handler)],
+            # The handlers await the DB and the team generation, so they're all non-blocking - otherwise PTB waits for
+            # each update's handler before reading the next update, and a slow one stalls every other user. Updates
+            # are still read one by one (as ConversationHandler requires), and a user's updates that arrive while
+            # their previous one is handled go to the WAITING state
+            block=False
         )
 
         # Add ConversationHandler to application that will be used for handling updates
@@ -115,4 +131,7 @@ class TFABApplication(object):
         """
         Performs the actual logic of the TFABApplication.
         """
-        self.__ptb_app.run_polling()
+        try:
+            self.__ptb_app.run_polling()
+        finally:
+            TFABGenerationService.get_instance().shutdown()
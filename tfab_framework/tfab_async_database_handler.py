@@ -0,0 +1,93 @@
+import asyncio
+import inspect
+import pymongo
+from concurrent.futures import ThreadPoolExecutor
+from tfab_framework import tfab_exception
+from tfab_framework.tfab_database_handler import TFABDBHandler
+
+
+class TFABAsyncDBHandler(object):
+    """
+    The asyncio counterpart of TFABDBHandler, for the menu handlers - every public method of TFABDBHandler, as a
+    coroutine. The blocking MongoDB calls run in a bounded pool of threads (each using its own pooled connection), so
+    a slow query never stalls the event loop, and every call is limited by a timeout.
+    The sync TFABDBHandler it wraps (with its caches) is shared with the rest of the system. It isn't reimplemented over
+    pymongo's AsyncMongoClient, so the caches (the configuration and the player directory), the materialized ratings
+    and the migrations keep a single implementation - shared with the scripts using the sync handler, and kept
+    consistent by the handler's cache lock.
+    """
+    _instance = None
+
+    DEFAULT_MAX_CONCURRENCY = 8
+    DEFAULT_CALL_TIMEOUT = 10
+
+    # The methods of TFABDBHandler offered as coroutines
+    COROUTINE_NAMES = frozenset(name for name, _ in inspect.getmembers(TFABDBHandler, inspect.isfunction)
+                                if not name.startswith("_") and
+                                not isinstance(inspect.getattr_static(TFABDBHandler, name), staticmethod))
+
+    @staticmethod
+    def get_instance(db_handler=None, max_concurrency=None, call_timeout=None):
+        if TFABAsyncDBHandler._instance is None:
+            TFABAsyncDBHandler._instance = TFABAsyncDBHandler(db_handler if db_handler is not None
+                                                              else TFABDBHandler.get_instance(),
+                                                              max_concurrency, call_timeout)
+        return TFABAsyncDBHandler._instance
+
+    def __init__(self, db_handler, max_concurrency=None, call_timeout=None):
+        """
+        Initializes an instance of TFABAsyncDBHandler.
+        :param db_handler: The TFABDBHandler whose methods are run.
+        :param max_concurrency: The amount of DB calls that may run concurrently, each holding a pooled connection.
+        :param call_timeout: The time, in seconds, a DB call may take before it's aborted.
+        """
+        self.db_handler = db_handler
+        self.max_concurrency = max_concurrency if max_concurrency is not None else self.DEFAULT_MAX_CONCURRENCY
+        self.call_timeout = call_timeout if call_timeout is not None else self.DEFAULT_CALL_TIMEOUT
+        if self.max_concurrency < 1 or self.call_timeout <= 0:
+            raise tfab_exception.TFABDatabaseError("Illegal DB concurrency limits")
+
+        self.__executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="TFABDB")
+
+    def __getattr__(self, name):
+        """
+        :return: A coroutine function running the TFABDBHandler method <name>. Accepts the same arguments as the
+        method, and optionally <call_timeout> to override the default timeout of the call.
+        """
+        if name not in TFABAsyncDBHandler.COROUTINE_NAMES:
+            raise AttributeError("'{0}' object has no attribute '{1}'".format(type(self).__name__, name))
+        method = getattr(self.db_handler, name)
+
+        async def coroutine(*args, call_timeout=None, **kwargs):
+            return await self.__run(method, args, kwargs, call_timeout)
+
+        coroutine.__name__ = name
+        coroutine.__doc__ = method.__doc__
+        # Cached, so the coroutine function is only created once
+        setattr(self, name, coroutine)
+        return coroutine
+
+    async def __run(self, method, args, kwargs, call_timeout):
+        """
+        Runs <method> in the thread pool.
+        The driver aborts the DB operations once the timeout is due. Waiting is bounded as well, in case the call is
+        stuck elsewhere (it then finishes in the background, and its result is discarded).
+        """
+        timeout = call_timeout if call_timeout is not None else self.call_timeout
+
+        def run_with_timeout():
+            with pymongo.timeout(timeout):
+                return method(*args, **kwargs)
+
+        try:
+            return await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(self.__executor, run_with_timeout),
+                                          timeout)
+        except asyncio.TimeoutError:
+            raise tfab_exception.TFABDatabaseError(
+                "TFAB Database Error occurred: {0} timed out after {1} seconds".format(method.__name__, timeout))
+
+    def shutdown(self):
+        """
+        Waits for the running DB calls, and releases the threads.
+        """
+        self.__executor.shutdown(wait=True)
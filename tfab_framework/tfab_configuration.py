@@ -1,6 +1,6 @@
 from tfab_framework.tfab_exception import TFABConfigurationError
 import yaml
-from schema import Schema, And
+from schema import Schema, And, Or, Optional
 
 class TFABConfiguration(object):
     """
@@ -22,7 +22,13 @@ class TFABConfiguration(object):
                         'MONGODB_PORT': And(int),
                         'DB_NAME': And(str),
                         'BOTITO_SECRET_RANKERS_PASSWORD': And(str),
-                        'BOTITO_SECRET_ADMINS_PASSWORD': And(str)
+                        'BOTITO_SECRET_ADMINS_PASSWORD': And(str),
+                        Optional('GENERATION_MAX_WORKERS'): And(int, lambda n: n > 0),
+                        Optional('GENERATION_MAX_QUEUE_SIZE'): And(int, lambda n: n >= 0),
+                        Optional('SOLVER_CALIBRATION_PATH'): And(str),
+                        Optional('CONFIGURATION_POLL_INTERVAL'): And(Or(int, float), lambda n: n >= 0),
+                        Optional('DB_MAX_CONCURRENCY'): And(int, lambda n: n > 0),
+                        Optional('DB_CALL_TIMEOUT'): And(Or(int, float), lambda n: n > 0)
                     }
                 )
  
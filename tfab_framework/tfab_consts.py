@@ -8,7 +8,49 @@ class Consts(object):
         "BLC_DEFENSE": "BD",
         "BLC_OFFENSE": "BO",
         "BLC_ROLES": "BRO",
-        "NUM_TEAMS": "NT"
+        "NUM_TEAMS": "NT",
+        "TIME_BUDGET": "TB",
+        "NUM_CANDIDATES": "NC",
+        "MAX_MOVED_PLAYERS": "MMP"
+    }
+
+    TeamGenerationEngines = {
+        "CBC": "CBC",
+        "HIGHS": "HiGHS",
+        "HEURISTIC": "Heuristic",
+        "BRANCH_AND_BOUND": "BranchAndBound",
+        "AUTO": "Auto"
+    }
+
+    TeamGenerationStatuses = {
+        "OPTIMAL": "Optimal",
+        "FEASIBLE": "Feasible",
+        "INFEASIBLE": "Infeasible",
+        "NOT_SOLVED": "NotSolved"
+    }
+
+    TeamGenerationInfeasibilityReasons = {
+        "NOT_ENOUGH_PLAYERS": "NotEnoughPlayers",
+        "UNKNOWN_PLAYERS": "UnknownPlayers",
+        "TOO_MANY_GOALKEEPERS": "TooManyGoalkeepers",
+        "COUPLED_GOALKEEPERS": "CoupledGoalkeepers",
+        "COUPLING_TOO_LARGE": "CouplingTooLarge",
+        "COUPLED_SAME_TIER": "CoupledSameTier",
+        "COUPLINGS_DONT_FIT": "CouplingsDontFit",
+        "DECOUPLING_TOO_LARGE": "DecouplingTooLarge",
+        "COUPLED_AND_DECOUPLED": "CoupledAndDecoupled"
+    }
+
+    TeamGenerationInfeasibilityReasonToHebrew = {
+        "NotEnoughPlayers": "אין מספיק שחקנים עבור כל הקבוצות",
+        "UnknownPlayers": "האילוצים כוללים שחקנים שאינם ברשימה להיום",
+        "TooManyGoalkeepers": "יש יותר שוערים מאשר קבוצות",
+        "CoupledGoalkeepers": "לא ניתן להצמיד שוערים זה לזה",
+        "CouplingTooLarge": "הצמדה כוללת יותר שחקנים מגודל קבוצה",
+        "CoupledSameTier": "לא ניתן להצמיד שחקנים מאותו דרג כשהאיזון לפי דרגים דלוק",
+        "CouplingsDontFit": "ההצמדות גדולות מכדי להיכנס יחד למספר הקבוצות",
+        "DecouplingTooLarge": "הפרדה כוללת יותר שחקנים ממספר הקבוצות",
+        "CoupledAndDecoupled": "שחקנים מוצמדים וגם מופרדים זה מזה"
     }
 
     PlayerCharacteristics = {
@@ -32,10 +74,17 @@ class Consts(object):
     RANKERS_COLLECTION_NAME = "AuthorizedRankers"
     RANKERS_USER_RANKINGS = "UserRankings"
     ADMINS_COLLECTION_NAME = "AuthorizedAdmins"
+    RANKINGS_COLLECTION_NAME = "Rankings"
+    RANKINGS_RANKER_ID_KEY = "RankerId"
+    RANKINGS_PLAYER_ID_KEY = "PlayerId"
+    RANKINGS_VALUE_KEY = "Ranking"
+    RANKINGS_TIMESTAMP_KEY = "Timestamp"
     USER_ID_KEY = "UserId"
     USER_FULLNAME_KEY = "UserFullName"
 
     EOO_QUERY_DATA = "EndOfOperation"
+    TEAM_CANDIDATE_QUERY_PREFIX = "TeamCandidate"
+    MAX_TEAM_CANDIDATES = 5
 
     MATCHDAYS_COLLECTION_NAME = "Matchdays"
     MATCHDAYS_TEAMS_KEY = "Teams"
@@ -52,9 +101,54 @@ class Consts(object):
     MATCHDAYS_COUPLING_CONSTRAINTS_KEY = "CouplingConstraints"
     MATCHDAYS_DECOUPLING_CONSTRAINTS_KEY = "DecouplingConstraints"
 
+    GENERATION_METADATA_ENGINE_KEY = "Engine"
+    GENERATION_METADATA_STATUS_KEY = "Status"
+    GENERATION_METADATA_REASON_KEY = "Reason"
+    GENERATION_METADATA_REASON_PLAYERS_KEY = "ReasonPlayers"
+    GENERATION_METADATA_OBJECTIVE_KEY = "Objective"
+    GENERATION_METADATA_BEST_BOUND_KEY = "BestBound"
+    GENERATION_METADATA_GAP_KEY = "Gap"
+    GENERATION_METADATA_NODES_KEY = "Nodes"
+    GENERATION_METADATA_MOVED_PLAYERS_KEY = "MovedPlayers"
+
+    GENERATION_STATISTICS_QUEUE_DEPTH_KEY = "QueueDepth"
+    GENERATION_STATISTICS_RUNNING_KEY = "RunningJobs"
+    GENERATION_STATISTICS_LAST_WAIT_KEY = "LastWaitTime"
+    GENERATION_STATISTICS_AVERAGE_WAIT_KEY = "AverageWaitTime"
+
+    SOLVER_CALIBRATION_QUALITY_TARGET_KEY = "QualityTarget"
+    SOLVER_CALIBRATION_MEASUREMENTS_KEY = "Measurements"
+    SOLVER_CALIBRATION_SELECTION_KEY = "Selection"
+    SOLVER_CALIBRATION_PLAYERS_KEY = "Players"
+    SOLVER_CALIBRATION_TEAMS_KEY = "Teams"
+    SOLVER_CALIBRATION_ENGINE_KEY = "Engine"
+    SOLVER_CALIBRATION_LATENCY_KEY = "Latency"
+    SOLVER_CALIBRATION_EXCESS_KEY = "Excess"
+
+    PLAYER_RATINGS_COLLECTION_NAME = "PlayerRatings"
+    PLAYER_RATINGS_RATINGS_KEY = "Ratings"
+    PLAYER_RATINGS_COUNT_KEY = "RatingsCount"
+    PLAYER_RATINGS_MEAN_KEY = "RatingsMean"
+    PLAYER_RATINGS_STD_KEY = "RatingsStd"
+    PLAYER_RATINGS_AVERAGE_KEY = "AverageRating"
+
+    LINEUP_CACHE_COLLECTION_NAME = "LineupCache"
+    LINEUP_CACHE_FINGERPRINT_KEY = "Fingerprint"
+    LINEUP_CACHE_LINEUP_KEY = "Lineup"
+    LINEUP_CACHE_TIMESTAMP_KEY = "Timestamp"
+
     INTERNAL_COLLECTION_NAME = "InternalData"
     INTERNAL_CONFIGURATION_KEY = "ConfigKey"
     INTERNAL_CONFIGURATION_VALUE = "ConfigValue"
     INTERNAL_ADMIN_PASSWORD_KEY = "AdminPassword"
     INTERNAL_RANKER_PASSWORD_KEY = "RankerPassword"
     INTERNAL_RATING_DEVIATION_THRESHOLD_KEY = "MaximumDeviationThreshold"
+    # Formerly held the cache versions, which are removed from databases that still hold them
+    INTERNAL_CONFIGURATION_VERSION_KEY = "ConfigurationVersion"
+    INTERNAL_PLAYERS_VERSION_KEY = "PlayersVersion"
+
+    CACHE_VERSIONS_COLLECTION_NAME = "CacheVersions"
+    CACHE_VERSIONS_NAME_KEY = "CacheName"
+    CACHE_VERSIONS_VERSION_KEY = "Version"
+    CACHE_VERSIONS_CONFIGURATION = "Configuration"
+    CACHE_VERSIONS_PLAYERS = "Players"
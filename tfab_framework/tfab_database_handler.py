@@ -1,7 +1,10 @@
+import time
+import threading
 import numpy as np
+from datetime import datetime
 from tfab_framework import tfab_exception
 from tfab_framework.tfab_consts import Consts as TConsts
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne, ReturnDocument, ASCENDING, DESCENDING
 
 class TFABDBHandler(object):
     """
@@ -9,19 +12,47 @@ class TFABDBHandler(object):
     """
     _instance = None
 
+    # <collection, keys, unique> of every index the lookups rely on. Unique wherever the data model expects uniqueness
+    INDEX_SPECIFICATION = [
+        (TConsts.PLAYERS_COLLECTION_NAME, [(TConsts.PLAYERS_NAME_KEY, ASCENDING)], True),
+        (TConsts.ADMINS_COLLECTION_NAME, [(TConsts.USER_ID_KEY, ASCENDING)], True),
+        (TConsts.RANKERS_COLLECTION_NAME, [(TConsts.USER_ID_KEY, ASCENDING)], True),
+        (TConsts.MATCHDAYS_COLLECTION_NAME, [(TConsts.MATCHDAYS_DATE_KEY, ASCENDING)], True),
+        (TConsts.INTERNAL_COLLECTION_NAME, [(TConsts.INTERNAL_CONFIGURATION_KEY, ASCENDING)], True),
+        (TConsts.CACHE_VERSIONS_COLLECTION_NAME, [(TConsts.CACHE_VERSIONS_NAME_KEY, ASCENDING)], True),
+        (TConsts.LINEUP_CACHE_COLLECTION_NAME, [(TConsts.LINEUP_CACHE_FINGERPRINT_KEY, ASCENDING)], True),
+        (TConsts.LINEUP_CACHE_COLLECTION_NAME, [(TConsts.LINEUP_CACHE_TIMESTAMP_KEY, DESCENDING)], False),
+        (TConsts.PLAYER_RATINGS_COLLECTION_NAME, [(TConsts.PLAYERS_NAME_KEY, ASCENDING)], True),
+        # A ranker's rankings are fetched by the ranker, and a player's rankings by the player
+        (TConsts.RANKINGS_COLLECTION_NAME,
+         [(TConsts.RANKINGS_RANKER_ID_KEY, ASCENDING), (TConsts.RANKINGS_PLAYER_ID_KEY, ASCENDING)], True),
+        (TConsts.RANKINGS_COLLECTION_NAME,
+         [(TConsts.RANKINGS_PLAYER_ID_KEY, ASCENDING), (TConsts.RANKINGS_RANKER_ID_KEY, ASCENDING)], False),
+    ]
+
     @staticmethod
-    def get_instance(db_name=None, db_port=None):
+    def get_instance(db_name=None, db_port=None, configuration_poll_interval=None):
         if TFABDBHandler._instance is None:
-            TFABDBHandler._instance = TFABDBHandler(db_name, db_port)
+            TFABDBHandler._instance = TFABDBHandler(db_name, db_port, configuration_poll_interval)
         return TFABDBHandler._instance
 
-    def __init__(self, db_name, db_port):
+    def __init__(self, db_name, db_port, configuration_poll_interval=None):
         """
         Initializes an instance of TFABDBHandler, currently coupled to MongoDB.
         :param db_name: The name of the db to be used.
         :param db_port: The port in which the MongoDB server runs.
+        :param configuration_poll_interval: The interval, in seconds, in which the cached configuration and player
+        directory check whether another process modified them. None if this process is the only one using the DB.
         """
         self.db_name = db_name
+        self.configuration_poll_interval = configuration_poll_interval
+        self.__configuration_cache = None
+        self.__configuration_version = None
+        self.__player_directory = None
+        self.__player_directory_version = None
+        self.__cache_check_time = 0
+        # Guards the caches, which the threads of TFABAsyncDBHandler load, invalidate and update concurrently
+        self.__cache_lock = threading.RLock()
         self.mongo_client = MongoClient("mongodb://localhost:{0}/".format(db_port))
         self.db = self.mongo_client[db_name]
 
@@ -30,12 +61,56 @@ class TFABDBHandler(object):
 
         # Make sure all the core collections exist prior to running the app
         collection_names = self.db.list_collection_names()
+        # Transactions need a replica set (or a sharded cluster), a standalone server doesn't support them
+        self.supports_transactions = self.mongo_client.topology_description.topology_type_name in \
+            ["ReplicaSetWithPrimary", "Sharded", "LoadBalanced"]
         for cname in [TConsts.PLAYERS_COLLECTION_NAME, TConsts.ADMINS_COLLECTION_NAME,
                       TConsts.RANKERS_COLLECTION_NAME, TConsts.MATCHDAYS_COLLECTION_NAME,
-                      TConsts.INTERNAL_COLLECTION_NAME]:
+                      TConsts.INTERNAL_COLLECTION_NAME, TConsts.LINEUP_CACHE_COLLECTION_NAME,
+                      TConsts.PLAYER_RATINGS_COLLECTION_NAME, TConsts.RANKINGS_COLLECTION_NAME,
+                      TConsts.CACHE_VERSIONS_COLLECTION_NAME]:
             if cname not in collection_names:
                 self.db.create_collection(cname)
 
+        self.created_indexes, self.failed_indexes = self.ensure_indexes()
+        self.__migrate_embedded_rankings()
+        self.__remove_legacy_cache_versions()
+
+    def ensure_indexes(self):
+        """
+        Creates the indexes of INDEX_SPECIFICATION that don't exist yet, and replaces existing indexes on the same keys
+        whose uniqueness differs from the specification. Does nothing if all the indexes exist as specified.
+        :return: (A, B) -> A is a list of the created indexes, B is a list of the indexes that couldn't be created
+        (e.g. a unique index over duplicate values), along with the reason. Indexes are described as
+        <Collection>.<IndexName>.
+        """
+        created_indexes = []
+        failed_indexes = []
+
+        for collection_name, keys, unique in TFABDBHandler.INDEX_SPECIFICATION:
+            collection = self.__get_collection(collection_name)
+            index_name = "_".join("{0}_{1}".format(key, direction) for key, direction in keys)
+            description = "{0}.{1}".format(collection_name, index_name)
+
+            try:
+                existing_index = collection.index_information().get(index_name)
+                if existing_index is not None and existing_index.get("unique", False) == unique:
+                    continue
+                if existing_index is not None:
+                    collection.drop_index(index_name)
+                collection.create_index(keys, name=index_name, unique=unique)
+                created_indexes.append(description)
+            except Exception as e:
+                failed_indexes.append("{0} ({1})".format(description, str(e)))
+                # Lookups still benefit from a non-unique index over the same keys
+                if unique:
+                    try:
+                        collection.create_index(keys, name=index_name)
+                    except Exception:
+                        pass
+
+        return created_indexes, failed_indexes
+
     def insert_configuration_value(self, configuration_key, configuration_value):
         """
         Inserts configuration values to the database.
@@ -49,6 +124,8 @@ class TFABDBHandler(object):
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
+        self.__invalidate_configuration_cache()
+
     def modify_configuration_value(self, configuration_key, configuration_value):
         """
         Modifies <configuration_key> to hold <configuration_value>.
@@ -62,38 +139,162 @@ class TFABDBHandler(object):
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
+        if result.modified_count == 1:
+            self.__invalidate_configuration_cache()
+
+        # The materialized averages filter the outliers by the deviation threshold
+        if configuration_key == TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY and result.modified_count == 1:
+            self.recompute_player_ratings()
+
         return result.matched_count == 1, result.modified_count == 1
 
     def get_configuration_value(self, configuration_key):
         """
         Receives the value for <configuration_key>, out of the application's configuration.
         """
-        internal_collection = self.__get_collection(TConsts.INTERNAL_COLLECTION_NAME)
-        filter_object = {TConsts.INTERNAL_CONFIGURATION_KEY: configuration_key}
+        return self.__get_configuration().get(configuration_key)
+
+    def check_configuration_existence(self, configuration_key):
+        """
+        Checks whether a configuration key exists in the database.
+        :param configuration_key: The key to search for
+        :return: True if <configuration_key> exists in the Internal collection, False otherwise
+        """
+        return configuration_key in self.__get_configuration()
+
+    def __get_configuration(self):
+        """
+        :return: A dictionary holding the entire configuration. It's read once and served from memory until it's
+        modified - by this process, or by another one (noticed by polling the configuration's version).
+        """
+        with self.__cache_lock:
+            self.__poll_cache_versions()
+
+            configuration = self.__configuration_cache
+            if configuration is None:
+                internal_collection = self.__get_collection(TConsts.INTERNAL_COLLECTION_NAME)
+                try:
+                    # The version is read first, so a modification made during the read is noticed by the next poll
+                    version = self.__get_cache_versions().get(TConsts.CACHE_VERSIONS_CONFIGURATION)
+                    configuration = {entry[TConsts.INTERNAL_CONFIGURATION_KEY]:
+                                     entry[TConsts.INTERNAL_CONFIGURATION_VALUE]
+                                     for entry in internal_collection.find()}
+                except Exception as e:
+                    raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+                self.__configuration_cache, self.__configuration_version = configuration, version
+
+        return configuration
+
+    def __invalidate_configuration_cache(self):
+        """
+        Drops the cached configuration, and bumps the configuration's version so other processes drop theirs.
+        """
+        with self.__cache_lock:
+            self.__configuration_cache = None
+            self.__bump_version(TConsts.CACHE_VERSIONS_CONFIGURATION)
+
+    def __get_player_directory(self):
+        """
+        :return: A dictionary mapping the name of every player to their document (holding their characteristic).
+        It's read once and kept current by the writes to the players, so lookups are served from memory.
+        """
+        with self.__cache_lock:
+            self.__poll_cache_versions()
+
+            player_directory = self.__player_directory
+            if player_directory is None:
+                players_collection = self.__get_collection(TConsts.PLAYERS_COLLECTION_NAME)
+                try:
+                    version = self.__get_cache_versions().get(TConsts.CACHE_VERSIONS_PLAYERS)
+                    player_directory = {player[TConsts.PLAYERS_NAME_KEY]: player
+                                        for player in players_collection.find()}
+                except Exception as e:
+                    raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+                self.__player_directory, self.__player_directory_version = player_directory, version
+
+        return player_directory
+
+    def __update_player_directory(self, player_name, player=None):
+        """
+        Writes a change to the players through to the player directory, and bumps the players' version so other
+        processes reload theirs.
+        :param player: The player's new document, None if the player was deleted.
+        """
+        with self.__cache_lock:
+            # The directory is replaced rather than modified, so lookups running concurrently (in other threads) can
+            # keep iterating the previous one
+            if self.__player_directory is not None:
+                player_directory = dict(self.__player_directory)
+                if player is None:
+                    player_directory.pop(player_name, None)
+                else:
+                    player_directory[player_name] = player
+                self.__player_directory = player_directory
+
+            version = self.__bump_version(TConsts.CACHE_VERSIONS_PLAYERS)
+            # Another process modified the players in the meantime, so our directory can't be trusted
+            if self.__player_directory_version is not None and version != self.__player_directory_version + 1:
+                self.__player_directory = None
+            self.__player_directory_version = version
+
+    def __poll_cache_versions(self):
+        """
+        Drops the cached configuration and player directory if another process modified them, checking at most once
+        every <configuration_poll_interval> seconds. Must be called holding the cache lock.
+        """
+        if self.configuration_poll_interval is None or \
+           time.monotonic() - self.__cache_check_time < self.configuration_poll_interval:
+            return
+        self.__cache_check_time = time.monotonic()
+
+        versions = self.__get_cache_versions()
+        if versions.get(TConsts.CACHE_VERSIONS_CONFIGURATION) != self.__configuration_version:
+            self.__configuration_cache = None
+        if versions.get(TConsts.CACHE_VERSIONS_PLAYERS) != self.__player_directory_version:
+            self.__player_directory = None
+
+    def __get_cache_versions(self):
+        """
+        :return: A dictionary mapping the name of every cached part of the DB to its version, out of the CacheVersions
+        collection. Parts that were never modified have no version.
+        """
+        cache_versions_collection = self.__get_collection(TConsts.CACHE_VERSIONS_COLLECTION_NAME)
 
         try:
-            result = internal_collection.find_one(filter_object)
+            return {entry[TConsts.CACHE_VERSIONS_NAME_KEY]: entry[TConsts.CACHE_VERSIONS_VERSION_KEY]
+                    for entry in cache_versions_collection.find()}
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
-        return result[TConsts.INTERNAL_CONFIGURATION_VALUE] if result is not None else None
+    def __bump_version(self, cache_name):
+        """
+        Increments the version of a cached part of the DB, stored in the CacheVersions collection.
+        :return: The new version.
+        """
+        cache_versions_collection = self.__get_collection(TConsts.CACHE_VERSIONS_COLLECTION_NAME)
 
-    def check_configuration_existence(self, configuration_key):
+        try:
+            result = cache_versions_collection.find_one_and_update(
+                {TConsts.CACHE_VERSIONS_NAME_KEY: cache_name},
+                {"$inc": {TConsts.CACHE_VERSIONS_VERSION_KEY: 1}}, upsert=True, return_document=ReturnDocument.AFTER)
+        except Exception as e:
+            raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+
+        return result[TConsts.CACHE_VERSIONS_VERSION_KEY]
+
+    def __remove_legacy_cache_versions(self):
         """
-        Checks whether a configuration key exists in the database.
-        :param configuration_key: The key to search for
-        :return: True if <configuration_key> exists in the Internal collection, False otherwise
+        Removes the cache versions that used to be stored among the configuration values, in the Internal collection.
         """
         internal_collection = self.__get_collection(TConsts.INTERNAL_COLLECTION_NAME)
-        filter_object = {TConsts.INTERNAL_CONFIGURATION_KEY: configuration_key}
 
         try:
-            result = internal_collection.find_one(filter_object)
+            internal_collection.delete_many(
+                {TConsts.INTERNAL_CONFIGURATION_KEY: {"$in": [TConsts.INTERNAL_CONFIGURATION_VERSION_KEY,
+                                                              TConsts.INTERNAL_PLAYERS_VERSION_KEY]}})
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
-        return result is not None
-
     def insert_player(self, player_name, characteristics):
         """
         Inserts a single player and their characteristics.
@@ -110,6 +311,9 @@ class TFABDBHandler(object):
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
+        # insert_one sets the new player's _id
+        self.__update_player_directory(player_name, new_player)
+
     def insert_admin(self, admin_name, admin_id):
         """
         Inserts <admin_name, admin_id> to the admins' collection.
@@ -128,8 +332,7 @@ class TFABDBHandler(object):
         Inserts <ranker_name, ranker_id> to the Rankers collection.
         """
         new_ranker = \
-            {TConsts.USER_ID_KEY: ranker_id, TConsts.USER_FULLNAME_KEY: ranker_name,
-             TConsts.RANKERS_USER_RANKINGS: {}}
+            {TConsts.USER_ID_KEY: ranker_id, TConsts.USER_FULLNAME_KEY: ranker_name}
         rankers_collection = self.__get_collection(TConsts.RANKERS_COLLECTION_NAME)
 
         try:
@@ -141,7 +344,8 @@ class TFABDBHandler(object):
                         coupling_constraints=None, decoupling_constraints=None):
         """
         Inserts <matchday_dict> to the DB.
-        If there is a matchday on the same date, it deletes the previous matchday and sets the current one as new.
+        If there is a matchday on the same date, it's atomically replaced by the new one.
+        :return: The inserted matchday.
         """
         if not isinstance(player_list, list) or not isinstance(original_message, str) or not isinstance(location, str) \
                 or not isinstance(date, str):
@@ -153,10 +357,6 @@ class TFABDBHandler(object):
         if decoupling_constraints is None:
             decoupling_constraints = []
 
-        if self.check_matchday_existence(date):
-            if not self.delete_matchday(date):
-                raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: Couldn't delete existing matchday")
-
         matchday_dict = {TConsts.MATCHDAYS_ORIGINAL_MESSAGE_KEY: original_message,
                          TConsts.MATCHDAYS_LOCATION_KEY: location,
                          TConsts.MATCHDAYS_ROSTER_KEY: player_list,
@@ -168,7 +368,8 @@ class TFABDBHandler(object):
         matchdays_collection = self.__get_collection(TConsts.MATCHDAYS_COLLECTION_NAME)
 
         try:
-            matchdays_collection.insert_one(matchday_dict)
+            return matchdays_collection.find_one_and_replace({TConsts.MATCHDAYS_DATE_KEY: date}, matchday_dict,
+                                                             upsert=True, return_document=ReturnDocument.AFTER)
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
@@ -192,38 +393,40 @@ class TFABDBHandler(object):
         :param hebrew_characteristics: Whether the characteristics should be displayed in Hebrew or not.
         :return: A list containing entries of the form <player, characteristic>.
         """
-        players_collection = self.__get_collection(TConsts.PLAYERS_COLLECTION_NAME)
-
-        try:
-            all_players_cursor = players_collection.find()
-        except Exception as e:
-            raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+        all_players = list(self.__get_player_directory().values())
+        average_ratings = self.get_average_ratings([player[TConsts.PLAYERS_NAME_KEY] for player in all_players])
 
         player_list = []
-        for player in all_players_cursor:
+        for player in all_players:
             player_list.append((player[TConsts.PLAYERS_NAME_KEY],
                                 TConsts.PlayerPositionToHebrew[player[TConsts.PLAYERS_CHARACTERISTICS_KEY]]
                                 if hebrew_characteristics
                                 else player[TConsts.PLAYERS_CHARACTERISTICS_KEY],
-                                self.get_player_average_rating(player[TConsts.PLAYERS_NAME_KEY],
-                                                               self.get_configuration_value
-                                                               (TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY))))
+                                average_ratings[player[TConsts.PLAYERS_NAME_KEY]]))
         return player_list
 
     def get_user_rankings(self, user_id):
         """
         :param user_id: The ID of the requested user.
-        :return: The user's rankings field as saved in the DB.
+        :return: A dictionary mapping the names of the players the user ranked to their rankings, None if the user
+        isn't a ranker.
         """
         rankers_collection = self.__get_collection(TConsts.RANKERS_COLLECTION_NAME)
+        rankings_collection = self.__get_collection(TConsts.RANKINGS_COLLECTION_NAME)
         filter_object = {TConsts.USER_ID_KEY: user_id}
 
         try:
-            result = rankers_collection.find_one(filter_object)
+            if rankers_collection.find_one(filter_object) is None:
+                return None
+            user_rankings = list(rankings_collection.find({TConsts.RANKINGS_RANKER_ID_KEY: user_id})
+                                 .sort(TConsts.RANKINGS_TIMESTAMP_KEY, ASCENDING))
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
-        return None if result is None else result[TConsts.RANKERS_USER_RANKINGS]
+        player_names = {player["_id"]: player_name for player_name, player in self.__get_player_directory().items()}
+
+        return {player_names[ranking[TConsts.RANKINGS_PLAYER_ID_KEY]]: ranking[TConsts.RANKINGS_VALUE_KEY]
+                for ranking in user_rankings if ranking[TConsts.RANKINGS_PLAYER_ID_KEY] in player_names}
 
     def modify_user_rankings(self, user_id, rankings_dictionary):
         """
@@ -233,23 +436,65 @@ class TFABDBHandler(object):
         :return: (A, B) -> A is True if the entry was found, B is true if modifications occurred.
         """
         rankers_collection = self.__get_collection(TConsts.RANKERS_COLLECTION_NAME)
-        filter_object = {TConsts.USER_ID_KEY: user_id}
-        update_object = {}
+        rankings_collection = self.__get_collection(TConsts.RANKINGS_COLLECTION_NAME)
+        players, _ = self.get_players(list(rankings_dictionary))
+
+        try:
+            ranker_found = rankers_collection.find_one({TConsts.USER_ID_KEY: user_id}) is not None
+        except Exception as e:
+            raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
-        for player_name, ranking in rankings_dictionary.copy().items():
+        for player_name in rankings_dictionary.copy():
             # Make sure player exists and isn't a goalkeeper
-            if self.check_player_existence(player_name) and \
-               self.get_player_characteristic(player_name) != TConsts.PlayerCharacteristics["GOALKEEPER"]:
-                update_object["{0}.{1}".format(TConsts.RANKERS_USER_RANKINGS, player_name)] = ranking
-            else:
+            if player_name not in players or \
+               players[player_name][TConsts.PLAYERS_CHARACTERISTICS_KEY] == TConsts.PlayerCharacteristics["GOALKEEPER"]:
                 rankings_dictionary.pop(player_name)
 
+        if not ranker_found or not rankings_dictionary:
+            return ranker_found, False
+
         try:
-            result = rankers_collection.update_one(filter_object, {"$set": update_object})
+            current_rankings = {ranking[TConsts.RANKINGS_PLAYER_ID_KEY]: ranking[TConsts.RANKINGS_VALUE_KEY]
+                                for ranking in rankings_collection.find(
+                                    {TConsts.RANKINGS_RANKER_ID_KEY: user_id,
+                                     TConsts.RANKINGS_PLAYER_ID_KEY:
+                                         {"$in": [players[player_name]["_id"] for player_name in rankings_dictionary]}})}
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
-        return result.matched_count == 1, result.modified_count == 1
+        # Rankings identical to the current ones keep their timestamp, and aren't counted as modifications
+        changed_rankings = {player_name: ranking for player_name, ranking in rankings_dictionary.items()
+                            if current_rankings.get(players[player_name]["_id"]) != ranking}
+        if not changed_rankings:
+            return True, False
+
+        timestamp = datetime.now()
+
+        def write_rankings(session=None):
+            rankings_collection.bulk_write(
+                [UpdateOne({TConsts.RANKINGS_RANKER_ID_KEY: user_id,
+                            TConsts.RANKINGS_PLAYER_ID_KEY: players[player_name]["_id"]},
+                           {"$set": {TConsts.RANKINGS_VALUE_KEY: ranking, TConsts.RANKINGS_TIMESTAMP_KEY: timestamp}},
+                           upsert=True)
+                 for player_name, ranking in changed_rankings.items()], ordered=False, session=session)
+            # Only the ratings of the ranked players change
+            self.__refresh_player_ratings(list(changed_rankings), session=session)
+
+        try:
+            self.__run_in_transaction(write_rankings)
+        except Exception as e:
+            # Without a transaction, the rankings might have been written without the ratings derived from them
+            if not self.supports_transactions:
+                try:
+                    self.__refresh_player_ratings(list(changed_rankings))
+                except tfab_exception.TFABDatabaseError:
+                    # The original error is reported, the ratings are repaired by the next refresh (or a rebuild)
+                    pass
+            if isinstance(e, tfab_exception.TFABDatabaseError):
+                raise
+            raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+
+        return True, True
 
     def edit_player(self, player_name, new_characteristic):
         """
@@ -263,12 +508,74 @@ class TFABDBHandler(object):
         update_operation = {'$set': {TConsts.PLAYERS_CHARACTERISTICS_KEY: new_characteristic}}
 
         try:
-            results = players_collection.update_one(filter_object, update_operation)
+            previous_player = players_collection.find_one_and_update(filter_object, update_operation)
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
+        found = previous_player is not None
+        modified = found and previous_player[TConsts.PLAYERS_CHARACTERISTICS_KEY] != new_characteristic
+        if modified:
+            self.__update_player_directory(
+                player_name, dict(previous_player, **{TConsts.PLAYERS_CHARACTERISTICS_KEY: new_characteristic}))
+            # A player that became a GK is rated zero, and one that stopped being a GK gets their rating back
+            self.__refresh_player_ratings([player_name])
+
         # Not checking modified_count, to allow an admin to click on the same characteristic without triggering errors
-        return results.matched_count == 1, results.modified_count == 1
+        return found, modified
+
+    def check_players_existence(self, player_names):
+        """
+        Checks whether all of <player_names> exist in the database.
+        :param player_names: The player names to search.
+        :return: (A, B) -> A is True if all the players exist, B is a list of the names that don't exist.
+        """
+        _, missing_player_names = self.get_players(player_names)
+        return not missing_player_names, missing_player_names
+
+    def get_players(self, player_names):
+        """
+        Finds the documents of <player_names>. Names missing from the player directory (which another process might
+        have added) are searched for in the Players collection, in a single query.
+        :param player_names: The names of the players.
+        :return: (A, B) -> A is a dictionary mapping the names of the existing players to their documents, B is a list
+        of the names that don't exist.
+        """
+        with self.__cache_lock:
+            player_directory = self.__get_player_directory()
+            player_directory_version = self.__player_directory_version
+        players = {player_name: player_directory[player_name]
+                   for player_name in player_names if player_name in player_directory}
+        unknown_player_names = list(dict.fromkeys(player_name for player_name in player_names
+                                                  if player_name not in players))
+
+        if unknown_player_names:
+            players_collection = self.__get_collection(TConsts.PLAYERS_COLLECTION_NAME)
+            try:
+                found_players = {player[TConsts.PLAYERS_NAME_KEY]: player for player in players_collection.find(
+                    {TConsts.PLAYERS_NAME_KEY: {"$in": unknown_player_names}})}
+            except Exception as e:
+                raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+
+            if found_players:
+                players.update(found_players)
+                # Merged into the current directory, unless the players were modified since the query (e.g. one of the
+                # found players was deleted), in which case the query's results might already be stale
+                with self.__cache_lock:
+                    if self.__player_directory is not None and \
+                       self.__player_directory_version == player_directory_version:
+                        self.__player_directory = dict(self.__player_directory, **found_players)
+
+        return players, [player_name for player_name in unknown_player_names if player_name not in players]
+
+    def get_characteristics(self, player_names):
+        """
+        :param player_names: The names of the players.
+        :return: (A, B) -> A is a dictionary mapping the names of the existing players to their characteristics, B is a
+        list of the names that don't exist.
+        """
+        players, missing_player_names = self.get_players(player_names)
+        return {player_name: player[TConsts.PLAYERS_CHARACTERISTICS_KEY] for player_name, player in players.items()}, \
+            missing_player_names
 
     def check_player_existence(self, player_name):
         """
@@ -276,61 +583,271 @@ class TFABDBHandler(object):
         :param player_name: The player name to search
         :return: True if the player exists in the Players collection, False otherwise
         """
+        return player_name in self.__get_player_directory()
+
+    def get_player_average_rating(self, player_name):
+        """
+        Returns the average rating, across all the different rankers, for <player_name>.
+        :param player_name: The player's name.
+        :return: The average rating.
+        """
+        return self.get_average_ratings([player_name])[player_name]
+
+    def get_average_ratings(self, player_names):
+        """
+        Returns the average rating, across all the different rankers, of every player in <player_names>.
+        The averages are materialized in the PlayerRatings collection, so this is a single indexed fetch.
+        :param player_names: The names of the players.
+        :return: A dictionary mapping each player's name to their average rating.
+        """
+        player_names = list(player_names)
+        if not player_names:
+            return {}
+
+        player_ratings_collection = self.__get_collection(TConsts.PLAYER_RATINGS_COLLECTION_NAME)
+
+        try:
+            average_ratings = {player_ratings[TConsts.PLAYERS_NAME_KEY]: player_ratings[TConsts.PLAYER_RATINGS_AVERAGE_KEY]
+                               for player_ratings in player_ratings_collection.find(
+                                   {TConsts.PLAYERS_NAME_KEY: {"$in": player_names}},
+                                   {TConsts.PLAYERS_NAME_KEY: 1, TConsts.PLAYER_RATINGS_AVERAGE_KEY: 1})}
+        except Exception as e:
+            raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+
+        # Players nobody ranked have no materialized ratings
+        return {player_name: average_ratings.get(player_name, 0) for player_name in player_names}
+
+    def recompute_player_ratings(self):
+        """
+        Recomputes the materialized average of every rated player, after the deviation threshold changed.
+        """
+        player_ratings_collection = self.__get_collection(TConsts.PLAYER_RATINGS_COLLECTION_NAME)
+
+        try:
+            player_names = player_ratings_collection.distinct(TConsts.PLAYERS_NAME_KEY)
+        except Exception as e:
+            raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+
+        self.__refresh_player_ratings(player_names)
+
+    def rebuild_player_ratings(self):
+        """
+        Rebuilds the PlayerRatings collection from scratch, out of the rankers' rankings.
+        :return: The amount of players whose ratings were materialized.
+        """
+        player_ratings_collection = self.__get_collection(TConsts.PLAYER_RATINGS_COLLECTION_NAME)
+        expected_player_ratings = self.__get_expected_player_ratings()
+
+        try:
+            player_ratings_collection.delete_many({})
+            if expected_player_ratings:
+                player_ratings_collection.insert_many(list(expected_player_ratings.values()))
+        except Exception as e:
+            raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+
+        return len(expected_player_ratings)
+
+    def materialize_player_ratings_if_missing(self):
+        """
+        Builds the PlayerRatings collection of a database that predates it - one holding rankings but no materialized
+        ratings. It's a couple of single-document reads otherwise, unlike check_player_ratings_consistency (which
+        tfab_ratings_maintenance runs on demand).
+        :return: The amount of players whose ratings were materialized, 0 if the collection was already built.
+        """
+        player_ratings_collection = self.__get_collection(TConsts.PLAYER_RATINGS_COLLECTION_NAME)
+        rankings_collection = self.__get_collection(TConsts.RANKINGS_COLLECTION_NAME)
+
+        try:
+            is_built = player_ratings_collection.find_one({}, {"_id": 1}) is not None or \
+                rankings_collection.find_one({}, {"_id": 1}) is None
+        except Exception as e:
+            raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+
+        return 0 if is_built else self.rebuild_player_ratings()
+
+    def check_player_ratings_consistency(self):
+        """
+        Compares the PlayerRatings collection with the ratings computed from scratch out of the rankers' rankings.
+        :return: A sorted list of the players whose materialized ratings are missing, stale or wrong.
+        """
+        player_ratings_collection = self.__get_collection(TConsts.PLAYER_RATINGS_COLLECTION_NAME)
+        expected_player_ratings = self.__get_expected_player_ratings()
+
+        try:
+            materialized_player_ratings = {player_ratings[TConsts.PLAYERS_NAME_KEY]: player_ratings
+                                           for player_ratings in player_ratings_collection.find({}, {"_id": 0})}
+        except Exception as e:
+            raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+
+        inconsistent_players = []
+        for player_name in set(expected_player_ratings) | set(materialized_player_ratings):
+            expected = expected_player_ratings.get(player_name)
+            materialized = materialized_player_ratings.get(player_name)
+            # A materialized entry without any ratings is equivalent to a missing one
+            if expected is None and not materialized[TConsts.PLAYER_RATINGS_RATINGS_KEY]:
+                continue
+            if expected is None or materialized is None or \
+               expected[TConsts.PLAYER_RATINGS_RATINGS_KEY] != materialized[TConsts.PLAYER_RATINGS_RATINGS_KEY] or \
+               not np.isclose(expected[TConsts.PLAYER_RATINGS_AVERAGE_KEY],
+                              materialized[TConsts.PLAYER_RATINGS_AVERAGE_KEY]):
+                inconsistent_players.append(player_name)
+
+        return sorted(inconsistent_players)
+
+    def __get_expected_player_ratings(self):
+        """
+        :return: A dictionary mapping the name of every ranked player to their PlayerRatings entry, computed from
+        scratch out of the rankers' rankings.
+        """
         players_collection = self.__get_collection(TConsts.PLAYERS_COLLECTION_NAME)
-        filter_object = {TConsts.PLAYERS_NAME_KEY: player_name}
+        rankings_collection = self.__get_collection(TConsts.RANKINGS_COLLECTION_NAME)
 
         try:
-            result = players_collection.find_one(filter_object)
+            all_players = {player["_id"]: player for player in players_collection.find()}
+            all_rankings = list(rankings_collection.find())
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
-        return result is not None
+        ratings_dictionaries = {}
+        for ranking in all_rankings:
+            # Rankings of deleted players are removed along with them
+            player = all_players.get(ranking[TConsts.RANKINGS_PLAYER_ID_KEY])
+            if player is not None:
+                ratings_dictionaries.setdefault(player[TConsts.PLAYERS_NAME_KEY], {})[
+                    str(ranking[TConsts.RANKINGS_RANKER_ID_KEY])] = float(ranking[TConsts.RANKINGS_VALUE_KEY])
+
+        goalkeepers = {player[TConsts.PLAYERS_NAME_KEY] for player in all_players.values()
+                       if player[TConsts.PLAYERS_CHARACTERISTICS_KEY] == TConsts.PlayerCharacteristics["GOALKEEPER"]}
+        return self.__compute_player_ratings(ratings_dictionaries, goalkeepers)
 
-    def get_player_average_rating(self, player_name, dev_threshold):
+    def __refresh_player_ratings(self, player_names, session=None):
         """
-        Returns the average rating, across all the different rankers, for <player_name>.
-        :param dev_threshold: Maximum deviation threshold.
-        :param player_name: The player's name.
-        :return: The average rating.
+        Rewrites the materialized ratings, statistics and average of <player_names>, derived from their rankings in the
+        Rankings collection (the source of truth), so the refresh also repairs entries that drifted.
+        :param session: The session of the transaction the refresh is a part of, if any.
         """
-        # This makes sure that a GK is always rated zero (including past-ranked "field" players that converted to GKs)
-        if self.get_player_characteristic(player_name) == TConsts.PlayerCharacteristics["GOALKEEPER"]:
-            return 0
+        players, _ = self.get_players(player_names)
+        if not players:
+            return
 
-        rankers_collection = self.__get_collection(TConsts.RANKERS_COLLECTION_NAME)
+        player_ratings_collection = self.__get_collection(TConsts.PLAYER_RATINGS_COLLECTION_NAME)
+        rankings_collection = self.__get_collection(TConsts.RANKINGS_COLLECTION_NAME)
+        player_names_by_id = {player["_id"]: player_name for player_name, player in players.items()}
+        ratings_dictionaries = {player_name: {} for player_name in players}
+
+        try:
+            for ranking in rankings_collection.find(
+                    {TConsts.RANKINGS_PLAYER_ID_KEY: {"$in": list(player_names_by_id)}}, session=session):
+                ratings_dictionaries[player_names_by_id[ranking[TConsts.RANKINGS_PLAYER_ID_KEY]]][
+                    str(ranking[TConsts.RANKINGS_RANKER_ID_KEY])] = float(ranking[TConsts.RANKINGS_VALUE_KEY])
+        except Exception as e:
+            raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+
+        goalkeepers = {player_name for player_name, player in players.items()
+                       if player[TConsts.PLAYERS_CHARACTERISTICS_KEY] == TConsts.PlayerCharacteristics["GOALKEEPER"]}
+        player_ratings = self.__compute_player_ratings(ratings_dictionaries, goalkeepers)
 
         try:
-            all_rankers_cursor = rankers_collection.find()
+            player_ratings_collection.bulk_write(
+                [UpdateOne({TConsts.PLAYERS_NAME_KEY: player_name}, {"$set": entry}, upsert=True)
+                 for player_name, entry in player_ratings.items()], ordered=False, session=session)
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
-        rating_list = []
-        for ranker in all_rankers_cursor:
-            # check existence
-            rankings_dictionary = ranker[TConsts.RANKERS_USER_RANKINGS]
+    def __run_in_transaction(self, write):
+        """
+        Runs <write> (called with the session to pass to its operations) in a transaction, so its writes are applied
+        all together or not at all. On a server that doesn't support transactions, <write> runs without one.
+        """
+        if not self.supports_transactions:
+            return write()
+
+        with self.mongo_client.start_session() as session:
+            return session.with_transaction(write)
+
+    def __compute_player_ratings(self, ratings_dictionaries, goalkeepers):
+        """
+        :param ratings_dictionaries: A dictionary mapping player names to a {<RankerId>: <Rating>} dictionary.
+        :param goalkeepers: The names of the players that are GKs.
+        :return: A dictionary mapping each player's name to their PlayerRatings entry - their ratings, the statistics
+        of the ratings and the filtered average.
+        """
+        if not ratings_dictionaries:
+            return {}
+
+        # A rating x player matrix, every column holding a player's ratings and padded with NaN
+        player_names = list(ratings_dictionaries)
+        rating_matrix = np.full((max(1, max(len(ratings) for ratings in ratings_dictionaries.values())),
+                                 len(player_names)), np.nan)
+        for player_index, player_name in enumerate(player_names):
+            ratings = list(ratings_dictionaries[player_name].values())
+            rating_matrix[:len(ratings), player_index] = ratings
+
+        # The stored statistics are the ones the filtered average is computed by
+        rating_counts, means, stds = TFABDBHandler.get_rating_statistics(rating_matrix)
+        average_ratings = TFABDBHandler.filter_average_ratings(
+            rating_matrix, self.get_configuration_value(TConsts.INTERNAL_RATING_DEVIATION_THRESHOLD_KEY))
+
+        # This makes sure that a GK is always rated zero (including past-ranked "field" players that converted to GKs)
+        return {player_name: {TConsts.PLAYERS_NAME_KEY: player_name,
+                              TConsts.PLAYER_RATINGS_RATINGS_KEY: ratings_dictionaries[player_name],
+                              TConsts.PLAYER_RATINGS_COUNT_KEY: int(rating_counts[i]),
+                              TConsts.PLAYER_RATINGS_MEAN_KEY: float(means[i]),
+                              TConsts.PLAYER_RATINGS_STD_KEY: float(stds[i]),
+                              TConsts.PLAYER_RATINGS_AVERAGE_KEY:
+                                  0 if player_name in goalkeepers else float(average_ratings[i])}
+                for i, player_name in enumerate(player_names)}
 
-            if player_name in rankings_dictionary:
-                rating_list.append(float(rankings_dictionary[player_name]))
+    @staticmethod
+    def get_rating_statistics(rating_matrix):
+        """
+        :param rating_matrix: A ranker x player matrix of ratings, NaN where a ranker didn't rank a player.
+        :return: (A, B, C) -> A is an array of the amount of ratings of every player, B of their means and C of their
+        standard deviations (0 for players without ratings).
+        """
+        rating_counts = np.count_nonzero(~np.isnan(rating_matrix), axis=0)
+        rated = rating_counts > 0
+        means = np.zeros(rating_matrix.shape[1])
+        stds = np.zeros(rating_matrix.shape[1])
+        means[rated] = np.nanmean(rating_matrix[:, rated], axis=0)
+        stds[rated] = np.nanstd(rating_matrix[:, rated], axis=0)
+        return rating_counts, means, stds
 
-        filtered_ratings = []
+    @staticmethod
+    def filter_average_ratings(rating_matrix, dev_threshold):
+        """
+        Averages every column of <rating_matrix>, leaving out the outliers - ratings whose z-score, among the ratings
+        of the same player, exceeds <dev_threshold>.
+        :param rating_matrix: A ranker x player matrix of ratings, NaN where a ranker didn't rank a player.
+        :param dev_threshold: Maximum deviation threshold.
+        :return: An array holding the average rating of every player, 0 for players without ratings.
+        """
+        _, means, stds = TFABDBHandler.get_rating_statistics(rating_matrix)
 
-        if rating_list:
-            z_scores = np.abs((rating_list - np.mean(rating_list)) / np.std(rating_list))
-            troll_scores = z_scores > dev_threshold  # Outliers, based on bypassing the threshold
-            filtered_ratings = np.array(rating_list)[~troll_scores]
+        # Players whose ratings are all equal have no outliers (their z-scores are undefined, and never exceed)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z_scores = np.abs((rating_matrix - means) / stds)
+        troll_scores = z_scores > dev_threshold  # Outliers, based on bypassing the threshold
+        filtered_matrix = np.where(troll_scores, np.nan, rating_matrix)
 
-        return (sum(filtered_ratings) / len(filtered_ratings)) if len(filtered_ratings) > 0 else 0
+        filtered_counts = np.count_nonzero(~np.isnan(filtered_matrix), axis=0)
+        filtered_sums = np.nansum(filtered_matrix, axis=0)
+        return np.divide(filtered_sums, filtered_counts, out=np.zeros(len(filtered_sums)), where=filtered_counts > 0)
 
-    def insert_teams_to_matchday(self, date, teams):
+    def insert_teams_to_matchday(self, date, teams, player_list=None):
         """
         Inserts <teams> into the matchday occuring at <date>.
         :param date: The date of the relevant matchday.
         :param teams: The generated teams for this matchday.
+        :param player_list: The new roster of the matchday, if the teams were regenerated after a roster change.
+        The roster and the teams are updated together.
         :return: True if the entry was found successfully.
         """
         matchdays_collection = self.__get_collection(TConsts.MATCHDAYS_COLLECTION_NAME)
         filter_object = {TConsts.MATCHDAYS_DATE_KEY: date}
         update_operation = {'$set': {TConsts.MATCHDAYS_TEAMS_KEY: teams}}
+        if player_list is not None:
+            update_operation['$set'][TConsts.MATCHDAYS_ROSTER_KEY] = player_list
 
         try:
             results = matchdays_collection.update_one(filter_object, update_operation)
@@ -347,44 +864,84 @@ class TFABDBHandler(object):
         :param date: The date of the relevant matchday.
         :param couplings: A list where each entry consists of players that must be coupled.
         :param decouplings: A list where each entry consists of players that must be decoupled.
-        :return: True if the entry was found successfully.
+        :return: The resulting matchday, None if there's no matchday at <date>.
         """
         if couplings is None:
             couplings = []
         if decouplings is None:
             decouplings = []
 
-        relevant_matchday = self.get_matchday(date)
-        if not relevant_matchday:
-            return
-
         matchdays_collection = self.__get_collection(TConsts.MATCHDAYS_COLLECTION_NAME)
         filter_object = {TConsts.MATCHDAYS_DATE_KEY: date}
 
-        update_operation = {'$set': {TConsts.MATCHDAYS_COUPLING_CONSTRAINTS_KEY: couplings if absolute else relevant_matchday[TConsts.MATCHDAYS_COUPLING_CONSTRAINTS_KEY] + couplings,
-                                     TConsts.MATCHDAYS_DECOUPLING_CONSTRAINTS_KEY: decouplings if absolute else relevant_matchday[TConsts.MATCHDAYS_DECOUPLING_CONSTRAINTS_KEY] + decouplings}}
+        # Appending is done by the DB, so constraints added concurrently by different admins are all kept
+        if absolute:
+            update_operation = {'$set': {TConsts.MATCHDAYS_COUPLING_CONSTRAINTS_KEY: couplings,
+                                         TConsts.MATCHDAYS_DECOUPLING_CONSTRAINTS_KEY: decouplings}}
+        else:
+            update_operation = {'$push': {TConsts.MATCHDAYS_COUPLING_CONSTRAINTS_KEY: {'$each': couplings},
+                                          TConsts.MATCHDAYS_DECOUPLING_CONSTRAINTS_KEY: {'$each': decouplings}}}
 
         try:
-            results = matchdays_collection.update_one(filter_object, update_operation)
+            return matchdays_collection.find_one_and_update(filter_object, update_operation,
+                                                            return_document=ReturnDocument.AFTER)
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
-        # If the same constraints have been applied
-        return results.matched_count == 1
+    def insert_cached_lineup(self, fingerprint, lineup, max_entries):
+        """
+        Caches <lineup> as the lineup generated for the input hashed into <fingerprint>.
+        :param fingerprint: The hash of the generation input.
+        :param lineup: The generation result.
+        :param max_entries: The amount of lineups to keep, the least recently cached lineups are deleted.
+        """
+        lineup_cache_collection = self.__get_collection(TConsts.LINEUP_CACHE_COLLECTION_NAME)
+        filter_object = {TConsts.LINEUP_CACHE_FINGERPRINT_KEY: fingerprint}
+        update_operation = {'$set': {TConsts.LINEUP_CACHE_LINEUP_KEY: lineup,
+                                     TConsts.LINEUP_CACHE_TIMESTAMP_KEY: datetime.now()}}
 
-    def get_player_characteristic(self, player_name):
+        try:
+            lineup_cache_collection.update_one(filter_object, update_operation, upsert=True)
+            stale_lineups = lineup_cache_collection.find({}, {"_id": 1})\
+                .sort(TConsts.LINEUP_CACHE_TIMESTAMP_KEY, -1).skip(max_entries)
+            stale_ids = [stale_lineup["_id"] for stale_lineup in stale_lineups]
+            if stale_ids:
+                lineup_cache_collection.delete_many({"_id": {"$in": stale_ids}})
+        except Exception as e:
+            raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+
+    def get_cached_lineup(self, fingerprint):
         """
-        :param player_name: The player to check.
-        :return: The characteristic of <player_name>.
+        :param fingerprint: The hash of the generation input.
+        :return: The lineup cached for <fingerprint>, None if there isn't one.
         """
-        players_collection = self.__get_collection(TConsts.PLAYERS_COLLECTION_NAME)
-        filter_object = {TConsts.PLAYERS_NAME_KEY: player_name}
+        lineup_cache_collection = self.__get_collection(TConsts.LINEUP_CACHE_COLLECTION_NAME)
+        filter_object = {TConsts.LINEUP_CACHE_FINGERPRINT_KEY: fingerprint}
+
         try:
-            result = players_collection.find_one(filter_object)
+            result = lineup_cache_collection.find_one(filter_object)
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
-        return None if result is None else result[TConsts.PLAYERS_CHARACTERISTICS_KEY]
+        return None if result is None else result[TConsts.LINEUP_CACHE_LINEUP_KEY]
+
+    def clear_cached_lineups(self):
+        """
+        Deletes all the cached lineups.
+        """
+        lineup_cache_collection = self.__get_collection(TConsts.LINEUP_CACHE_COLLECTION_NAME)
+        try:
+            lineup_cache_collection.delete_many({})
+        except Exception as e:
+            raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+
+    def get_player_characteristic(self, player_name):
+        """
+        :param player_name: The player to check.
+        :return: The characteristic of <player_name>.
+        """
+        player = self.__get_player_directory().get(player_name)
+        return None if player is None else player[TConsts.PLAYERS_CHARACTERISTICS_KEY]
 
     def check_admin_existence(self, admin_id):
         """
@@ -433,19 +990,22 @@ class TFABDBHandler(object):
         """
         players_collection = self.__get_collection(TConsts.PLAYERS_COLLECTION_NAME)
         player_name_filter = {TConsts.PLAYERS_NAME_KEY: player_name}
-
-        rankers_collection = self.__get_collection(TConsts.RANKERS_COLLECTION_NAME)
-        delete_ranking_operation = {
-            '$unset': {"{0}.{1}".format(TConsts.RANKERS_USER_RANKINGS, player_name): ""}}
+        rankings_collection = self.__get_collection(TConsts.RANKINGS_COLLECTION_NAME)
+        player_ratings_collection = self.__get_collection(TConsts.PLAYER_RATINGS_COLLECTION_NAME)
 
         try:
-            player_delete_result = players_collection.delete_one(player_name_filter)
-            player_rankings_delete_result = rankers_collection.update_many({}, delete_ranking_operation)
+            deleted_player = players_collection.find_one_and_delete(player_name_filter)
+            if deleted_player is not None:
+                rankings_collection.delete_many({TConsts.RANKINGS_PLAYER_ID_KEY: deleted_player["_id"]})
+            player_ratings_collection.delete_one(player_name_filter)
         except Exception as e:
             raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
 
+        if deleted_player is not None:
+            self.__update_player_directory(player_name)
+
         # Makes sure we actually deleted a player
-        return player_delete_result.deleted_count == 1
+        return deleted_player is not None
 
     def delete_matchday(self, date):
         """
@@ -463,6 +1023,34 @@ class TFABDBHandler(object):
         # Makes sure we actually deleted a matchday
         return matchdays_delete_result.deleted_count == 1
 
+    def __migrate_embedded_rankings(self):
+        """
+        Moves rankings embedded in the rankers (as a <PlayerName>: <Ranking> dictionary) into the Rankings collection.
+        Rankings that already exist in the Rankings collection are kept, so an interrupted migration can be resumed.
+        """
+        rankers_collection = self.__get_collection(TConsts.RANKERS_COLLECTION_NAME)
+        rankings_collection = self.__get_collection(TConsts.RANKINGS_COLLECTION_NAME)
+        players_collection = self.__get_collection(TConsts.PLAYERS_COLLECTION_NAME)
+
+        try:
+            for ranker in rankers_collection.find({TConsts.RANKERS_USER_RANKINGS: {"$exists": True}}):
+                embedded_rankings = ranker[TConsts.RANKERS_USER_RANKINGS]
+                player_ids = {player[TConsts.PLAYERS_NAME_KEY]: player["_id"] for player in players_collection.find(
+                    {TConsts.PLAYERS_NAME_KEY: {"$in": list(embedded_rankings)}}, {TConsts.PLAYERS_NAME_KEY: 1})}
+                migrated_rankings = [
+                    UpdateOne({TConsts.RANKINGS_RANKER_ID_KEY: ranker[TConsts.USER_ID_KEY],
+                               TConsts.RANKINGS_PLAYER_ID_KEY: player_ids[player_name]},
+                              {"$setOnInsert": {TConsts.RANKINGS_VALUE_KEY: ranking,
+                                                TConsts.RANKINGS_TIMESTAMP_KEY: datetime.now()}},
+                              upsert=True)
+                    for player_name, ranking in embedded_rankings.items() if player_name in player_ids]
+
+                if migrated_rankings:
+                    rankings_collection.bulk_write(migrated_rankings, ordered=False)
+                rankers_collection.update_one({"_id": ranker["_id"]}, {"$unset": {TConsts.RANKERS_USER_RANKINGS: ""}})
+        except Exception as e:
+            raise tfab_exception.TFABDatabaseError("TFAB Database Error occurred: " + str(e))
+
     def __get_collection(self, collection_name):
         """
         :return: The requested collection, if there were no errors.
@@ -11,4 +11,10 @@ class TFABApplicationError(TFABException):
     pass
 
 class TFABSystemError(TFABException):
-    pass
\ No newline at end of file
+    pass
+
+class TFABGenerationError(TFABApplicationError):
+    pass
+
+class TFABGenerationCancelledError(TFABGenerationError):
+    pass
@@ -0,0 +1,398 @@
+import asyncio
+import copy
+import os
+import random
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from tfab_framework.tfab_logger import tfab_logger
+from tfab_framework.tfab_consts import Consts as TConsts
+from tfab_framework.tfab_exception import TFABGenerationError, TFABGenerationCancelledError
+from tfab_framework.tfab_lineup_cache import TFABLineupCache
+from tfab_utils.tfab_team_generator import TeamGenerator
+
+
+def _generate_teams_in_worker(player_dicts_list, generation_parameters):
+    """
+    Runs inside the worker processes, must be picklable and therefore module-level.
+    """
+    return TeamGenerator.generate_teams(player_dicts_list, **generation_parameters)
+
+
+def _regenerate_teams_in_worker(previous_teams, removed_player_names, added_players, generation_parameters):
+    """
+    Runs inside the worker processes, must be picklable and therefore module-level.
+    """
+    return TeamGenerator.regenerate_teams(previous_teams, removed_player_names, added_players, **generation_parameters)
+
+
+class TFABGenerationService(object):
+    """
+    Runs team generation requests in a bounded pool of worker processes, so CBC doesn't block the event loop.
+    Requests wait in a bounded queue until a worker is free, and may be cancelled while waiting.
+    Identical requests for the same matchday share a single computation, and later identical requests receive the
+    cached lineup (or candidate lineups). The lineup cache is accessed off the event loop, since it may read and write
+    the database.
+    """
+    _instance = None
+
+    # Enough workers to solve the largest amount of candidate lineups in parallel, if there are enough CPUs
+    DEFAULT_MAX_WORKERS = min(TConsts.MAX_TEAM_CANDIDATES, os.cpu_count() or 1)
+    DEFAULT_MAX_QUEUE_SIZE = 8
+    DEFAULT_HEARTBEAT_INTERVAL = 5
+
+    @staticmethod
+    def get_instance(max_workers=None, max_queue_size=None, lineup_cache=None):
+        if TFABGenerationService._instance is None:
+            TFABGenerationService._instance = TFABGenerationService(max_workers, max_queue_size, lineup_cache)
+        return TFABGenerationService._instance
+
+    def __init__(self, max_workers=None, max_queue_size=None, lineup_cache=None):
+        """
+        Initializes an instance of TFABGenerationService. The worker processes are only spawned once needed.
+        :param max_workers: The amount of generation requests that may run concurrently.
+        :param max_queue_size: The amount of generation requests that may wait for a free worker.
+        :param lineup_cache: The TFABLineupCache of the generated lineups, an in-process one if not given.
+        """
+        self.max_workers = max_workers if max_workers is not None else self.DEFAULT_MAX_WORKERS
+        self.max_queue_size = max_queue_size if max_queue_size is not None else self.DEFAULT_MAX_QUEUE_SIZE
+        if self.max_workers < 1 or self.max_queue_size < 0:
+            raise TFABGenerationError("Illegal generation concurrency limits")
+        self.lineup_cache = lineup_cache if lineup_cache is not None else TFABLineupCache()
+
+        self.__executor = None
+        self.__worker_slots = None
+
+        # Both map a job to its flight key, in the order the jobs were submitted
+        self.__queued_jobs = {}
+        self.__running_jobs = {}
+
+        # Maps a flight key to the job computing it
+        self.__flights = {}
+
+        # Maps a caller's job key to the (job, cancellation future) it is waiting on
+        self.__callers = {}
+
+        self.__total_wait_time = 0
+        self.__started_jobs = 0
+        self.__last_wait_time = 0
+
+    def __get_executor(self):
+        """
+        :return: The process pool, spawning it on first use. Spawning (rather than forking) keeps the workers
+        clear of the event loop's threads and the MongoDB client.
+        """
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                  mp_context=multiprocessing.get_context("spawn"))
+            self.__worker_slots = asyncio.Semaphore(self.max_workers)
+        return self.__executor
+
+    async def generate_teams(self, job_key, player_dicts_list, progress_callback=None,
+                             heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL, matchday_key=None, reroll=False,
+                             **generation_parameters):
+        """
+        Generates teams in a worker process, as described in TeamGenerator.generate_teams.
+        :param job_key: Identifies the caller (e.g. the requesting admin's id), to allow cancelling its request.
+        A new request with the same key cancels the previous one.
+        :param player_dicts_list: The players to divide into teams.
+        :param progress_callback: An optional coroutine function, awaited with (queue position, elapsed seconds)
+        every <heartbeat_interval> seconds until the teams are ready. The queue position is 0 once running. Errors it
+        raises are logged, and don't affect the generation.
+        :param heartbeat_interval: The amount of seconds between progress callbacks.
+        :param matchday_key: Identifies the matchday (e.g. its date). Concurrent identical requests for the same
+        matchday await a single computation.
+        :param reroll: Whether to compute a different lineup (using a new seed) rather than receive the cached one.
+        The new lineup replaces the cached one.
+        :param generation_parameters: Passed as is to TeamGenerator.generate_teams.
+        :return: The result of TeamGenerator.generate_teams.
+        """
+        executor = self.__get_executor()
+        self.cancel(job_key)
+
+        fingerprint = TFABLineupCache.get_fingerprint(player_dicts_list, generation_parameters)
+        if not reroll:
+            cached_lineup = await self.__run_in_thread(self.lineup_cache.get, fingerprint)
+            if cached_lineup is not None:
+                return cached_lineup
+        else:
+            generation_parameters = dict(generation_parameters, seed=random.randrange(2 ** 31))
+
+        flight_key = (matchday_key, fingerprint, reroll, None)
+        job = self.__get_job(flight_key, lambda: self.__run_job(executor, flight_key, player_dicts_list,
+                                                                generation_parameters))
+        return await self.__await_job(job_key, job, progress_callback, heartbeat_interval)
+
+    async def generate_candidates(self, job_key, player_dicts_list, num_candidates, progress_callback=None,
+                                  heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL, matchday_key=None, reroll=False,
+                                  **generation_parameters):
+        """
+        Generates up to <num_candidates> distinct lineups, solving them in parallel in the worker processes.
+        The parameters are the same as in generate_teams.
+        :return: A list of distinct results of TeamGenerator.generate_teams, ranked by their rating spread. The list is
+        cached as a whole, so identical requests (unless <reroll> is set) receive all the same candidates. If no lineup
+        was found, the list holds a single result describing why.
+        """
+        executor = self.__get_executor()
+        self.cancel(job_key)
+
+        # The candidates are cached apart from single lineups, and per amount of candidates
+        fingerprint = TFABLineupCache.get_fingerprint(player_dicts_list,
+                                                      dict(generation_parameters, num_candidates=num_candidates))
+        if not reroll:
+            cached_candidates = await self.__run_in_thread(self.lineup_cache.get, fingerprint)
+            if cached_candidates is not None:
+                return cached_candidates
+
+        flight_key = (matchday_key, fingerprint, reroll, num_candidates)
+        job = self.__get_job(flight_key, lambda: self.__run_candidates_job(executor, flight_key, player_dicts_list,
+                                                                           num_candidates, generation_parameters))
+        return await self.__await_job(job_key, job, progress_callback, heartbeat_interval)
+
+    async def regenerate_teams(self, job_key, previous_teams, removed_player_names, added_players,
+                               progress_callback=None, heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL,
+                               matchday_key=None, **generation_parameters):
+        """
+        Regenerates a lineup after a roster change in a worker process, as described in TeamGenerator.regenerate_teams.
+        The parameters are the same as in generate_teams. The result isn't cached, since it depends on the previous
+        lineup rather than on the roster alone.
+        :return: The result of TeamGenerator.regenerate_teams.
+        """
+        executor = self.__get_executor()
+        self.cancel(job_key)
+
+        fingerprint = TFABLineupCache.get_fingerprint(
+            [player for team in previous_teams for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]] +
+            list(added_players), dict(generation_parameters, removed_player_names=sorted(removed_player_names),
+                                      previous_lineup=[sorted(player[TConsts.PLAYERS_NAME_KEY] for player in
+                                                              team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY])
+                                                       for team in previous_teams]))
+        flight_key = (matchday_key, fingerprint, False, None)
+        job = self.__get_job(flight_key, lambda: self.__run_regeneration_job(
+            executor, previous_teams, removed_player_names, added_players, generation_parameters))
+        return await self.__await_job(job_key, job, progress_callback, heartbeat_interval)
+
+    def __get_job(self, flight_key, job_factory):
+        """
+        :return: The job computing <flight_key>, submitting the coroutine returned by <job_factory> if there isn't one.
+        """
+        job = self.__flights.get(flight_key)
+        if job is None:
+            if len(self.__queued_jobs) + len(self.__running_jobs) >= self.max_workers + self.max_queue_size:
+                raise TFABGenerationError("The team generation queue is full")
+
+            job = asyncio.ensure_future(job_factory())
+            self.__queued_jobs[job] = flight_key
+            self.__flights[flight_key] = job
+
+        return job
+
+    async def __await_job(self, job_key, job, progress_callback, heartbeat_interval):
+        """
+        Waits for <job> on behalf of the caller identified by <job_key>, reporting the progress as it goes.
+        :return: A copy of the result of <job>.
+        """
+        cancellation = asyncio.get_running_loop().create_future()
+        self.__callers[job_key] = (job, cancellation)
+        start_time = time.monotonic()
+
+        try:
+            while True:
+                done, _ = await asyncio.wait([job, cancellation], timeout=heartbeat_interval,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if cancellation in done:
+                    raise TFABGenerationCancelledError("Team generation was cancelled")
+                if job in done:
+                    return copy.deepcopy(job.result())
+                if progress_callback is not None:
+                    # Reporting the progress is best-effort, failing to report it mustn't abort the generation
+                    try:
+                        await progress_callback(self.get_queue_position(job_key), time.monotonic() - start_time)
+                    except Exception as e:
+                        tfab_logger.error("TFAB: Unable to report the team generation progress: %s", str(e))
+        except asyncio.CancelledError:
+            raise TFABGenerationCancelledError("Team generation was cancelled")
+        finally:
+            if self.__callers.get(job_key, (None, None))[1] is cancellation:
+                del self.__callers[job_key]
+            self.__release_job(job)
+
+    async def __run_job(self, executor, flight_key, player_dicts_list, generation_parameters):
+        """
+        Generates the teams in a worker, and caches the resulting lineup.
+        """
+        job = asyncio.current_task()
+        try:
+            result = await self.__run_in_worker(executor, job, _generate_teams_in_worker, player_dicts_list,
+                                                generation_parameters)
+
+            # Lineups that weren't found (e.g. within the time budget) might be found on the next attempt
+            if self.__get_teams(result, generation_parameters) is not None:
+                await self.__run_in_thread(self.lineup_cache.put, flight_key[1], result)
+            return result
+        finally:
+            self.__forget_job(job)
+
+    async def __run_regeneration_job(self, executor, previous_teams, removed_player_names, added_players,
+                                     generation_parameters):
+        job = asyncio.current_task()
+        try:
+            return await self.__run_in_worker(executor, job, _regenerate_teams_in_worker, previous_teams,
+                                              removed_player_names, added_players, generation_parameters)
+        finally:
+            self.__forget_job(job)
+
+    async def __run_candidates_job(self, executor, flight_key, player_dicts_list, num_candidates,
+                                   generation_parameters):
+        """
+        Generates the candidate lineups, first in parallel with different seeds, then one by one - each excluding the
+        lineups found so far - if the seeds alone didn't lead to enough distinct lineups. The candidates are cached.
+        """
+        job = asyncio.current_task()
+        try:
+            results = await asyncio.gather(*[
+                self.__run_in_worker(executor, job, _generate_teams_in_worker, player_dicts_list,
+                                     dict(generation_parameters, seed=seed))
+                for seed in random.sample(range(2 ** 31), num_candidates)])
+
+            candidates = {}
+            for result in results:
+                candidates.setdefault(self.__get_lineup(result, generation_parameters), result)
+            candidates.pop(None, None)
+
+            while candidates and len(candidates) < num_candidates:
+                excluded_lineups = [list(map(list, lineup)) for lineup in candidates.keys()]
+                result = await self.__run_in_worker(executor, job, _generate_teams_in_worker, player_dicts_list,
+                                                    dict(generation_parameters, excluded_lineups=excluded_lineups))
+                lineup = self.__get_lineup(result, generation_parameters)
+                if lineup is None or lineup in candidates:
+                    break
+                candidates[lineup] = result
+
+            if not candidates:
+                return results[:1]
+            ranked_candidates = sorted(candidates.values(), key=lambda candidate: self.get_rating_spread(
+                self.__get_teams(candidate, generation_parameters)))
+            await self.__run_in_thread(self.lineup_cache.put, flight_key[1], ranked_candidates)
+            return ranked_candidates
+        finally:
+            self.__forget_job(job)
+
+    async def __run_in_worker(self, executor, job, worker_function, *worker_arguments):
+        """
+        Waits for a free worker, then runs <worker_function> (a module-level function) in it on behalf of <job>.
+        """
+        loop = asyncio.get_running_loop()
+        enqueue_time = time.monotonic()
+        await self.__worker_slots.acquire()
+        if job in self.__queued_jobs:
+            self.__running_jobs[job] = self.__queued_jobs.pop(job)
+            self.__record_wait_time(time.monotonic() - enqueue_time)
+
+        # A running job can't be taken out of its worker (it is bounded by the generation time budget instead),
+        # so the worker slot is only released once the worker is actually done
+        worker_future = executor.submit(worker_function, *worker_arguments)
+        worker_future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.__worker_slots.release))
+        return await asyncio.wrap_future(worker_future)
+
+    @staticmethod
+    async def __run_in_thread(function, *arguments):
+        """
+        Runs the blocking <function> in the default thread pool of the event loop.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, function, *arguments)
+
+    @staticmethod
+    def __get_teams(result, generation_parameters):
+        return result[0] if generation_parameters.get("return_metadata") else result
+
+    @staticmethod
+    def __get_lineup(result, generation_parameters):
+        """
+        :return: The lineup of <result> as a set of teams, each being a set of player names. None if there isn't one.
+        """
+        teams = TFABGenerationService.__get_teams(result, generation_parameters)
+        if teams is None:
+            return None
+        return frozenset(frozenset(player[TConsts.PLAYERS_NAME_KEY]
+                                   for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]) for team in teams)
+
+    @staticmethod
+    def get_rating_spread(teams):
+        """
+        :return: The difference between the ratings of the strongest and the weakest teams in <teams>.
+        """
+        team_ratings = [team[TConsts.MATCHDAYS_SPECIFIC_TEAM_RATING_KEY] for team in teams]
+        return max(team_ratings) - min(team_ratings)
+
+    def __release_job(self, job):
+        """
+        Cancels <job> if no caller is waiting for it anymore.
+        """
+        if not job.done() and all(caller_job is not job for caller_job, _ in self.__callers.values()):
+            job.cancel()
+            self.__forget_job(job)
+
+    def __forget_job(self, job):
+        flight_key = self.__queued_jobs.pop(job, None) or self.__running_jobs.pop(job, None)
+        if self.__flights.get(flight_key) is job:
+            del self.__flights[flight_key]
+
+    def __record_wait_time(self, wait_time):
+        self.__started_jobs += 1
+        self.__total_wait_time += wait_time
+        self.__last_wait_time = wait_time
+        tfab_logger.info("TFAB: Team generation started after waiting %.2f seconds, %d requests still queued",
+                         wait_time, len(self.__queued_jobs))
+
+    def cancel(self, job_key):
+        """
+        Cancels the request of the caller identified by <job_key>, if there is one. The computation itself is only
+        cancelled if no other caller is waiting for it.
+        :return: Whether a request was cancelled.
+        """
+        job, cancellation = self.__callers.pop(job_key, (None, None))
+        if job is None or job.done():
+            return False
+
+        cancellation.set_result(None)
+        self.__release_job(job)
+        return True
+
+    def get_queue_position(self, job_key):
+        """
+        :return: The 1-based position of the request in the queue, 0 if it is already running, None if unknown.
+        """
+        job, _ = self.__callers.get(job_key, (None, None))
+        if job in self.__running_jobs:
+            return 0
+        if job in self.__queued_jobs:
+            return list(self.__queued_jobs.keys()).index(job) + 1
+        return None
+
+    def get_queue_depth(self):
+        """
+        :return: The amount of requests waiting for a free worker.
+        """
+        return len(self.__queued_jobs)
+
+    def get_statistics(self):
+        """
+        :return: A dictionary describing the queue depth, the amount of running requests, and the last and average
+        amount of seconds requests waited for a worker.
+        """
+        return {TConsts.GENERATION_STATISTICS_QUEUE_DEPTH_KEY: len(self.__queued_jobs),
+                TConsts.GENERATION_STATISTICS_RUNNING_KEY: len(self.__running_jobs),
+                TConsts.GENERATION_STATISTICS_LAST_WAIT_KEY: self.__last_wait_time,
+                TConsts.GENERATION_STATISTICS_AVERAGE_WAIT_KEY:
+                    self.__total_wait_time / self.__started_jobs if self.__started_jobs else 0}
+
+    def shutdown(self):
+        """
+        Cancels the queued requests and terminates the worker processes.
+        """
+        for job in list(self.__queued_jobs.keys()):
+            job.cancel()
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
@@ -0,0 +1,99 @@
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from tfab_framework.tfab_logger import tfab_logger
+from tfab_framework.tfab_consts import Consts as TConsts
+from tfab_framework.tfab_exception import TFABDatabaseError
+
+
+class TFABLineupCache(object):
+    """
+    Caches generated lineups by a hash of their entire input - the roster, the ratings and characteristics, the
+    generation parameters and the constraints. Changing any of them changes the key, so stale lineups are never
+    served, and simply age out.
+    Lookups go through an in-process LRU first, then through the database (if given). Since the database tier blocks,
+    the cache may be used from several threads (e.g. off the event loop).
+    """
+    DEFAULT_MAX_ENTRIES = 64
+    DEFAULT_MAX_PERSISTENT_ENTRIES = 256
+
+    def __init__(self, db=None, max_entries=DEFAULT_MAX_ENTRIES, max_persistent_entries=DEFAULT_MAX_PERSISTENT_ENTRIES):
+        """
+        :param db: The TFABDBHandler of the persistent tier, None to only cache in-process.
+        :param max_entries: The amount of lineups to keep in-process.
+        :param max_persistent_entries: The amount of lineups to keep in the database.
+        """
+        self.db = db
+        self.max_entries = max_entries
+        self.max_persistent_entries = max_persistent_entries
+        self.__lineups = OrderedDict()
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def get_fingerprint(player_dicts_list, generation_parameters):
+        """
+        :param player_dicts_list: The players to divide into teams.
+        :param generation_parameters: The parameters passed to TeamGenerator.generate_teams.
+        :return: A stable hash of the generation input, regardless of the order of the players and the constraints.
+        """
+        players = sorted([player[TConsts.PLAYERS_NAME_KEY], player[TConsts.PLAYERS_CHARACTERISTICS_KEY],
+                          player[TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY]] for player in player_dicts_list)
+        parameters = dict(generation_parameters)
+        for constraints_key in ["coupling_constraints", "decoupling_constraints"]:
+            if parameters.get(constraints_key) is not None:
+                parameters[constraints_key] = sorted(sorted(constraint) for constraint in parameters[constraints_key])
+
+        serialized_input = json.dumps({"Players": players, "Parameters": parameters}, sort_keys=True, default=str)
+        return hashlib.sha256(serialized_input.encode("utf-8")).hexdigest()
+
+    def get(self, fingerprint):
+        """
+        :return: A copy of the lineup cached for <fingerprint>, None if there isn't one.
+        """
+        with self.__lock:
+            if fingerprint in self.__lineups:
+                self.__lineups.move_to_end(fingerprint)
+                return copy.deepcopy(self.__lineups[fingerprint])
+
+        if self.db is None:
+            return None
+        try:
+            lineup = self.db.get_cached_lineup(fingerprint)
+        except TFABDatabaseError as e:
+            tfab_logger.error("TFAB: Unable to read the lineup cache: %s", str(e))
+            return None
+
+        if lineup is not None:
+            self.__remember(fingerprint, lineup)
+        return copy.deepcopy(lineup)
+
+    def put(self, fingerprint, lineup):
+        """
+        Caches <lineup> for <fingerprint>, replacing the lineup cached for it before (if any).
+        """
+        self.__remember(fingerprint, copy.deepcopy(lineup))
+
+        if self.db is None:
+            return
+        try:
+            self.db.insert_cached_lineup(fingerprint, lineup, self.max_persistent_entries)
+        except TFABDatabaseError as e:
+            tfab_logger.error("TFAB: Unable to write to the lineup cache: %s", str(e))
+
+    def clear(self):
+        """
+        Empties both tiers of the cache.
+        """
+        with self.__lock:
+            self.__lineups.clear()
+        if self.db is not None:
+            self.db.clear_cached_lineups()
+
+    def __remember(self, fingerprint, lineup):
+        with self.__lock:
+            self.__lineups[fingerprint] = lineup
+            self.__lineups.move_to_end(fingerprint)
+            while len(self.__lineups) > self.max_entries:
+                self.__lineups.popitem(last=False)
@@ -0,0 +1,36 @@
+"""
+Maintenance commands for the materialized PlayerRatings collection. The bot only builds the collection at startup if
+it's missing, so drifted ratings (e.g. after restoring a backup) are checked and rebuilt here.
+Run from the repository root:
+    python -m tfab_framework.tfab_ratings_maintenance check      # Lists the players whose materialized ratings are wrong
+    python -m tfab_framework.tfab_ratings_maintenance rebuild    # Rebuilds the collection out of the rankers' rankings
+"""
+import argparse
+import sys
+from tfab_framework.tfab_configuration import TFABConfiguration
+from tfab_framework.tfab_database_handler import TFABDBHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintains the materialized player ratings.")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--configuration", default="tfab_data//tfab_configuration.yaml",
+                        help="The TFAB configuration, naming the database to work on.")
+    args = parser.parse_args()
+
+    configuration = TFABConfiguration(args.configuration)
+    db = TFABDBHandler.get_instance(configuration.DB_NAME, configuration.MONGODB_PORT)
+
+    if args.command == "rebuild":
+        print("Materialized the ratings of {0} players".format(db.rebuild_player_ratings()))
+        return
+
+    inconsistent_players = db.check_player_ratings_consistency()
+    for player_name in inconsistent_players:
+        print("Inconsistent ratings: {0}".format(player_name))
+    print("{0} inconsistent players".format(len(inconsistent_players)))
+    sys.exit(1 if inconsistent_players else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import json
+import random
+import sys
+import time
+from tfab_framework.tfab_logger import tfab_logger
+from tfab_framework.tfab_consts import Consts as TConsts
+from tfab_utils.tfab_team_generator import TeamGenerator
+from tfab_utils.tfab_solver_backends import SolverBackends
+
+
+class TFABSolverCalibration(object):
+    """
+    Selects the team generation engine by roster size, according to a calibration benchmark of this host.
+    The calibration runs every available engine on seeded synthetic rosters of several sizes, recording its latency
+    and how much less balanced its lineups are than the best lineup found by any engine. For each size, the fastest
+    complete engine (see SolverBackends.is_complete) that's within the quality target is selected.
+    Without a calibration, the AUTO engine is always selected.
+    """
+    _instance = None
+    # <amount of players, amount of teams> combinations to calibrate
+    CALIBRATION_ROSTER_SIZES = [(10, 2), (15, 3), (18, 3), (21, 3), (24, 4), (30, 5)]
+    CALIBRATION_REPETITIONS = 3
+    CALIBRATION_TIME_BUDGET = 5
+    # The amount of rating points by which an engine's lineups may be less balanced than the best lineups found
+    DEFAULT_QUALITY_TARGET = 0.1
+
+    @staticmethod
+    def get_instance(calibration_path=None):
+        if TFABSolverCalibration._instance is None:
+            TFABSolverCalibration._instance = TFABSolverCalibration(calibration_path)
+        return TFABSolverCalibration._instance
+
+    def __init__(self, calibration_path=None):
+        """
+        Initializes an instance of TFABSolverCalibration.
+        :param calibration_path: The JSON file holding the calibration of this host. It's calibrated and created if it
+        doesn't exist yet. None to always select the AUTO engine.
+        """
+        self.calibration = None
+        if calibration_path is None:
+            return
+
+        try:
+            self.calibration = TFABSolverCalibration.load(calibration_path)
+        except FileNotFoundError:
+            tfab_logger.info("TFAB: Calibrating the team generation engines, this might take a few minutes")
+            self.calibration = TFABSolverCalibration.calibrate()
+            TFABSolverCalibration.save(self.calibration, calibration_path)
+
+    def select_engine(self, num_players, num_teams):
+        """
+        :return: The engine selected for the closest calibrated roster size that isn't smaller than <num_players>
+        (or for the largest one, if all of them are smaller). AUTO if there's no calibration.
+        """
+        if self.calibration is None or not self.calibration[TConsts.SOLVER_CALIBRATION_SELECTION_KEY]:
+            return TConsts.TeamGenerationEngines["AUTO"]
+
+        selection = self.calibration[TConsts.SOLVER_CALIBRATION_SELECTION_KEY]
+        covering_rows = [row for row in selection if row[TConsts.SOLVER_CALIBRATION_PLAYERS_KEY] >= num_players]
+        if covering_rows:
+            row = min(covering_rows, key=lambda row: (row[TConsts.SOLVER_CALIBRATION_PLAYERS_KEY],
+                                                      abs(row[TConsts.SOLVER_CALIBRATION_TEAMS_KEY] - num_teams)))
+        else:
+            row = max(selection, key=lambda row: (row[TConsts.SOLVER_CALIBRATION_PLAYERS_KEY],
+                                                  -abs(row[TConsts.SOLVER_CALIBRATION_TEAMS_KEY] - num_teams)))
+
+        return row[TConsts.SOLVER_CALIBRATION_ENGINE_KEY]
+
+    @staticmethod
+    def calibrate(engines=None, roster_sizes=None, repetitions=CALIBRATION_REPETITIONS,
+                  time_budget=CALIBRATION_TIME_BUDGET, quality_target=DEFAULT_QUALITY_TARGET):
+        """
+        Runs the calibration benchmark.
+        :param engines: The engines to calibrate, all the available ones if None.
+        :param roster_sizes: The <amount of players, amount of teams> combinations to calibrate, see
+        CALIBRATION_ROSTER_SIZES.
+        :param repetitions: The amount of rosters generated per combination.
+        :param time_budget: The time budget of every generation.
+        :param quality_target: The amount of rating points by which a selected engine's lineups may be less balanced
+        than the best lineups found.
+        :return: The calibration dictionary - the measurements of every engine and combination, and the selection.
+        """
+        engines = engines if engines is not None else SolverBackends.get_available_engines()
+        roster_sizes = roster_sizes if roster_sizes is not None else TFABSolverCalibration.CALIBRATION_ROSTER_SIZES
+        measurements = []
+        selection = []
+
+        for num_players, num_teams in roster_sizes:
+            latencies = {engine: [] for engine in engines}
+            spreads = {engine: [] for engine in engines}
+            measured_engines = [engine for engine in engines
+                                if engine != TConsts.TeamGenerationEngines["BRANCH_AND_BOUND"] or
+                                (num_players <= TeamGenerator.BRANCH_AND_BOUND_MAX_UNITS and
+                                 num_teams <= TeamGenerator.BRANCH_AND_BOUND_MAX_TEAMS)]
+
+            for repetition in range(repetitions):
+                roster = TFABSolverCalibration.generate_roster(num_players, repetition % 2,
+                                                               seed=num_players * 1000 + num_teams * 10 + repetition)
+                for engine in measured_engines:
+                    start = time.perf_counter()
+                    teams, metadata = TeamGenerator.generate_teams(list(roster), num_teams=num_teams, engine=engine,
+                                                                   break_symmetry=True, time_budget=time_budget,
+                                                                   return_metadata=True, seed=repetition)
+                    latencies[engine].append(time.perf_counter() - start)
+                    spreads[engine].append(metadata[TConsts.GENERATION_METADATA_OBJECTIVE_KEY] if teams is not None
+                                           else None)
+
+            # An engine's excess is how much less balanced its lineups were than the best ones, in the worst repetition
+            best_spreads = [min((spreads[engine][repetition] for engine in measured_engines
+                                 if spreads[engine][repetition] is not None), default=None)
+                            for repetition in range(repetitions)]
+            rows = []
+            for engine in measured_engines:
+                excesses = [None if spread is None else spread - best_spread
+                            for spread, best_spread in zip(spreads[engine], best_spreads) if best_spread is not None]
+                rows.append({TConsts.SOLVER_CALIBRATION_PLAYERS_KEY: num_players,
+                             TConsts.SOLVER_CALIBRATION_TEAMS_KEY: num_teams,
+                             TConsts.SOLVER_CALIBRATION_ENGINE_KEY: engine,
+                             TConsts.SOLVER_CALIBRATION_LATENCY_KEY: sum(latencies[engine]) / repetitions,
+                             TConsts.SOLVER_CALIBRATION_EXCESS_KEY: None if None in excesses else max(excesses,
+                                                                                                      default=0)})
+            measurements.extend(rows)
+
+            # Real rosters carry constraints the synthetic ones don't, so only the engines that never miss an existing
+            # lineup are selected - AUTO still gets the heuristic's latency whenever the heuristic is good enough
+            qualified_rows = [row for row in rows
+                              if SolverBackends.is_complete(row[TConsts.SOLVER_CALIBRATION_ENGINE_KEY]) and
+                              row[TConsts.SOLVER_CALIBRATION_EXCESS_KEY] is not None and
+                              row[TConsts.SOLVER_CALIBRATION_EXCESS_KEY] <= quality_target + TeamGenerator.EPSILON]
+            if qualified_rows:
+                fastest_row = min(qualified_rows, key=lambda row: row[TConsts.SOLVER_CALIBRATION_LATENCY_KEY])
+                selection.append({key: fastest_row[key] for key in [TConsts.SOLVER_CALIBRATION_PLAYERS_KEY,
+                                                                   TConsts.SOLVER_CALIBRATION_TEAMS_KEY,
+                                                                   TConsts.SOLVER_CALIBRATION_ENGINE_KEY]})
+
+        return {TConsts.SOLVER_CALIBRATION_QUALITY_TARGET_KEY: quality_target,
+                TConsts.SOLVER_CALIBRATION_MEASUREMENTS_KEY: measurements,
+                TConsts.SOLVER_CALIBRATION_SELECTION_KEY: selection}
+
+    @staticmethod
+    def generate_roster(num_players, num_gks, seed):
+        """
+        :return: A reproducible list of player dictionaries with random characteristics and ratings, the first
+        <num_gks> being GKs.
+        """
+        rng = random.Random(seed)
+        field_characteristics = [TConsts.PlayerCharacteristics["DEFENSIVE"], TConsts.PlayerCharacteristics["OFFENSIVE"],
+                                 TConsts.PlayerCharacteristics["ALLAROUND"]]
+        roster = []
+        for i in range(num_players):
+            is_gk = i < num_gks
+            roster.append({TConsts.PLAYERS_NAME_KEY: "player{0}".format(i),
+                           TConsts.PLAYERS_CHARACTERISTICS_KEY: TConsts.PlayerCharacteristics["GOALKEEPER"] if is_gk
+                           else rng.choice(field_characteristics),
+                           TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY: 0 if is_gk
+                           else round(rng.uniform(3, 9), 2)})
+        return roster
+
+    @staticmethod
+    def save(calibration, calibration_path):
+        with open(calibration_path, "w") as calibration_file:
+            json.dump(calibration, calibration_file, indent=4)
+
+    @staticmethod
+    def load(calibration_path):
+        with open(calibration_path, "r") as calibration_file:
+            return json.load(calibration_file)
+
+
+if __name__ == "__main__":
+    # Calibrates this host: python -m tfab_framework.tfab_solver_calibration <calibration path>
+    host_calibration = TFABSolverCalibration.calibrate()
+    TFABSolverCalibration.save(host_calibration, sys.argv[1])
+    for selected_row in host_calibration[TConsts.SOLVER_CALIBRATION_SELECTION_KEY]:
+        print("{0:>3} players, {1} teams: {2}".format(selected_row[TConsts.SOLVER_CALIBRATION_PLAYERS_KEY],
+                                                      selected_row[TConsts.SOLVER_CALIBRATION_TEAMS_KEY],
+                                                      selected_row[TConsts.SOLVER_CALIBRATION_ENGINE_KEY]))
@@ -2,6 +2,10 @@ from tfab_framework.tfab_logger import tfab_logger
 from tfab_framework.application.tfab_app import TFABApplication
 from tfab_framework.tfab_consts import Consts as TConsts
 from tfab_framework.tfab_database_handler import TFABDBHandler
+from tfab_framework.tfab_async_database_handler import TFABAsyncDBHandler
+from tfab_framework.tfab_generation_service import TFABGenerationService
+from tfab_framework.tfab_lineup_cache import TFABLineupCache
+from tfab_framework.tfab_solver_calibration import TFABSolverCalibration
 from tfab_framework.tfab_configuration import TFABConfiguration
 from tfab_framework.tfab_exception import TFABSystemError, TFABConfigurationError, TFABDatabaseError, \
     TFABApplicationError, TFABException
@@ -17,7 +21,10 @@ class TFABSystem(object):
         """
         try:
             self.__initialize_configuration(tfab_conf_path)
-            self.__initialize_database(self.__configuration.DB_NAME, self.__configuration.MONGODB_PORT)
+            self.__initialize_database(self.__configuration.DB_NAME, self.__configuration.MONGODB_PORT,
+                                       getattr(self.__configuration, "CONFIGURATION_POLL_INTERVAL", None))
+            self.__initialize_generation_service(self.__configuration, self.__db)
+            self.__initialize_solver_calibration(self.__configuration)
             self.__initialize_app(self.__configuration, self.__db)
             tfab_logger.debug("TFABSystem successfully initialized")
         except Exception as e:
@@ -30,11 +37,18 @@ class TFABSystem(object):
         """
         self.__configuration = TFABConfiguration(conf_path)
 
-    def __initialize_database(self, db_name, db_port):
+    def __initialize_database(self, db_name, db_port, configuration_poll_interval):
         """
         Initializes the database we're working with.
         """
-        self.__db = TFABDBHandler.get_instance(db_name, db_port)
+        self.__db = TFABDBHandler.get_instance(db_name, db_port, configuration_poll_interval)
+        # The menu handlers use the asyncio counterpart, so DB calls don't block the event loop
+        TFABAsyncDBHandler.get_instance(self.__db, getattr(self.__configuration, "DB_MAX_CONCURRENCY", None),
+                                        getattr(self.__configuration, "DB_CALL_TIMEOUT", None))
+        tfab_logger.info("TFAB: Created %d indexes: %s", len(self.__db.created_indexes),
+                         ", ".join(self.__db.created_indexes) if self.__db.created_indexes else "-")
+        for failed_index in self.__db.failed_indexes:
+            tfab_logger.error("TFAB: Couldn't create the index %s", failed_index)
 
         # Initialize metadata
         if not self.__db.check_configuration_existence(TConsts.INTERNAL_ADMIN_PASSWORD_KEY):
@@ -49,10 +63,36 @@ class TFABSystem(object):
         # Initialize team generation parameters
         if not self.__db.check_configuration_existence(TConsts.TeamGenerationParameters["NUM_TEAMS"]):
             self.__db.insert_configuration_value(TConsts.TeamGenerationParameters["NUM_TEAMS"], 3)
+        if not self.__db.check_configuration_existence(TConsts.TeamGenerationParameters["TIME_BUDGET"]):
+            self.__db.insert_configuration_value(TConsts.TeamGenerationParameters["TIME_BUDGET"], 10)
+        if not self.__db.check_configuration_existence(TConsts.TeamGenerationParameters["NUM_CANDIDATES"]):
+            self.__db.insert_configuration_value(TConsts.TeamGenerationParameters["NUM_CANDIDATES"], 3)
+        if not self.__db.check_configuration_existence(TConsts.TeamGenerationParameters["MAX_MOVED_PLAYERS"]):
+            self.__db.insert_configuration_value(TConsts.TeamGenerationParameters["MAX_MOVED_PLAYERS"], 2)
         for key in TConsts.TeamGenerationParameters.values():
             if not self.__db.check_configuration_existence(key):
                 self.__db.insert_configuration_value(key, 1)
 
+        # Materializes the ratings of databases that predate the PlayerRatings collection. Drifted ratings are checked
+        # and rebuilt on demand, through tfab_ratings_maintenance
+        materialized_players = self.__db.materialize_player_ratings_if_missing()
+        if materialized_players:
+            tfab_logger.info("TFAB: Materialized the ratings of %d players", materialized_players)
+
+    def __initialize_generation_service(self, config, db):
+        """
+        Initializes the team generation worker pool, with the concurrency limits from the configuration (if given),
+        and the lineup cache persisted in the database.
+        """
+        TFABGenerationService.get_instance(getattr(config, "GENERATION_MAX_WORKERS", None),
+                                           getattr(config, "GENERATION_MAX_QUEUE_SIZE", None),
+                                           TFABLineupCache(db))
+
+    def __initialize_solver_calibration(self, config):
+        """
+        Loads the calibration of the team generation engines on this host (if configured), calibrating it if needed.
+        """
+        TFABSolverCalibration.get_instance(getattr(config, "SOLVER_CALIBRATION_PATH", None))
 
     def __initialize_app(self, config, db):
         """
@@ -110,8 +110,10 @@ class MessageParser:
                 TConsts.MATCHDAYS_ROSTER_KEY: MessageParser._get_roster_value(message)}
 
     @staticmethod
-    def generate_matchday_message(matchday_dict):
+    def generate_matchday_message(matchday_dict, player_characteristics=None):
         """
+        :param player_characteristics: A dictionary mapping the names of the teams' players to their current
+        characteristics. If not given, they're looked up in the DB.
         :return: A nicely formatted message, describing the information within <matchday_dict>
         """
         message = "הרשימה היומית כפי שנקלטה בבוטיטו:\n"
@@ -119,7 +121,11 @@ class MessageParser:
         location = matchday_dict[TConsts.MATCHDAYS_LOCATION_KEY]
         player_list = matchday_dict[TConsts.MATCHDAYS_ROSTER_KEY]
         teams = matchday_dict[TConsts.MATCHDAYS_TEAMS_KEY]
-        db = TFABDBHandler.get_instance()
+        if player_characteristics is None:
+            db = TFABDBHandler.get_instance()
+            player_characteristics = {player[TConsts.PLAYERS_NAME_KEY]:
+                                      db.get_player_characteristic(player[TConsts.PLAYERS_NAME_KEY])
+                                      for team in teams for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]}
 
         if date:
             message += "תאריך: {0}\n".format(date)
@@ -138,7 +144,7 @@ class MessageParser:
                 for player_index, player in enumerate(players):
                     message += "{0}.{1} - {2:.2f} ({3})\n".format(player_index + 1, player[TConsts.PLAYERS_NAME_KEY],
                                                       player[TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY],
-                                                    TConsts.PlayerPositionToHebrew[db.get_player_characteristic(player[TConsts.PLAYERS_NAME_KEY])])
+                                                    TConsts.PlayerPositionToHebrew[player_characteristics.get(player[TConsts.PLAYERS_NAME_KEY])])
                 message += "\n\n"
 
             message += "שיהיה בהצלחה!"
@@ -0,0 +1,89 @@
+import numpy as np
+from tfab_framework.tfab_consts import Consts as TConsts
+
+
+class Roster(object):
+    """
+    A compact, array-backed list of players - the internal representation the team generator works on.
+    The ratings and the integer-coded characteristics are kept in a NumPy structured array, so counting and summing
+    over the players is vectorized rather than re-reading the player dictionaries. The dictionaries themselves are kept
+    alongside, so the generated teams hold the very objects that were passed in.
+    """
+    __slots__ = ("players", "records", "names", "name_to_index")
+
+    # Characteristics are coded by their order in PlayerCharacteristics, and unknown ones as UNKNOWN_CODE
+    CHARACTERISTIC_CODES = {characteristic: code
+                            for code, characteristic in enumerate(TConsts.PlayerCharacteristics.values())}
+    UNKNOWN_CODE = -1
+    DTYPE = np.dtype([("rating", np.float64), ("characteristic", np.int8)])
+
+    def __init__(self, player_dicts_list):
+        """
+        Initializes an instance of Roster.
+        :param player_dicts_list: A list of dictionaries, each describing a player's Name, Characteristic, Rating.
+        """
+        self.players = list(player_dicts_list)
+        self.records = np.array([(player[TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY],
+                                  Roster.CHARACTERISTIC_CODES.get(player[TConsts.PLAYERS_CHARACTERISTICS_KEY],
+                                                                  Roster.UNKNOWN_CODE))
+                                 for player in self.players], dtype=Roster.DTYPE)
+        self.names = [player[TConsts.PLAYERS_NAME_KEY] for player in self.players]
+        self.name_to_index = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.players)
+
+    def __getitem__(self, index):
+        return self.players[index]
+
+    def __iter__(self):
+        return iter(self.players)
+
+    @property
+    def ratings(self):
+        return self.records["rating"]
+
+    @property
+    def characteristics(self):
+        return self.records["characteristic"]
+
+    def to_player_dicts(self):
+        """
+        :return: The player dictionaries, in the roster's order.
+        """
+        return list(self.players)
+
+    def sorted_by_rating(self):
+        """
+        :return: A Roster of the same players sorted by descending rating. Equally-rated players keep their order.
+        """
+        order = np.argsort(-self.ratings, kind="stable").tolist()
+        sorted_roster = Roster.__new__(Roster)
+        sorted_roster.players = [self.players[i] for i in order]
+        sorted_roster.records = self.records[order]
+        sorted_roster.names = [self.names[i] for i in order]
+        sorted_roster.name_to_index = {name: i for i, name in enumerate(sorted_roster.names)}
+        return sorted_roster
+
+    def get_characteristic_mask(self, *characteristics):
+        """
+        :return: A boolean array marking the players whose characteristic is one of <characteristics>.
+        """
+        mask = np.zeros(len(self.records), dtype=bool)
+        for characteristic in characteristics:
+            mask |= self.characteristics == Roster.CHARACTERISTIC_CODES[characteristic]
+        return mask
+
+    def get_gk_mask(self):
+        return self.get_characteristic_mask(TConsts.PlayerCharacteristics["GOALKEEPER"])
+
+    def get_gk_amount(self):
+        return int(np.count_nonzero(self.get_gk_mask()))
+
+    def get_team_sums(self, assignment, num_teams, weights=None):
+        """
+        :param assignment: The team index of every player.
+        :param weights: A value per player to sum, None to count the players.
+        :return: An array holding the sum of <weights> over the players of each team.
+        """
+        return np.bincount(np.asarray(assignment, dtype=np.intp), weights=weights, minlength=num_teams)
@@ -0,0 +1,271 @@
+import os, re, tempfile, threading, atexit, subprocess
+from tfab_framework.tfab_consts import Consts as TConsts
+from pulp import PULP_CBC_CMD, HiGHS, PulpSolverError, LpMaximize, LpStatusOptimal, LpStatusInfeasible, \
+    LpStatusUnbounded, LpStatusNotSolved, LpStatusUndefined, LpSolutionOptimal, LpSolutionIntegerFeasible, \
+    LpSolutionInfeasible, LpSolutionUnbounded, LpSolutionNoSolutionFound
+
+
+class CBCWorker(object):
+    """
+    Keeps a CBC process started ahead of time, waiting at its interactive prompt, so solving doesn't wait for a
+    process to spawn. The models (and the MIP starts) are handed over through in-memory files (memfd) that CBC opens
+    by their /proc path, and the solutions are read back from CBC's output, so nothing goes through the disk. On hosts
+    without memfd, a single temporary file per buffer is reused for the worker's lifetime instead.
+    CBC carries the best solution of a model (and its MIP start) over to the next model it imports, so every process
+    solves a single model, and the next one is started in the background once it's handed over.
+    """
+    # CBC sets its time limit to this amount of seconds by default
+    UNLIMITED_TIME_BUDGET = 100000000
+    # The seconds a solve may take beyond its time budget (to import the model and report the solution), and the
+    # seconds a solve without a time budget may take, before the process is considered wedged and killed
+    TIMEOUT_MARGIN = 10
+    MAX_UNBUDGETED_SOLVE_TIME = 600
+    # Sent as an unknown command, CBC echoes it back, which marks where the log ends and the solution starts
+    SOLUTION_MARKER = "tfab_solution"
+    PROMPT = "Coin:"
+    STATUSES = {"Optimal": (LpStatusOptimal, LpSolutionOptimal),
+                "Infeasible": (LpStatusInfeasible, LpSolutionInfeasible),
+                "Integer": (LpStatusInfeasible, LpSolutionInfeasible),
+                "Unbounded": (LpStatusUnbounded, LpSolutionUnbounded),
+                "Stopped": (LpStatusNotSolved, LpSolutionNoSolutionFound)}
+
+    def __init__(self):
+        self.__cbc = PULP_CBC_CMD(msg=False)
+        self.__process = None
+        self.__buffers = []
+        self.__lock = threading.Lock()
+
+    def is_running(self):
+        return self.__process is not None and self.__process.poll() is None
+
+    def start(self):
+        """
+        Starts the waiting CBC process (and the buffers), if it isn't running yet.
+        """
+        with self.__lock:
+            self.__start()
+
+    def solve(self, prob, time_budget=None, warm_start=False, seed=0):
+        """
+        Solves <prob> in place, like PULP_CBC_CMD does.
+        :param prob: The LpProblem to solve.
+        :param time_budget: The amount of seconds CBC may run for, or None for no limit.
+        :param warm_start: Whether to start from the initial values set on the variables.
+        :param seed: The random seed of CBC.
+        :return: A dictionary with the best bound CBC proved (None if it wasn't reported) and the amount of nodes.
+        Raises PulpSolverError if the process stopped, or didn't finish in time (it's then killed).
+        """
+        timeout = time_budget + CBCWorker.TIMEOUT_MARGIN if time_budget is not None \
+            else CBCWorker.MAX_UNBUDGETED_SOLVE_TIME
+        with self.__lock:
+            self.__start()
+            (model_path, _), (start_path, _) = self.__buffers
+            process, self.__process = self.__process, None
+
+            variables, variable_names, constraint_names, _ = prob.writeMPS(model_path, rename=1)
+            commands = ["import {0}".format(model_path)]
+            if warm_start:
+                self.__cbc.writesol(start_path, prob, variables, variable_names, constraint_names)
+                commands.append("mips {0}".format(start_path))
+            commands.extend(["maximize" if prob.sense == LpMaximize else "minimize",
+                             "sec {0}".format(time_budget if time_budget is not None
+                                              else CBCWorker.UNLIMITED_TIME_BUDGET),
+                             "RandomS {0}".format(seed),
+                             "solve",
+                             CBCWorker.SOLUTION_MARKER,
+                             "solution -",
+                             "quit"])
+
+            try:
+                output, _ = process.communicate("\n".join(commands) + "\n", timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise PulpSolverError("TFAB: The CBC worker didn't finish within {0} seconds".format(timeout))
+            except OSError:
+                process.kill()
+                process.wait()
+                raise PulpSolverError("TFAB: The CBC worker stopped while solving")
+
+        threading.Thread(target=self.start, daemon=True).start()
+
+        log_text, marker, solution_text = output.partition(CBCWorker.SOLUTION_MARKER)
+        if not marker:
+            raise PulpSolverError("TFAB: The CBC worker exited unexpectedly")
+        status, sol_status, values = CBCWorker.parse_solution(solution_text.splitlines()[1:], variable_names)
+        prob.assignVarsVals({variable.name: values.get(variable.name, 0) for variable in variables})
+        prob.assignStatus(status, sol_status)
+        return SolverBackends.parse_cbc_log(log_text)
+
+    def shutdown(self):
+        """
+        Stops the waiting CBC process and releases the buffers. The next solve starts them over.
+        """
+        with self.__lock:
+            if self.__process is not None:
+                self.__process.kill()
+                self.__process.communicate()
+                self.__process = None
+            for buffer_path, buffer_fd in self.__buffers:
+                os.close(buffer_fd)
+                if not buffer_path.startswith("/proc/"):
+                    os.remove(buffer_path)
+            self.__buffers = []
+
+    @staticmethod
+    def parse_solution(solution_lines, variable_names):
+        """
+        :param solution_lines: The lines CBC printed for the "solution -" command.
+        :param variable_names: A dictionary of the variables' names to their names in the MPS file.
+        :return: (A, B, C) -> A is the LpStatus of the problem, B is its solution status, C is a dictionary of the
+        variables' names to their values (the variables CBC didn't print are 0).
+        """
+        mps_names = {mps_name: name for name, mps_name in variable_names.items()}
+        header = solution_lines[0].replace(CBCWorker.PROMPT, "").split() if solution_lines else []
+        status, sol_status = CBCWorker.STATUSES.get(header[0] if header else None,
+                                                    (LpStatusUndefined, LpSolutionNoSolutionFound))
+        # A solve that was stopped on time still reports the best solution it found
+        if status == LpStatusNotSolved and len(header) >= 5 and header[4] == "objective":
+            status, sol_status = LpStatusOptimal, LpSolutionIntegerFeasible
+
+        values = {}
+        for line in solution_lines[1:]:
+            fields = line.split()
+            if fields and fields[0] == "**":
+                fields = fields[1:]
+            if len(fields) >= 3 and fields[1] in mps_names:
+                values[mps_names[fields[1]]] = float(fields[2])
+
+        return status, sol_status, values
+
+    def __start(self):
+        if not self.__buffers:
+            self.__buffers = [CBCWorker.__create_buffer("model"), CBCWorker.__create_buffer("start")]
+        if not self.is_running():
+            self.__process = subprocess.Popen([self.__cbc.path], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                              stderr=subprocess.STDOUT, text=True)
+
+    @staticmethod
+    def __create_buffer(name):
+        """
+        :return: (A, B) -> A is a path CBC can open the buffer by, B is the buffer's file descriptor.
+        """
+        if hasattr(os, "memfd_create") and os.path.isdir("/proc/self/fd"):
+            buffer_fd = os.memfd_create("tfab_{0}".format(name))
+            return "/proc/{0}/fd/{1}".format(os.getpid(), buffer_fd), buffer_fd
+
+        buffer_fd, buffer_path = tempfile.mkstemp(suffix=".mps" if name == "model" else ".mst")
+        return buffer_path, buffer_fd
+
+
+class SolverBackends(object):
+    """
+    The MILP solvers that the team generation model can be handed to. The model is built once through PuLP regardless
+    of the backend, and a backend that isn't installed on this host is simply reported as unavailable.
+    The in-process engines (the heuristic and the branch and bound) need nothing external, so they're always available.
+    """
+    MILP_ENGINES = [TConsts.TeamGenerationEngines["CBC"], TConsts.TeamGenerationEngines["HIGHS"]]
+    IN_PROCESS_ENGINES = [TConsts.TeamGenerationEngines["HEURISTIC"], TConsts.TeamGenerationEngines["BRANCH_AND_BOUND"],
+                          TConsts.TeamGenerationEngines["AUTO"]]
+    # Whether CBC solves go through a long-lived CBCWorker of this process rather than a CBC process per solve
+    USE_PERSISTENT_CBC = True
+    _cbc_worker = None
+
+    @staticmethod
+    def get_cbc_worker():
+        """
+        :return: The CBCWorker of this process, which is shut down when the process exits.
+        """
+        if SolverBackends._cbc_worker is None:
+            SolverBackends._cbc_worker = CBCWorker()
+            atexit.register(SolverBackends._cbc_worker.shutdown)
+        return SolverBackends._cbc_worker
+
+    @staticmethod
+    def is_available(engine):
+        """
+        :param engine: One of TeamGenerationEngines.
+        :return: True if <engine> can be used on this host.
+        """
+        if engine in SolverBackends.IN_PROCESS_ENGINES:
+            return True
+        if engine == TConsts.TeamGenerationEngines["CBC"]:
+            return PULP_CBC_CMD(msg=False).available()
+        if engine == TConsts.TeamGenerationEngines["HIGHS"]:
+            return HiGHS(msg=False).available()
+        return False
+
+    @staticmethod
+    def is_complete(engine):
+        """
+        :return: True if <engine> finds a lineup whenever one exists (given enough time). The heuristic isn't, so it
+        should only be used on its own when failing to find a lineup is acceptable.
+        """
+        return engine != TConsts.TeamGenerationEngines["HEURISTIC"]
+
+    @staticmethod
+    def get_available_engines():
+        """
+        :return: The TeamGenerationEngines that can be used on this host.
+        """
+        return [engine for engine in TConsts.TeamGenerationEngines.values() if SolverBackends.is_available(engine)]
+
+    @staticmethod
+    def solve(prob, engine, time_budget=None, warm_start=False, seed=0, persistent=None):
+        """
+        Solves <prob> in place with the MILP solver of <engine>.
+        :param prob: The LpProblem to solve.
+        :param engine: One of MILP_ENGINES.
+        :param time_budget: The amount of seconds the solver may run for, or None for no limit.
+        :param warm_start: Whether to start from the initial values set on the variables. Ignored by solvers that
+        don't support it through PuLP.
+        :param seed: The random seed of the solver.
+        :param persistent: Whether to solve CBC models with the CBCWorker of this process, USE_PERSISTENT_CBC if None.
+        :return: A dictionary with the best bound the solver proved (None if it wasn't reported) and the amount of nodes.
+        """
+        if engine == TConsts.TeamGenerationEngines["HIGHS"]:
+            # HiGHS runs in-memory, and reports its statistics through its model rather than a log
+            prob.solve(HiGHS(msg=False, timeLimit=time_budget, random_seed=seed))
+            info = prob.solverModel.getInfo()
+            return {"best_bound": getattr(info, "mip_dual_bound", None), "nodes": getattr(info, "mip_node_count", 0)}
+
+        persistent = SolverBackends.USE_PERSISTENT_CBC if persistent is None else persistent
+        if persistent:
+            try:
+                return SolverBackends.get_cbc_worker().solve(prob, time_budget=time_budget, warm_start=warm_start,
+                                                             seed=seed)
+            except PulpSolverError:
+                # This solve falls back to a CBC process of its own, the worker starts another process for the next one
+                pass
+
+        # Log CBC to a file, to extract the bound and the amount of nodes out of it
+        log_file, log_path = tempfile.mkstemp(suffix=".log")
+        os.close(log_file)
+        cbc_solver = PULP_CBC_CMD(msg=False, keepFiles=False, logPath=log_path, timeLimit=time_budget,
+                                  warmStart=warm_start,
+                                  # Set random seed to ensure reproducibility, passes as command-line arg to solver
+                                  options=[f"RandomS {seed}"])
+        try:
+            prob.solve(cbc_solver)
+            with open(log_path, "r") as log:
+                return SolverBackends.parse_cbc_log(log.read())
+        finally:
+            os.remove(log_path)
+
+    @staticmethod
+    def parse_cbc_log(log_text):
+        """
+        :param log_text: The log CBC wrote while solving.
+        :return: A dictionary with the best bound CBC proved (None if it wasn't reported) and the amount of nodes.
+        """
+        bound_match = re.search(r"Lower bound:\s+(\S+)", log_text)
+        nodes_match = re.search(r"Enumerated nodes:\s+(\d+)", log_text)
+
+        best_bound = None
+        if bound_match:
+            try:
+                best_bound = float(bound_match.group(1))
+            except ValueError:
+                pass
+
+        return {"best_bound": best_bound, "nodes": int(nodes_match.group(1)) if nodes_match else 0}
@@ -1,17 +1,41 @@
-import random, math
+import random, math, time, itertools
+import numpy as np
 from tfab_framework.tfab_consts import Consts as TConsts
-from pulp import LpProblem, LpVariable, LpMinimize, lpSum, value, PULP_CBC_CMD, LpStatus, LpStatusInfeasible
+from tfab_utils.tfab_solver_backends import SolverBackends
+from tfab_utils.tfab_roster import Roster
+from pulp import LpProblem, LpVariable, LpMinimize, lpSum, value, LpStatus, LpStatusInfeasible, \
+    LpSolutionOptimal, LpSolutionIntegerFeasible, LpAffineExpression, LpConstraint, LpConstraintLE, LpConstraintGE, \
+    LpConstraintEQ
 
 
 class TeamGenerator(object):
     """
     Responsible for generating the most balanced teams out of a player list containing characteristics and ratings.
     """
+    # The largest rating spread between teams for which the AUTO engine keeps the heuristic lineup
+    HEURISTIC_ACCEPTED_RATING_SPREAD = 0.5
+    # The amount of drafts the heuristic runs its local search from - the first in snake order, the rest shuffled
+    HEURISTIC_RESTARTS = 5
+    EPSILON = 1e-9
+    # The largest amount of units and teams for which the AUTO engine solves exactly with the branch and bound
+    BRANCH_AND_BOUND_MAX_UNITS = 18
+    BRANCH_AND_BOUND_MAX_TEAMS = 3
+    # The amount of branch and bound nodes between checks of the time budget
+    BRANCH_AND_BOUND_CLOCK_INTERVAL = 1024
+    # The default largest amount of remaining players regenerate_teams may move between teams, and the rating points
+    # a move costs - a player is only moved if it improves the balance by more than that
+    DEFAULT_MAX_MOVED_PLAYERS = 2
+    REGENERATION_MOVE_COST = 0.01
+    REGENERATION_TIME_BUDGET = 1
+    # The columns of a unit's vector, see _get_units
+    UNIT_SIZE, UNIT_RATING, UNIT_GKS, UNIT_DEFS, UNIT_ATTS, UNIT_CAPPED_START = range(6)
 
     @staticmethod
     def generate_teams(player_dicts_list, balance_team_ratings=True, enforce_tiers=True, enforce_defense=False,
                        enforce_offense=False, enforce_total_roles=False, num_teams=3, coupling_constraints=None,
-                       decoupling_constraints=None):
+                       decoupling_constraints=None, engine=TConsts.TeamGenerationEngines["CBC"],
+                       break_symmetry=False, time_budget=None, return_metadata=False, seed=None,
+                       excluded_lineups=None):
         """
         :param player_dicts_list: A list of dictionaries, each describing a player's Name, Characteristic, Rating.
         :param balance_team_ratings: Whether to add the constraint that the teams' ratings must be optimally balanced.
@@ -22,179 +46,1033 @@ class TeamGenerator(object):
         :param num_teams: The amount of teams to generate.
         :param coupling_constraints: A list where each entry is a "must be in the same team" constraint.
         :param decoupling_constraints: A list where each entry is a "mustn't be in the same team" constraint.
+        :param engine: One of TeamGenerationEngines - CBC and HIGHS solve the MILP with the respective solver (see
+        SolverBackends), HEURISTIC runs a draft followed by a local search, BRANCH_AND_BOUND solves exactly in-process
+        (only practical for small rosters), and AUTO solves small rosters with BRANCH_AND_BOUND, otherwise runs the
+        heuristic and falls back to CBC if its lineup is infeasible or too unbalanced.
+        :param break_symmetry: Whether to order the teams inside the MILP, so the solver doesn't explore the equivalent
+        permutations of every lineup. Doesn't affect the optimal objective.
+        :param time_budget: The amount of seconds the exact engines may run for, after which the best lineup found so
+        far is used. None means no limit.
+        :param return_metadata: Whether to return the generation metadata along with the teams.
+        :param seed: Seeds the randomization of the generation, to reproduce (or deliberately vary) a lineup.
+        :param excluded_lineups: Lineups that mustn't be returned, each being a list of teams given by their player
+        names. Excluding lineups implies <break_symmetry>, which lets every lineup be cut off by a single constraint.
         :return: A list of dictionaries, each describing a team's players and the team's calculated score.
+        If <return_metadata> is set - (A, B) -> A is the above list, and B is a dictionary describing the engine used,
+        the status, the objective (rating spread), the best bound, the gap between them and the amount of nodes. A
+        request rejected by check_feasibility's analysis (of the players in the order the generation saw them) also
+        holds the reason and the names of the players causing it.
         """
         if coupling_constraints is None:
             coupling_constraints = []
         if decoupling_constraints is None:
             decoupling_constraints = []
 
-        result_list = []
-        player_name_to_index = {}
-
-        for _ in range(num_teams):
-            result_list.append({TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY: [],
-                                TConsts.MATCHDAYS_SPECIFIC_TEAM_RATING_KEY: 0})
+        # A seeded generation draws from its own generator, leaving the process-wide one untouched
+        rng = random.Random(seed) if seed is not None else random
 
         # Sort the list by the player ratings
-        random.shuffle(player_dicts_list)  # Additional form of randomization when certain players have equal ratings
-        sorted_players = sorted(player_dicts_list,
-                                key=lambda player: player[TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY],
-                                reverse=True)
+        rng.shuffle(player_dicts_list)  # Additional form of randomization when certain players have equal ratings
+        sorted_players = Roster(player_dicts_list).sorted_by_rating()
+        generation_flags = {"balance_team_ratings": balance_team_ratings,
+                            "enforce_tiers": enforce_tiers,
+                            "enforce_defense": enforce_defense,
+                            "enforce_offense": enforce_offense,
+                            "enforce_total_roles": enforce_total_roles}
+
+        excluded_assignments = TeamGenerator._get_excluded_assignments(sorted_players, excluded_lineups)
+        assignment, metadata = TeamGenerator._generate_assignment(
+            sorted_players, num_teams, coupling_constraints, decoupling_constraints, engine,
+            break_symmetry or bool(excluded_assignments), time_budget, excluded_assignments, rng, **generation_flags)
+        teams = TeamGenerator._build_teams(sorted_players, assignment, num_teams) if assignment is not None else None
+
+        return (teams, metadata) if return_metadata else teams
+
+    @staticmethod
+    def regenerate_teams(previous_teams, removed_player_names, added_players,
+                         max_moved_players=DEFAULT_MAX_MOVED_PLAYERS, balance_team_ratings=True, enforce_tiers=True,
+                         enforce_defense=False, enforce_offense=False, enforce_total_roles=False,
+                         coupling_constraints=None, decoupling_constraints=None,
+                         time_budget=REGENERATION_TIME_BUDGET, return_metadata=False, seed=None):
+        """
+        Regenerates a lineup after some players dropped out and others joined, rather than generating it from scratch.
+        The remaining players start from their previous teams, and at most <max_moved_players> of them may change
+        teams. Within that limit the teams are balanced as usual, and every moved player costs REGENERATION_MOVE_COST
+        rating points, so a player is only moved if that's worth it. The teams keep their previous order.
+        :param previous_teams: The current lineup, as returned by generate_teams.
+        :param removed_player_names: The names of the players who dropped out.
+        :param added_players: The player dictionaries of the players who joined.
+        :param max_moved_players: The largest amount of remaining players that may change teams.
+        :param seed: Seeds the solver, as in generate_teams.
+        :return: As in generate_teams (the other parameters are documented there too). The metadata also holds the
+        amount of remaining players who changed teams. With too few moves allowed, the status is INFEASIBLE.
+        """
+        if coupling_constraints is None:
+            coupling_constraints = []
+        if decoupling_constraints is None:
+            decoupling_constraints = []
+
+        num_teams = len(previous_teams)
+        removed_player_names = set(removed_player_names)
+        previous_team_of = {}
+        player_dicts_list = []
+        for j, team in enumerate(previous_teams):
+            for player in team[TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]:
+                if player[TConsts.PLAYERS_NAME_KEY] not in removed_player_names:
+                    previous_team_of[player[TConsts.PLAYERS_NAME_KEY]] = j
+                    player_dicts_list.append(player)
+        player_dicts_list.extend(player for player in added_players
+                                 if player[TConsts.PLAYERS_NAME_KEY] not in previous_team_of)
+
+        # A seeded regeneration draws from its own generator, leaving the process-wide one untouched
+        rng = random.Random(seed) if seed is not None else random
+        sorted_players = Roster(player_dicts_list).sorted_by_rating()
+        generation_flags = {"balance_team_ratings": balance_team_ratings,
+                            "enforce_tiers": enforce_tiers,
+                            "enforce_defense": enforce_defense,
+                            "enforce_offense": enforce_offense,
+                            "enforce_total_roles": enforce_total_roles}
+
+        assignment, metadata = TeamGenerator._regenerate_assignment(
+            sorted_players, num_teams, coupling_constraints, decoupling_constraints, previous_team_of,
+            max_moved_players, time_budget, rng=rng, **generation_flags)
+        teams = TeamGenerator._build_teams(sorted_players, assignment, num_teams) if assignment is not None else None
+
+        return (teams, metadata) if return_metadata else teams
+
+    @staticmethod
+    def _regenerate_assignment(sorted_players, num_teams, coupling_constraints, decoupling_constraints,
+                               previous_team_of, max_moved_players, time_budget, rng=random, **generation_flags):
+        """
+        Solves the MILP of regenerate_teams - the regular model without symmetry breaking (the teams keep their
+        labels), with a limit on the amount of moved players, warm-started from the previous lineup.
+        :param sorted_players: The Roster of the players, sorted by descending rating.
+        :param previous_team_of: Maps the name of every remaining player to the index of its previous team.
+        :param rng: The random number generator the solver's seed is drawn from.
+        :return: (A, B) -> A is a list holding the team index of every player in <sorted_players> (None if no lineup
+        was found), and B is the generation metadata dictionary.
+        """
+        engine = TConsts.TeamGenerationEngines["CBC"]
+        infeasibility = TeamGenerator._analyze_feasibility(sorted_players, num_teams,
+                                                           generation_flags["enforce_tiers"], coupling_constraints,
+                                                           decoupling_constraints)
+        if infeasibility is not None:
+            metadata = TeamGenerator._get_metadata(engine, TConsts.TeamGenerationStatuses["INFEASIBLE"])
+            metadata[TConsts.GENERATION_METADATA_REASON_KEY] = infeasibility[0]
+            metadata[TConsts.GENERATION_METADATA_REASON_PLAYERS_KEY] = infeasibility[1]
+            return None, metadata
+
+        prob, y, units = TeamGenerator._build_milp_model(sorted_players, num_teams, coupling_constraints,
+                                                         decoupling_constraints, **generation_flags)
+        unit_of = {i: u for u, unit in enumerate(units) for i in unit}
+        remaining_players = [(i, previous_team_of[name]) for i, name in enumerate(sorted_players.names)
+                             if name in previous_team_of]
+
+        # A remaining player moved unless its unit is assigned to its previous team
+        moved_players = LpAffineExpression([(y[unit_of[i], j], -1) for i, j in remaining_players],
+                                           constant=len(remaining_players))
+        prob += moved_players <= max_moved_players, "MoveLimit"
+        objective = prob.objective if prob.objective is not None else LpAffineExpression()
+        prob.setObjective(objective + TeamGenerator.REGENERATION_MOVE_COST * moved_players)
+
+        # Start from the previous lineup, placing every new unit in the smallest (then weakest) team
+        team_sizes, team_ratings = [0] * num_teams, [0] * num_teams
+        unit_teams = [None] * len(units)
+        for u, unit in enumerate(units):
+            previous_teams = [j for i, j in remaining_players if i in unit]
+            if previous_teams:
+                unit_teams[u] = previous_teams[0]
+                team_sizes[unit_teams[u]] += len(unit)
+                team_ratings[unit_teams[u]] += sorted_players.ratings[unit].sum()
+        for u, unit in enumerate(units):
+            if unit_teams[u] is None:
+                unit_teams[u] = min(range(num_teams), key=lambda team: (team_sizes[team], team_ratings[team]))
+                team_sizes[unit_teams[u]] += len(unit)
+                team_ratings[unit_teams[u]] += sorted_players.ratings[unit].sum()
+        for u in range(len(units)):
+            for j in range(num_teams):
+                y[u, j].setInitialValue(int(unit_teams[u] == j))
+
+        log_statistics = SolverBackends.solve(prob, engine, time_budget=time_budget, warm_start=True,
+                                              seed=rng.choice(range(100)))
+        if prob.status == LpStatusInfeasible:
+            return None, TeamGenerator._get_metadata(engine, TConsts.TeamGenerationStatuses["INFEASIBLE"],
+                                                     nodes=log_statistics["nodes"])
+        if prob.sol_status not in [LpSolutionOptimal, LpSolutionIntegerFeasible]:
+            return None, TeamGenerator._get_metadata(engine, TConsts.TeamGenerationStatuses["NOT_SOLVED"],
+                                                     nodes=log_statistics["nodes"])
+
+        assignment = [None] * len(sorted_players)
+        for u, unit in enumerate(units):
+            for j in range(num_teams):
+                if round(value(y[u, j])) == 1:
+                    for i in unit:
+                        assignment[i] = j
+
+        # The reported objective is the rating spread alone, without the cost of the moves
+        spread = 0
+        if TeamGenerator._is_rating_balance_applicable(sorted_players, num_teams,
+                                                       generation_flags["balance_team_ratings"]):
+            ratings = sorted_players.get_team_sums(assignment, num_teams, weights=sorted_players.ratings)
+            spread = float(ratings.max() - ratings.min())
+        num_moved = sum(1 for i, j in remaining_players if assignment[i] != j)
+        is_optimal = prob.sol_status == LpSolutionOptimal
+        best_bound = spread if is_optimal or log_statistics["best_bound"] is None else \
+            max(0, min(spread, log_statistics["best_bound"] -
+                       TeamGenerator.REGENERATION_MOVE_COST * max_moved_players))
+        metadata = TeamGenerator._get_metadata(engine,
+                                               TConsts.TeamGenerationStatuses["OPTIMAL" if is_optimal else "FEASIBLE"],
+                                               objective=spread, best_bound=best_bound, nodes=log_statistics["nodes"])
+        metadata[TConsts.GENERATION_METADATA_MOVED_PLAYERS_KEY] = num_moved
+
+        return assignment, metadata
+
+    @staticmethod
+    def _generate_assignment(sorted_players, num_teams, coupling_constraints, decoupling_constraints, engine,
+                             break_symmetry, time_budget, excluded_assignments, rng=random, **generation_flags):
+        """
+        Runs the requested engine(s), as documented in generate_teams.
+        :param sorted_players: The Roster of the players, sorted by descending rating.
+        :param rng: The random number generator the engines draw from.
+        :return: (A, B) -> A is a list holding the team index of every player in <sorted_players> (None if no lineup
+        was found), and B is the generation metadata dictionary.
+        """
+        infeasibility = TeamGenerator._analyze_feasibility(sorted_players, num_teams,
+                                                           generation_flags["enforce_tiers"], coupling_constraints,
+                                                           decoupling_constraints)
+        if infeasibility is not None:
+            metadata = TeamGenerator._get_metadata(engine, TConsts.TeamGenerationStatuses["INFEASIBLE"])
+            metadata[TConsts.GENERATION_METADATA_REASON_KEY] = infeasibility[0]
+            metadata[TConsts.GENERATION_METADATA_REASON_PLAYERS_KEY] = infeasibility[1]
+            return None, metadata
+
+        heuristic_assignment, heuristic_metadata = None, None
+        if engine in [TConsts.TeamGenerationEngines["HEURISTIC"], TConsts.TeamGenerationEngines["BRANCH_AND_BOUND"],
+                      TConsts.TeamGenerationEngines["AUTO"]]:
+            assignment, violations, spread = TeamGenerator._generate_assignment_heuristic(
+                sorted_players, num_teams, coupling_constraints, decoupling_constraints, rng=rng, **generation_flags)
+
+            excluded_partitions = [TeamGenerator._get_partition(excluded) for excluded in excluded_assignments]
+            if violations == 0 and TeamGenerator._get_partition(assignment) not in excluded_partitions:
+                heuristic_assignment = assignment
+                # The heuristic proves no bound, unless its lineup is perfectly balanced
+                is_optimal = spread <= TeamGenerator.EPSILON
+                heuristic_metadata = TeamGenerator._get_metadata(
+                    TConsts.TeamGenerationEngines["HEURISTIC"],
+                    TConsts.TeamGenerationStatuses["OPTIMAL" if is_optimal else "FEASIBLE"],
+                    objective=spread, best_bound=spread if is_optimal else None)
+
+            if engine == TConsts.TeamGenerationEngines["HEURISTIC"]:
+                if heuristic_assignment is None:
+                    return None, TeamGenerator._get_metadata(engine, TConsts.TeamGenerationStatuses["NOT_SOLVED"])
+                return heuristic_assignment, heuristic_metadata
+
+        if engine == TConsts.TeamGenerationEngines["AUTO"]:
+            # Small rosters are solved exactly in-process, larger ones keep an acceptable heuristic lineup
+            if TeamGenerator._is_branch_and_bound_applicable(sorted_players, num_teams, coupling_constraints):
+                engine = TConsts.TeamGenerationEngines["BRANCH_AND_BOUND"]
+            elif heuristic_assignment is not None and spread <= TeamGenerator.HEURISTIC_ACCEPTED_RATING_SPREAD:
+                return heuristic_assignment, heuristic_metadata
+
+        # The heuristic lineup (if any) serves as the exact engines' starting incumbent, and as the answer if they run
+        # out of time
+        if engine == TConsts.TeamGenerationEngines["BRANCH_AND_BOUND"]:
+            assignment, metadata = TeamGenerator._generate_assignment_branch_and_bound(
+                sorted_players, num_teams, coupling_constraints, decoupling_constraints, time_budget=time_budget,
+                initial_assignment=heuristic_assignment, excluded_assignments=excluded_assignments,
+                **generation_flags)
+        else:
+            # AUTO falls back to CBC
+            milp_engine = engine if engine in SolverBackends.MILP_ENGINES else TConsts.TeamGenerationEngines["CBC"]
+            assignment, metadata = TeamGenerator._generate_assignment_milp(
+                sorted_players, num_teams, coupling_constraints, decoupling_constraints, engine=milp_engine,
+                break_symmetry=break_symmetry, time_budget=time_budget, initial_assignment=heuristic_assignment,
+                excluded_assignments=excluded_assignments, rng=rng, **generation_flags)
+
+        if assignment is None and heuristic_assignment is not None and \
+                metadata[TConsts.GENERATION_METADATA_STATUS_KEY] == TConsts.TeamGenerationStatuses["NOT_SOLVED"]:
+            return heuristic_assignment, heuristic_metadata
+
+        return assignment, metadata
+
+    @staticmethod
+    def _get_excluded_assignments(sorted_players, excluded_lineups):
+        """
+        :param sorted_players: The Roster of the players, sorted by descending rating.
+        :param excluded_lineups: A list of lineups, each being a list of teams given by their player names.
+        :return: The excluded lineups as assignments of <sorted_players>. Lineups of a different roster are dropped,
+        since they can't be generated anyway.
+        """
+        player_name_to_index = sorted_players.name_to_index
+        excluded_assignments = []
+        for lineup in excluded_lineups or []:
+            assignment = [None] * len(sorted_players)
+            for j, team in enumerate(lineup):
+                for player_name in team:
+                    if player_name in player_name_to_index:
+                        assignment[player_name_to_index[player_name]] = j
+            if None not in assignment and sum(len(team) for team in lineup) == len(sorted_players):
+                excluded_assignments.append(assignment)
+
+        return excluded_assignments
+
+    @staticmethod
+    def _get_partition(assignment):
+        """
+        :return: The lineup described by <assignment>, regardless of the labeling of its teams.
+        """
+        teams = {}
+        for i, j in enumerate(assignment):
+            teams.setdefault(j, set()).add(i)
+        return frozenset(frozenset(team) for team in teams.values())
+
+    @staticmethod
+    def _get_canonical_labels(units, assignment):
+        """
+        Relabels the teams of <assignment> in order of their strongest unit, as required by the symmetry breaking.
+        :return: The team label of every unit, or None if <assignment> splits a unit.
+        """
+        team_labels = {}
+        unit_labels = []
+        for unit in units:
+            if any(assignment[i] != assignment[unit[0]] for i in unit):
+                return None
+            unit_labels.append(team_labels.setdefault(assignment[unit[0]], len(team_labels)))
+
+        return unit_labels
+
+    @staticmethod
+    def _get_metadata(engine, status, objective=None, best_bound=None, nodes=0):
+        """
+        :return: A generation metadata dictionary. The gap is the distance (in rating points) between the objective
+        and the best bound - that is, how far the lineup might be from the optimal lineup.
+        """
+        return {TConsts.GENERATION_METADATA_ENGINE_KEY: engine,
+                TConsts.GENERATION_METADATA_STATUS_KEY: status,
+                TConsts.GENERATION_METADATA_OBJECTIVE_KEY: objective,
+                TConsts.GENERATION_METADATA_BEST_BOUND_KEY: best_bound,
+                TConsts.GENERATION_METADATA_GAP_KEY:
+                    max(0, objective - best_bound) if objective is not None and best_bound is not None else None,
+                TConsts.GENERATION_METADATA_NODES_KEY: nodes}
+
+    @staticmethod
+    def check_feasibility(player_dicts_list, enforce_tiers=True, num_teams=3, coupling_constraints=None,
+                          decoupling_constraints=None):
+        """
+        Detects generation requests that can't be satisfied, without building or solving a model.
+        The check is partial - a request that passes it might still turn out to be infeasible.
+        :param player_dicts_list: A list of dictionaries, each describing a player's Name, Characteristic, Rating.
+        :param enforce_tiers: Whether each team must contain a player from each tier.
+        :param num_teams: The amount of teams to generate.
+        :param coupling_constraints: A list where each entry is a "must be in the same team" constraint.
+        :param decoupling_constraints: A list where each entry is a "mustn't be in the same team" constraint.
+        :return: None if no contradiction was found, otherwise (A, B) -> A is one of TeamGenerationInfeasibilityReasons,
+        and B is a list of the names of the players causing it.
+        """
+        sorted_players = Roster(player_dicts_list).sorted_by_rating()
+        return TeamGenerator._analyze_feasibility(sorted_players, num_teams, enforce_tiers,
+                                                  coupling_constraints if coupling_constraints else [],
+                                                  decoupling_constraints if decoupling_constraints else [])
+
+    @staticmethod
+    def _analyze_feasibility(sorted_players, num_teams, enforce_tiers, coupling_constraints, decoupling_constraints):
+        """
+        Performs the checks documented in check_feasibility.
+        :param sorted_players: The Roster of the players, sorted by descending rating.
+        """
+        reasons = TConsts.TeamGenerationInfeasibilityReasons
         num_members = len(sorted_players)
+        names = sorted_players.names
 
-        # Creating a variable for each <player, team> combination.
-        # These variables will be interpreted as follows:
-        # X_i_j equals 1 if player <I> belongs to group <J>
-        prob = LpProblem("TeamGenerating", LpMinimize)
-        x = {(i, j): LpVariable(f"x_Player{i}_Team{j}", 0, 1, "Binary") for i in range(num_members) for j in
-             range(num_teams)}
+        if num_teams < 1 or num_members < num_teams:
+            return reasons["NOT_ENOUGH_PLAYERS"], []
 
-        # Basic Constraints
-        # -----------------
+        player_name_to_index = sorted_players.name_to_index
+        unknown_players = [name for entry in coupling_constraints + decoupling_constraints for name in entry
+                           if name not in player_name_to_index]
+        if unknown_players:
+            return reasons["UNKNOWN_PLAYERS"], unknown_players
 
-        # Enforce that each member is assigned to exactly one group
-        for i in range(num_members):
-            prob += lpSum(x[i, j] for j in range(num_teams)) == 1, f"AssignOnce_{i}"
-            player_name_to_index[sorted_players[i][TConsts.PLAYERS_NAME_KEY]] = i
+        is_gk = sorted_players.get_gk_mask().tolist()
+        if sum(is_gk) > num_teams:
+            return reasons["TOO_MANY_GOALKEEPERS"], [name for i, name in enumerate(names) if is_gk[i]]
 
-        for entry in coupling_constraints:
-            for curr_name, next_name in zip(entry, entry[1:]):
-                curr_player_index = player_name_to_index[curr_name]
-                next_player_index = player_name_to_index[next_name]
+        for entry in decoupling_constraints:
+            if len(set(entry)) > num_teams:
+                return reasons["DECOUPLING_TOO_LARGE"], list(entry)
 
-                for j in range(num_teams):
-                    prob += x[curr_player_index, j] == x[next_player_index, j], f"Coupling_{curr_player_index}_{next_player_index}_{j}"
+        max_team_size = math.ceil(num_members / num_teams)
+        groups = TeamGenerator._get_coupling_groups(num_members, coupling_constraints, player_name_to_index)
+        group_of = {}
+        for group_index, group in enumerate(groups):
+            group_names = [names[i] for i in group]
+            if len(group) > max_team_size:
+                return reasons["COUPLING_TOO_LARGE"], group_names
+            if sum(is_gk[i] for i in group) > 1:
+                return reasons["COUPLED_GOALKEEPERS"], [names[i] for i in group if is_gk[i]]
+            if enforce_tiers:
+                tiers = [TeamGenerator.get_player_tier(i, num_teams) for i in group
+                         if TeamGenerator.get_player_tier(i, num_teams) < num_members // num_teams]
+                if len(tiers) != len(set(tiers)):
+                    return reasons["COUPLED_SAME_TIER"], group_names
+            for i in group:
+                group_of[i] = group_index
+
+        # No two groups that are larger than half a team can share a team
+        large_groups = [group for group in groups if 2 * len(group) > max_team_size]
+        if len(large_groups) > num_teams:
+            return reasons["COUPLINGS_DONT_FIT"], [names[i] for group in large_groups for i in group]
 
         for entry in decoupling_constraints:
-            index_list = []
-            for player in entry:
-                index_list.append(player_name_to_index[player])
+            seen_groups = {}
+            for name in set(entry):
+                group_index = group_of[player_name_to_index[name]]
+                if group_index in seen_groups:
+                    return reasons["COUPLED_AND_DECOUPLED"], [seen_groups[group_index], name]
+                seen_groups[group_index] = name
+
+        return None
+
+    @staticmethod
+    def _generate_assignment_milp(sorted_players, num_teams, coupling_constraints, decoupling_constraints,
+                                  balance_team_ratings, enforce_tiers, enforce_defense, enforce_offense,
+                                  enforce_total_roles, engine=TConsts.TeamGenerationEngines["CBC"], break_symmetry=False,
+                                  time_budget=None, initial_assignment=None, excluded_assignments=None, rng=random):
+        """
+        Solves the team generation MILP using one of the MILP solver backends.
+        :param sorted_players: The Roster of the players, sorted by descending rating.
+        :param engine: One of SolverBackends.MILP_ENGINES.
+        :param time_budget: The amount of seconds the solver may run for, or None for no limit.
+        :param initial_assignment: A legal assignment to start the search from, or None.
+        :param excluded_assignments: Assignments that mustn't be returned, requires <break_symmetry>.
+        :param rng: The random number generator the solver's seed is drawn from.
+        :return: (A, B) -> A is a list holding the team index of every player in <sorted_players> (None if no lineup
+        was found), and B is the generation metadata dictionary.
+        """
+        prob, y, units = TeamGenerator._build_milp_model(
+            sorted_players, num_teams, coupling_constraints, decoupling_constraints, balance_team_ratings,
+            enforce_tiers, enforce_defense, enforce_offense, enforce_total_roles, break_symmetry, excluded_assignments)
+
+        if initial_assignment is not None:
+            # The teams must be relabeled in order of their strongest unit, to satisfy the symmetry breaking
+            unit_labels = TeamGenerator._get_canonical_labels(units, initial_assignment)
+            for u in range(len(units)):
+                for j in range(num_teams):
+                    y[u, j].setInitialValue(int(unit_labels[u] == j))
+
+        seed = rng.choice(range(100))
+        log_statistics = SolverBackends.solve(prob, engine, time_budget=time_budget,
+                                              warm_start=initial_assignment is not None, seed=seed)
+
+        if prob.status == LpStatusInfeasible:
+            return None, TeamGenerator._get_metadata(engine,
+                                                     TConsts.TeamGenerationStatuses["INFEASIBLE"],
+                                                     nodes=log_statistics["nodes"])
+        if prob.sol_status not in [LpSolutionOptimal, LpSolutionIntegerFeasible]:
+            return None, TeamGenerator._get_metadata(engine,
+                                                     TConsts.TeamGenerationStatuses["NOT_SOLVED"],
+                                                     nodes=log_statistics["nodes"])
+
+        # Without a rating objective, every legal lineup is optimal
+        objective = value(prob.objective) if prob.objective is not None else 0
+        objective = objective if objective is not None else 0
+        is_optimal = prob.sol_status == LpSolutionOptimal
+        best_bound = objective if is_optimal or log_statistics["best_bound"] is None else \
+            min(objective, log_statistics["best_bound"])
+        metadata = TeamGenerator._get_metadata(engine,
+                                               TConsts.TeamGenerationStatuses["OPTIMAL" if is_optimal else "FEASIBLE"],
+                                               objective=objective, best_bound=best_bound,
+                                               nodes=log_statistics["nodes"])
 
+        # Expand the units back to their players
+        assignment = [None] * len(sorted_players)
+        for u in range(len(units)):
             for j in range(num_teams):
-                prob += lpSum(x[i, j] for i in index_list) <= 1
+                if round(value(y[u, j])) == 1:
+                    for i in units[u]:
+                        assignment[i] = j
+
+        return assignment, metadata
+
+    @staticmethod
+    def _build_milp_model(sorted_players, num_teams, coupling_constraints, decoupling_constraints,
+                         balance_team_ratings, enforce_tiers, enforce_defense, enforce_offense, enforce_total_roles,
+                         break_symmetry=False, excluded_assignments=None):
+        """
+        Builds the team generation MILP.
+        Every group of coupled players is contracted into a single weighted unit before the model is built, so the
+        coupling constraints hold by construction and don't add any rows to the model.
+        :param sorted_players: The Roster of the players, sorted by descending rating.
+        :return: (A, B, C) -> A is the LpProblem, B maps each <unit, team> to its binary variable, and C is the list of
+        units, each being a list of player indices.
+        """
+        num_members = len(sorted_players)
+        units, unit_matrix = TeamGenerator._get_units(sorted_players, num_teams, enforce_tiers, coupling_constraints,
+                                                      decoupling_constraints)
+        num_units = len(units)
+
+        # Creating a variable for each <unit, team> combination.
+        # These variables will be interpreted as follows:
+        # Y_u_j equals 1 if unit <U> (and therefore all of its players) belongs to group <J>
+        prob = LpProblem("TeamGenerating", LpMinimize)
+        y = {(u, j): LpVariable(f"y_Unit{u}_Team{j}", 0, 1, "Binary") for u in range(num_units) for j in
+             range(num_teams)}
+
+        def team_sums(coefficients):
+            """
+            :param coefficients: A coefficient per unit.
+            :return: An expression per team, summing <coefficients> over the units assigned to it. Each expression
+            only involves the units with a nonzero coefficient, and is built in one go rather than term by term.
+            """
+            involved_units = np.flatnonzero(coefficients)
+            unit_coefficients = list(zip(involved_units.tolist(), coefficients[involved_units].tolist()))
+            return [LpAffineExpression([(y[u, j], coefficient) for u, coefficient in unit_coefficients])
+                    for j in range(num_teams)]
+
+        def add_bounds(lower_bound, upper_bound, expressions):
+            """
+            Bounds every expression in <expressions> between <lower_bound> and <upper_bound> (each may be None).
+            """
+            for expression in expressions:
+                if lower_bound is not None:
+                    prob.addConstraint(LpConstraint(expression - lower_bound, LpConstraintGE, rhs=0))
+                if upper_bound is not None:
+                    prob.addConstraint(LpConstraint(expression - upper_bound, LpConstraintLE, rhs=0))
+
+        # Basic Constraints
+        # -----------------
+
+        # Enforce that each unit is assigned to exactly one group
+        for u in range(num_units):
+            prob.addConstraint(LpConstraint(LpAffineExpression([(y[u, j], 1) for j in range(num_teams)]),
+                                            LpConstraintEQ, rhs=1), f"AssignOnce_{u}")
 
         equal_sized_teams = (num_members % num_teams) == 0
+        team_sizes = team_sums(unit_matrix[:, TeamGenerator.UNIT_SIZE])
         # Enforce that each group has the same amount of team members, or at most one additional member than the others
         if equal_sized_teams:
             # Teams can be equally-sized
             for j in range(num_teams):
-                prob += lpSum(x[i, j] for i in range(num_members)) == (num_members // num_teams), f"GroupSize_{j}"
+                prob.addConstraint(LpConstraint(team_sizes[j], LpConstraintEQ, rhs=num_members // num_teams),
+                                   f"GroupSize_{j}")
         else:
             # Teams can't be equally-sized
             smallest_team = LpVariable("smallest_team", 0, 100)
             largest_team = LpVariable("largest_team", 0, 100)
-            for j in range(num_teams):
-                prob += smallest_team <= lpSum(x[i, j] for i in range(num_members))
-                prob += largest_team >= lpSum(x[i, j] for i in range(num_members))
-
+            add_bounds(smallest_team, largest_team, team_sizes)
             prob += largest_team - smallest_team <= 1
 
-        # Distribute goalkeepers - Make sure at most one player in each team is a GK
-        for j in range(num_teams):
-            prob += lpSum(
-                x[i, j] * (sorted_players[i][TConsts.PLAYERS_CHARACTERISTICS_KEY] ==
-                           TConsts.PlayerCharacteristics["GOALKEEPER"]) for i in range(num_members)) <= 1
+        # Distribute goalkeepers - Make sure at most one player in each team is a GK.
+        # The same goes for each tier (if enforced) and for each decoupling constraint.
+        # The in-equations aren't tight to support different-sized teams.
+        capped_columns = [TeamGenerator.UNIT_GKS] + list(range(TeamGenerator.UNIT_CAPPED_START, unit_matrix.shape[1]))
+        for column in capped_columns:
+            if unit_matrix[:, column].any():
+                for expression in team_sums(unit_matrix[:, column]):
+                    prob.addConstraint(LpConstraint(expression, LpConstraintLE, rhs=1))
 
         # Advanced Constraints
         # --------------------
 
         # Enforce that the difference in ratings between the strongest team and the weakest team is optimal
-        if balance_team_ratings and equal_sized_teams and TeamGenerator.get_gk_amount(player_dicts_list) in [num_teams, 0]:
+        if TeamGenerator._is_rating_balance_applicable(sorted_players, num_teams, balance_team_ratings):
             weakest_team = LpVariable("weakest_team", 0, 100)
             strongest_team = LpVariable("strongest_team", 0, 100)
-
-            for j in range(num_teams):
-                prob += weakest_team <= lpSum((x[i, j] *
-                                               sorted_players[i][TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY])
-                                              for i in range(num_members))
-                prob += strongest_team >= lpSum((x[i, j] *
-                                                 sorted_players[i][TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY])
-                                                for i in range(num_members))
+            add_bounds(weakest_team, strongest_team, team_sums(unit_matrix[:, TeamGenerator.UNIT_RATING]))
 
             prob += strongest_team - weakest_team, "Objective"
 
-        # Enforce that each team contains a single player from each tier
-        if enforce_tiers:
-            for j in range(num_teams):
-                for tier in range(num_members // num_teams):
-                    prob += lpSum( x[i, j] * (TeamGenerator.get_player_tier(i, num_teams) == tier)
-                            for i in range(num_members)) <= 1  # In-equation not tight to support different-sized teams
+        # Each role count is only bounded if it's enforced, rather than bounding all of them whenever one is
+        role_columns = [(enforce_defense, unit_matrix[:, TeamGenerator.UNIT_DEFS], "def"),
+                        (enforce_offense, unit_matrix[:, TeamGenerator.UNIT_ATTS], "att"),
+                        (enforce_total_roles,
+                         unit_matrix[:, TeamGenerator.UNIT_DEFS] + unit_matrix[:, TeamGenerator.UNIT_ATTS], "role")]
+        for enforced, coefficients, role_name in role_columns:
+            if enforced:
+                # Define role_max as the largest amount of players of the role in one team, and role_min as the smallest
+                role_min = LpVariable(f"{role_name}_min", 0, 10)
+                role_max = LpVariable(f"{role_name}_max", 0, 10)
+                add_bounds(role_min, role_max, team_sums(coefficients))
+                prob += role_max - role_min <= 1
+
+        # Symmetry Breaking
+        # -----------------
 
-        if enforce_defense or enforce_offense or enforce_total_roles:
-            # Define att_max as the largest amount of attackers in one team, and att_min as the smallest amount
-            att_min = LpVariable("att_min", 0, 10)
-            att_max = LpVariable("att_max", 0, 10)
+        # The teams are interchangeable, so every lineup can be labeled in num_teams! equivalent ways.
+        # Only allow the labeling in which the teams are ordered by their strongest unit - the strongest unit is in
+        # team 0, and a unit can only be in team J if a stronger unit is in team J-1.
+        if break_symmetry:
+            prob += y[0, 0] == 1, "SymmetryAnchor"
+            for j in range(1, num_teams):
+                previous_team = [(y[v, j - 1], -1) for v in range(num_units)]
+                for u in range(num_units):
+                    prob.addConstraint(LpConstraint(LpAffineExpression([(y[u, j], 1)] + previous_team[:u]),
+                                                    LpConstraintLE, rhs=0), f"SymmetryOrder_{u}_{j}")
 
-            # The same for defenders
-            def_min = LpVariable("def_min", 0, 10)
-            def_max = LpVariable("def_max", 0, 10)
+        # No-Good Cuts
+        # ------------
 
-            # Then make sure it is correct globally - for all role-based players
-            role_min = LpVariable("role_min", 0, 10)
-            role_max = LpVariable("role_max", 0, 10)
+        # With the teams ordered, every lineup has a single labeling, so it's cut off by forbidding all of its
+        # <unit, team> variables from being set together.
+        for k, excluded_assignment in enumerate(excluded_assignments or []):
+            unit_labels = TeamGenerator._get_canonical_labels(units, excluded_assignment)
+            if unit_labels is not None:
+                prob += lpSum(y[u, unit_labels[u]] for u in range(num_units)) <= num_units - 1, f"NoGood_{k}"
 
+        return prob, y, units
+
+    @staticmethod
+    def _generate_assignment_branch_and_bound(sorted_players, num_teams, coupling_constraints,
+                                              decoupling_constraints, balance_team_ratings, enforce_tiers,
+                                              enforce_defense, enforce_offense, enforce_total_roles,
+                                              time_budget=None, initial_assignment=None, excluded_assignments=None):
+        """
+        Solves the team generation problem exactly and in-process, by a depth-first branch and bound over the units.
+        The constraints and the objective are the same as the MILP's, so a completed search reaches the same optimal
+        rating spread. Only the labeling in which the teams are ordered by their strongest unit is explored (just like
+        the MILP's symmetry breaking), which also lets every excluded lineup be matched exactly.
+        The search is exponential in the amount of units, see BRANCH_AND_BOUND_MAX_UNITS.
+        :param sorted_players: The Roster of the players, sorted by descending rating.
+        :param time_budget: The amount of seconds the search may run for, or None for no limit.
+        :param initial_assignment: A legal assignment to start the search from (its spread prunes the search), or None.
+        :param excluded_assignments: Assignments that mustn't be returned.
+        :return: (A, B) -> A is a list holding the team index of every player in <sorted_players> (None if no lineup
+        was found), and B is the generation metadata dictionary.
+        """
+        start_time = time.monotonic()
+        num_members = len(sorted_players)
+        units, unit_matrix = TeamGenerator._get_units(sorted_players, num_teams, enforce_tiers, coupling_constraints,
+                                                      decoupling_constraints)
+        unit_vectors = TeamGenerator._get_unit_vectors(unit_matrix)
+        num_units = len(units)
+        balance_ratings = TeamGenerator._is_rating_balance_applicable(sorted_players, num_teams, balance_team_ratings)
+        min_team_size, max_team_size = num_members // num_teams, math.ceil(num_members / num_teams)
+
+        unit_sizes = [unit_vector[TeamGenerator.UNIT_SIZE] for unit_vector in unit_vectors]
+        unit_ratings = [unit_vector[TeamGenerator.UNIT_RATING] for unit_vector in unit_vectors]
+        unit_capped = [[(column, unit_vector[column]) for column in
+                        [TeamGenerator.UNIT_GKS] + list(range(TeamGenerator.UNIT_CAPPED_START, len(unit_vector)))
+                        if unit_vector[column]] for unit_vector in unit_vectors]
+
+        # Each enforced role count is described by its count per unit, and by the amount left in the units after each
+        unit_roles = []
+        for enforced, columns in [(enforce_defense, [TeamGenerator.UNIT_DEFS]),
+                                  (enforce_offense, [TeamGenerator.UNIT_ATTS]),
+                                  (enforce_total_roles, [TeamGenerator.UNIT_DEFS, TeamGenerator.UNIT_ATTS])]:
+            if enforced:
+                unit_roles.append([sum(unit_vector[column] for column in columns) for unit_vector in unit_vectors])
+        remaining_roles = [[sum(role_counts[u:]) for u in range(num_units + 1)] for role_counts in unit_roles]
+        remaining_sizes = [sum(unit_sizes[u:]) for u in range(num_units + 1)]
+
+        # Team ratings only grow as units are added, and the weakest team is never stronger than the average team.
+        # A team can't gain more than the strongest remaining units that fit in it, nor less than the weakest remaining
+        # units that fill it to the smallest team size.
+        average_rating = sum(unit_ratings) / num_teams
+        root_bound = max(0, max(unit_ratings) - average_rating) if balance_ratings else 0
+        max_unit_size = max(unit_sizes)
+        strongest_remaining, weakest_remaining = [], []
+        for u in range(num_units + 1):
+            remaining_ratings = sorted(unit_ratings[u:])
+            weakest_remaining.append([0] + list(itertools.accumulate(remaining_ratings)))
+            strongest_remaining.append([0] + list(itertools.accumulate(reversed(remaining_ratings))))
+
+        excluded_labels = set()
+        for excluded_assignment in excluded_assignments or []:
+            unit_labels = TeamGenerator._get_canonical_labels(units, excluded_assignment)
+            if unit_labels is not None:
+                excluded_labels.add(tuple(unit_labels))
+
+        team_sizes = [0] * num_teams
+        team_ratings = [0] * num_teams
+        team_capped = [[0] * len(unit_vectors[0]) for _ in range(num_teams)]
+        team_roles = [[0] * num_teams for _ in unit_roles]
+        unit_labels = [0] * num_units
+        best = {"labels": None, "spread": math.inf}
+        statistics = {"nodes": 0, "timed_out": False}
+
+        if initial_assignment is not None:
+            initial_labels = TeamGenerator._get_canonical_labels(units, initial_assignment)
+            if initial_labels is not None and tuple(initial_labels) not in excluded_labels:
+                initial_ratings = [0] * num_teams
+                for u, j in enumerate(initial_labels):
+                    initial_ratings[j] += unit_ratings[u]
+                best["labels"] = initial_labels
+                best["spread"] = max(initial_ratings) - min(initial_ratings) if balance_ratings else 0
+
+        def get_lower_bound(u):
+            """
+            :return: A lower bound on the rating spread of every lineup completing the current partial lineup, in which
+            the units before <u> are assigned.
+            """
+            num_remaining = num_units - u
+            strongest_bound, weakest_bound = average_rating, average_rating
             for j in range(num_teams):
-                prob += role_min <= lpSum(
-                    x[i, j] * (sorted_players[i][TConsts.PLAYERS_CHARACTERISTICS_KEY] in
-                               [TConsts.PlayerCharacteristics["OFFENSIVE"], TConsts.PlayerCharacteristics["DEFENSIVE"]])
-                    for i in range(num_members))
-                prob += role_max >= lpSum(
-                    x[i, j] * (sorted_players[i][TConsts.PLAYERS_CHARACTERISTICS_KEY] in
-                               [TConsts.PlayerCharacteristics["OFFENSIVE"],
-                                TConsts.PlayerCharacteristics["DEFENSIVE"]])
-                    for i in range(num_members))
-                prob += att_min <= lpSum(
-                    x[i, j] * (sorted_players[i][TConsts.PLAYERS_CHARACTERISTICS_KEY] ==
-                               TConsts.PlayerCharacteristics["OFFENSIVE"])
-                    for i in range(num_members))
-                prob += att_max >= lpSum(
-                    x[i, j] * (sorted_players[i][TConsts.PLAYERS_CHARACTERISTICS_KEY] ==
-                               TConsts.PlayerCharacteristics["OFFENSIVE"])
-                    for i in range(num_members))
-                prob += def_min <= lpSum(
-                    x[i, j] * (sorted_players[i][TConsts.PLAYERS_CHARACTERISTICS_KEY] ==
-                               TConsts.PlayerCharacteristics["DEFENSIVE"])
-                    for i in range(num_members))
-                prob += def_max >= lpSum(
-                    x[i, j] * (sorted_players[i][TConsts.PLAYERS_CHARACTERISTICS_KEY] ==
-                               TConsts.PlayerCharacteristics["DEFENSIVE"])
-                    for i in range(num_members))
+                missing_units = -(-max(0, min_team_size - team_sizes[j]) // max_unit_size)
+                strongest_bound = max(strongest_bound, team_ratings[j] + weakest_remaining[u][missing_units])
+                free_units = min(max_team_size - team_sizes[j], num_remaining)
+                weakest_bound = min(weakest_bound, team_ratings[j] + strongest_remaining[u][free_units])
+            return strongest_bound - weakest_bound
+
+        def search(u, used_teams):
+            statistics["nodes"] += 1
+            if statistics["nodes"] % TeamGenerator.BRANCH_AND_BOUND_CLOCK_INTERVAL == 0 and time_budget is not None \
+                    and time.monotonic() - start_time > time_budget:
+                statistics["timed_out"] = True
+            if statistics["timed_out"] or best["spread"] <= root_bound + TeamGenerator.EPSILON:
+                return
+
+            # Prune partial lineups that can't be completed legally, or can't improve on the best lineup found
+            if sum(max(0, min_team_size - size) for size in team_sizes) > remaining_sizes[u]:
+                return
+            for role_index, counters in enumerate(team_roles):
+                if max(counters) - min(counters) - remaining_roles[role_index][u] > 1:
+                    return
+            if balance_ratings and get_lower_bound(u) >= best["spread"] - TeamGenerator.EPSILON:
+                return
+
+            if u == num_units:
+                spread = max(team_ratings) - min(team_ratings) if balance_ratings else 0
+                if spread < best["spread"] and tuple(unit_labels) not in excluded_labels:
+                    best["labels"] = list(unit_labels)
+                    best["spread"] = spread
+                return
+
+            # A unit may join any team that's already in use, or open the next one. The weakest teams are tried first,
+            # so a balanced lineup is found early and prunes the rest of the search.
+            candidate_teams = sorted(range(min(used_teams + 1, num_teams)), key=lambda team: team_ratings[team])
+            for j in candidate_teams:
+                if team_sizes[j] + unit_sizes[u] > max_team_size or \
+                        any(team_capped[j][column] + count > 1 for column, count in unit_capped[u]):
+                    continue
 
+                team_sizes[j] += unit_sizes[u]
+                team_ratings[j] += unit_ratings[u]
+                for column, count in unit_capped[u]:
+                    team_capped[j][column] += count
+                for role_index, role_counts in enumerate(unit_roles):
+                    team_roles[role_index][j] += role_counts[u]
+                unit_labels[u] = j
+
+                search(u + 1, max(used_teams, j + 1))
+
+                team_sizes[j] -= unit_sizes[u]
+                team_ratings[j] -= unit_ratings[u]
+                for column, count in unit_capped[u]:
+                    team_capped[j][column] -= count
+                for role_index, role_counts in enumerate(unit_roles):
+                    team_roles[role_index][j] -= role_counts[u]
+
+        search(0, 0)
+
+        engine = TConsts.TeamGenerationEngines["BRANCH_AND_BOUND"]
+        if best["labels"] is None:
+            status = "NOT_SOLVED" if statistics["timed_out"] else "INFEASIBLE"
+            return None, TeamGenerator._get_metadata(engine, TConsts.TeamGenerationStatuses[status],
+                                                     nodes=statistics["nodes"])
+
+        # An interrupted search only guarantees the bound of the root
+        best_bound = root_bound if statistics["timed_out"] else best["spread"]
+        metadata = TeamGenerator._get_metadata(
+            engine, TConsts.TeamGenerationStatuses["FEASIBLE" if statistics["timed_out"] else "OPTIMAL"],
+            objective=best["spread"], best_bound=min(best_bound, best["spread"]), nodes=statistics["nodes"])
+
+        # Expand the units back to their players
+        assignment = [None] * num_members
+        for u, unit in enumerate(units):
+            for i in unit:
+                assignment[i] = best["labels"][u]
+
+        return assignment, metadata
+
+    @staticmethod
+    def _generate_assignment_heuristic(sorted_players, num_teams, coupling_constraints, decoupling_constraints,
+                                       balance_team_ratings, enforce_tiers, enforce_defense, enforce_offense,
+                                       enforce_total_roles, rng=random):
+        """
+        Generates the teams without an external solver - a snake draft by tier, followed by a local search that moves
+        and swaps players between teams until no move improves the lineup.
+        Coupled players are drafted and moved together, so coupling constraints always hold.
+        :param sorted_players: The Roster of the players, sorted by descending rating.
+        :param rng: The random number generator the drafts are shuffled by.
+        :return: (A, B, C) -> A is a list holding the team index of every player in <sorted_players>, B is the amount
+        of violated constraints in A, and C is the rating spread between the strongest and the weakest team in A.
+        """
+        num_members = len(sorted_players)
+        units, unit_matrix = TeamGenerator._get_units(sorted_players, num_teams, enforce_tiers, coupling_constraints,
+                                                      decoupling_constraints)
+        unit_vectors = TeamGenerator._get_unit_vectors(unit_matrix)
+        balance_ratings = TeamGenerator._is_rating_balance_applicable(sorted_players, num_teams, balance_team_ratings)
+        size_col, rating_col, gk_col, def_col, att_col, capped_start = \
+            TeamGenerator.UNIT_SIZE, TeamGenerator.UNIT_RATING, TeamGenerator.UNIT_GKS, TeamGenerator.UNIT_DEFS, \
+            TeamGenerator.UNIT_ATTS, TeamGenerator.UNIT_CAPPED_START
+
+        capped_columns = [{column for column in [gk_col] + list(range(capped_start, len(unit_vector)))
+                           if unit_vector[column]} for unit_vector in unit_vectors]
+
+        def get_excess(counter):
+            return counter - 1 if counter > 1 else 0
+
+        def get_capped_excess(team_vector):
+            return sum(get_excess(counter) for counter in team_vector[gk_col:gk_col + 1] + team_vector[capped_start:])
+
+        def get_spread_excess(team_vectors, column):
+            counters = [team_vector[column] for team_vector in team_vectors]
+            return max(0, max(counters) - min(counters) - 1)
+
+        def evaluate(team_vectors, capped_excess):
+            """
+            :return: The (violations, rating spread) score of a lineup, lower is better.
+            """
+            violations = sum(capped_excess) + get_spread_excess(team_vectors, size_col)
             if enforce_defense:
-                prob += def_max - def_min <= 1
+                violations += get_spread_excess(team_vectors, def_col)
             if enforce_offense:
-                prob += att_max - att_min <= 1
+                violations += get_spread_excess(team_vectors, att_col)
             if enforce_total_roles:
-                prob += role_max - role_min <= 1
+                roles = [team_vector[def_col] + team_vector[att_col] for team_vector in team_vectors]
+                violations += max(0, max(roles) - min(roles) - 1)
 
-        # Solve the LP problem
-        seed = random.choice([i for i in range(100)])
-        cbc_solver = PULP_CBC_CMD(keepFiles=False,
-                                  # Set random seed to ensure reproducibility, passes as command-line arg to solver
-                                  options=[f"RandomS {seed}"])
-        prob.solve(cbc_solver)
-        if prob.status == LpStatusInfeasible:
-            return None
+            spread = 0
+            if balance_ratings:
+                ratings = [team_vector[rating_col] for team_vector in team_vectors]
+                spread = max(ratings) - min(ratings)
 
-        for i in range(num_members):
-            for j in range(num_teams):
-                if value(x[i, j]) == 1:
-                    result_list[j][TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY].append(sorted_players[i])
-                    result_list[j][TConsts.MATCHDAYS_SPECIFIC_TEAM_RATING_KEY] += sorted_players[i][
-                        TConsts.MATCHDAYS_SPECIFIC_TEAM_PLAYER_RATING_KEY]
+            return violations, spread
+
+        def add_vectors(first, second, sign=1):
+            return [a + sign * b for a, b in zip(first, second)]
+
+        empty_vector = [0] * len(unit_vectors[0]) if unit_vectors else []
+
+        def draft(shuffle_rounds):
+            """
+            Snake draft - the units are drafted by their strongest player, so every tier is drafted in its own round.
+            Each unit goes to the first team in the round's order that can take it without violating a constraint.
+            :param shuffle_rounds: Whether to draft every round in a random team order, rather than a snake order.
+            """
+            max_team_size = math.ceil(num_members / num_teams)
+            unit_assignment = []
+            team_vectors = [list(empty_vector) for _ in range(num_teams)]
+            round_order = []
+            for pick, unit_vector in enumerate(unit_vectors):
+                draft_round, offset = divmod(pick, num_teams)
+                if offset == 0:
+                    if shuffle_rounds:
+                        round_order = rng.sample(range(num_teams), num_teams)
+                    else:
+                        round_order = list(range(num_teams)) if draft_round % 2 == 0 else \
+                            list(range(num_teams - 1, -1, -1))
+                preferred_teams = round_order[offset:] + round_order[:offset]
+
+                chosen_team = preferred_teams[0]
+                for j in preferred_teams:
+                    candidate = add_vectors(team_vectors[j], unit_vector)
+                    if candidate[size_col] <= max_team_size and get_capped_excess(candidate) == 0:
+                        chosen_team = j
+                        break
+
+                unit_assignment.append(chosen_team)
+                team_vectors[chosen_team] = add_vectors(team_vectors[chosen_team], unit_vector)
+
+            return unit_assignment, team_vectors
+
+        def local_search(unit_assignment, team_vectors):
+            """
+            Repeatedly moves a unit to another team, or swaps two units of different teams, as long as the move
+            improves the lineup's score. Stops once a full sweep over the units finds no improving move.
+            """
+            capped_excess = [get_capped_excess(team_vector) for team_vector in team_vectors]
+            score = evaluate(team_vectors, capped_excess)
+            num_units = len(unit_assignment)
+            u, sweep_length = 0, 0
+
+            while sweep_length < num_units and score != (0, 0):
+                source = unit_assignment[u]
+                improved = False
+
+                # Each candidate is <unit to swap with, or None for a plain move>, <target team>
+                candidates = [(None, j) for j in range(num_teams) if j != source] + \
+                             [(v, unit_assignment[v]) for v in range(num_units) if unit_assignment[v] != source]
+                for v, target in candidates:
+                    moved_vector = unit_vectors[u]
+                    returned_vector = empty_vector if v is None else unit_vectors[v]
+
+                    # Only the capped counters that the move touches can change the capped excess
+                    new_excess = list(capped_excess)
+                    for column in capped_columns[u] if v is None else capped_columns[u] | capped_columns[v]:
+                        change = moved_vector[column] - returned_vector[column]
+                        source_before, target_before = team_vectors[source][column], team_vectors[target][column]
+                        new_excess[source] += get_excess(source_before - change) - get_excess(source_before)
+                        new_excess[target] += get_excess(target_before + change) - get_excess(target_before)
+                    if sum(new_excess) > score[0]:
+                        # Cannot possibly improve, no need to evaluate the entire lineup
+                        continue
+
+                    difference = add_vectors(moved_vector, returned_vector, -1)
+                    new_source = add_vectors(team_vectors[source], difference, -1)
+                    new_target = add_vectors(team_vectors[target], difference)
+                    new_vectors = list(team_vectors)
+                    new_vectors[source], new_vectors[target] = new_source, new_target
+                    new_score = evaluate(new_vectors, new_excess)
+
+                    if new_score[0] < score[0] or \
+                            (new_score[0] == score[0] and new_score[1] < score[1] - TeamGenerator.EPSILON):
+                        team_vectors, capped_excess, score = new_vectors, new_excess, new_score
+                        unit_assignment[u] = target
+                        if v is not None:
+                            unit_assignment[v] = source
+                        improved = True
+                        break
+
+                sweep_length = 0 if improved else sweep_length + 1
+                u = (u + 1) % num_units
+
+            return unit_assignment, score
+
+        best_unit_assignment, best_score = None, None
+        for restart in range(TeamGenerator.HEURISTIC_RESTARTS):
+            unit_assignment, score = local_search(*draft(shuffle_rounds=restart > 0))
+
+            if best_score is None or score < best_score:
+                best_unit_assignment, best_score = unit_assignment, score
+            if best_score == (0, 0):
+                break
+
+        assignment = [None] * num_members
+        for unit_index, unit in enumerate(units):
+            for i in unit:
+                assignment[i] = best_unit_assignment[unit_index]
+
+        return assignment, best_score[0], best_score[1]
+
+    @staticmethod
+    def _get_units(sorted_players, num_teams, enforce_tiers, coupling_constraints, decoupling_constraints):
+        """
+        Contracts every group of coupled players into a single unit, which is described by a vector of counters:
+        [size, rating, GKs, DEFs, ATTs, <a counter per tier>, <a counter per decoupling constraint>]
+        The vector of a team is the sum of its units' vectors. All the counters starting from the GK counter (except
+        for DEFs and ATTs) may not exceed 1 in a legal team.
+        :param sorted_players: The Roster of the players, sorted by descending rating.
+        :return: (A, B) -> A is a list of player index lists, one per unit, and B is a matrix of the units' vectors.
+        """
+        num_members = len(sorted_players)
+        num_tiers = num_members // num_teams if enforce_tiers else 0
+        player_name_to_index = sorted_players.name_to_index
+        units = TeamGenerator._get_coupling_groups(num_members, coupling_constraints, player_name_to_index)
+
+        # Every player's own vector, summed into the vectors of the units
+        player_matrix = np.zeros((num_members, TeamGenerator.UNIT_CAPPED_START + num_tiers +
+                                  len(decoupling_constraints)))
+        player_matrix[:, TeamGenerator.UNIT_SIZE] = 1
+        player_matrix[:, TeamGenerator.UNIT_RATING] = sorted_players.ratings
+        player_matrix[:, TeamGenerator.UNIT_GKS] = sorted_players.get_gk_mask()
+        player_matrix[:, TeamGenerator.UNIT_DEFS] = sorted_players.get_characteristic_mask(
+            TConsts.PlayerCharacteristics["DEFENSIVE"])
+        player_matrix[:, TeamGenerator.UNIT_ATTS] = sorted_players.get_characteristic_mask(
+            TConsts.PlayerCharacteristics["OFFENSIVE"])
+        tiered_players = np.arange(num_tiers * num_teams)
+        player_matrix[tiered_players, TeamGenerator.UNIT_CAPPED_START +
+                      TeamGenerator.get_player_tier(tiered_players, num_teams)] = 1
+        for constraint_index, entry in enumerate(decoupling_constraints):
+            np.add.at(player_matrix[:, TeamGenerator.UNIT_CAPPED_START + num_tiers + constraint_index],
+                      [player_name_to_index[name] for name in entry], 1)
+
+        unit_of = np.empty(num_members, dtype=np.intp)
+        for u, unit in enumerate(units):
+            unit_of[unit] = u
+        unit_matrix = np.zeros((len(units), player_matrix.shape[1]))
+        np.add.at(unit_matrix, unit_of, player_matrix)
+
+        return units, unit_matrix
+
+    @staticmethod
+    def _get_unit_vectors(unit_matrix):
+        """
+        :return: The rows of <unit_matrix> as lists, the counters as ints. The in-process engines update a handful of
+        small vectors per step, which plain lists do faster than NumPy rows.
+        """
+        unit_vectors = unit_matrix.astype(int).tolist()
+        for unit_vector, rating in zip(unit_vectors, unit_matrix[:, TeamGenerator.UNIT_RATING].tolist()):
+            unit_vector[TeamGenerator.UNIT_RATING] = rating
+        return unit_vectors
+
+    @staticmethod
+    def _build_teams(sorted_players, assignment, num_teams):
+        """
+        Builds the result list out of a <player, team> assignment.
+        :param sorted_players: The Roster of the players, sorted by descending rating.
+        :param assignment: A list holding the team index of every player in <sorted_players>.
+        :param num_teams: The amount of teams.
+        :return: A list of dictionaries, each describing a team's players and the team's calculated score.
+        """
+        num_members = len(sorted_players)
+        team_ratings = sorted_players.get_team_sums(assignment, num_teams, weights=sorted_players.ratings)
 
         # Correct the ratings calculation to support special cases. Calculation Logic is documented above.
-        if TeamGenerator.get_gk_amount(player_dicts_list) != num_teams:  # A team with no GK exists
-            for j in range(num_teams):
-                team_list = result_list[j][TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY]
-                team_size = len(team_list)
-                if team_size == math.ceil(num_members / num_teams) and TeamGenerator.get_gk_amount(team_list) == 0:
-                    # We should only perform this downscaling if the team size is maximized AND it has no GK
-                    result_list[j][TConsts.MATCHDAYS_SPECIFIC_TEAM_RATING_KEY] *= ((team_size - 1) / team_size)
+        if sorted_players.get_gk_amount() != num_teams:  # A team with no GK exists
+            team_sizes = sorted_players.get_team_sums(assignment, num_teams)
+            team_gks = sorted_players.get_team_sums(assignment, num_teams, weights=sorted_players.get_gk_mask())
+            # We should only perform this downscaling if the team size is maximized AND it has no GK
+            downscaled_teams = (team_sizes == math.ceil(num_members / num_teams)) & (team_gks == 0)
+            team_ratings[downscaled_teams] *= (team_sizes[downscaled_teams] - 1) / team_sizes[downscaled_teams]
+
+        result_list = [{TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY: [],
+                        TConsts.MATCHDAYS_SPECIFIC_TEAM_RATING_KEY: team_rating}
+                       for team_rating in team_ratings.tolist()]
+        for i, j in enumerate(assignment):
+            result_list[j][TConsts.MATCHDAYS_SPECIFIC_TEAM_ROSTER_KEY].append(sorted_players[i])
 
         return result_list
 
+    @staticmethod
+    def _is_branch_and_bound_applicable(sorted_players, num_teams, coupling_constraints):
+        """
+        :return: True if the roster is small enough for the AUTO engine to solve it exactly with the branch and bound.
+        """
+        num_units = len(TeamGenerator._get_coupling_groups(len(sorted_players), coupling_constraints,
+                                                           sorted_players.name_to_index))
+        return num_units <= TeamGenerator.BRANCH_AND_BOUND_MAX_UNITS and \
+            num_teams <= TeamGenerator.BRANCH_AND_BOUND_MAX_TEAMS
+
+    @staticmethod
+    def _is_rating_balance_applicable(sorted_players, num_teams, balance_team_ratings):
+        """
+        The ratings are only balanced when the teams are equally-sized, and either all of them or none of them have a GK.
+        :return: True if the difference in ratings between the strongest and the weakest team should be minimized.
+        """
+        return bool(balance_team_ratings) and (len(sorted_players) % num_teams) == 0 and \
+            sorted_players.get_gk_amount() in [num_teams, 0]
+
+    @staticmethod
+    def _get_coupling_groups(num_members, coupling_constraints, player_name_to_index):
+        """
+        Merges the coupling constraints into disjoint groups of players that must play in the same team.
+        :param num_members: The amount of players.
+        :param coupling_constraints: A list where each entry is a "must be in the same team" constraint.
+        :param player_name_to_index: Maps each player name to its index in the sorted players list.
+        :return: A list of player index lists, ordered by the index of each group's strongest player.
+        """
+        parents = list(range(num_members))
+
+        def find(i):
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        for entry in coupling_constraints:
+            for curr_name, next_name in zip(entry, entry[1:]):
+                curr_root = find(player_name_to_index[curr_name])
+                next_root = find(player_name_to_index[next_name])
+                parents[max(curr_root, next_root)] = min(curr_root, next_root)
+
+        groups = {}
+        for i in range(num_members):
+            groups.setdefault(find(i), []).append(i)
+
+        return [groups[root] for root in sorted(groups)]
+
     @staticmethod
     def calculate_team_rating(player_list):
         """